@@ -1,42 +1,147 @@
+import time
+
+# Taken before any heavy import, so startup metrics cover the whole launch
+PROCESS_START = time.perf_counter()
+
+# mediapipe, pyautogui and webbrowser are imported on first use (see
+# create_hands, draw_hand and the action helpers), keeping them off the
+# path to the first window.
 import cv2
-import mediapipe as mp
-import pyautogui
-import webbrowser
+import argparse
+import bisect
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import gc
+import hashlib
+import http.server
+import itertools
+import json
 import math
+import multiprocessing
 import numpy as np
 import os
-import time
-import tkinter as tk
-from tkinter import ttk
-from PIL import Image, ImageTk
+import sys
+import platform
+import queue
+import re
+import struct
+import threading
+import tracemalloc
+import types
+from multiprocessing import shared_memory
+from PIL import Image
 
 # ==================== HAND FEATURE & GESTURE HELPERS ====================
 
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
+# Landmark colour, landmark thickness, connection colour, connection thickness.
+# Frames are drawn on in RGB, so MediaPipe's default (BGR) red is spelled out;
+# hands other than the operator's are drawn muted.
+HAND_STYLES = {
+    "operator": ((255, 0, 0), 2, (224, 224, 224), 2),
+    "other": ((148, 163, 184), 1, (100, 116, 139), 1),  # slate-400 / slate-500
+}
+_drawing_specs = {}
 
 
-def count_fingers(landmarks):
-    """Count raised fingers using MediaPipe landmarks."""
-    finger_tips = [8, 12, 16, 20]
-    thumb_tip = 4
-    fingers = []
-
-    # Thumb (x-axis comparison)
-    if landmarks[thumb_tip].x < landmarks[thumb_tip - 1].x:
-        fingers.append(1)
-    else:
-        fingers.append(0)
+def create_hands(max_hands=2, static=False, profile=None):
+    """
+    MediaPipe Hands configured the way the app uses it (`static` for
+    unrelated stills). Model settings come from a PerformanceProfile
+    (default: balanced).
+    """
+    import mediapipe as mp    # first call pays the (multi-second) import
+    profile = profile or PROFILES[DEFAULT_PROFILE]
+    return mp.solutions.hands.Hands(
+        static_image_mode=static,
+        max_num_hands=max_hands,
+        model_complexity=profile.model_complexity,
+        min_detection_confidence=profile.detection_confidence,
+        min_tracking_confidence=profile.tracking_confidence,
+    )
+
+
+def draw_hand(frame, landmarks, style="operator"):
+    """Draw one hand's MediaPipe landmarks on an RGB frame."""
+    import mediapipe as mp
+    drawing = mp.solutions.drawing_utils
+    specs = _drawing_specs.get(style)
+    if specs is None:
+        point_color, point_thickness, line_color, line_thickness = HAND_STYLES[style]
+        specs = _drawing_specs[style] = (
+            drawing.DrawingSpec(color=point_color, thickness=point_thickness, circle_radius=2),
+            drawing.DrawingSpec(color=line_color, thickness=line_thickness),
+        )
+    drawing.draw_landmarks(frame, landmarks, mp.solutions.hands.HAND_CONNECTIONS, *specs)
+
+
+# Landmark indices used by the helpers below
+WRIST = 0
+THUMB_TIP = 4
+INDEX_TIP = 8
+MIDDLE_MCP = 9
+FINGER_TIPS = np.array([8, 12, 16, 20])
+
+
+def landmarks_to_array(landmarks):
+    """
+    Convert 21 MediaPipe landmarks to a (21, 3) float32 array of x, y, z.
+    Done once per frame; every helper below works on this array.
+    Arrays are passed through unchanged.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return np.fromiter(
+        (c for lm in landmarks for c in (lm.x, lm.y, lm.z)),
+        dtype=np.float32,
+        count=len(landmarks) * 3,
+    ).reshape(-1, 3)
+
+
+def count_fingers_batch(points):
+    """Raised-finger count for each hand in an (N, 21, 3) landmark array."""
+    points = np.asarray(points, dtype=np.float32)
+    # Thumb: x-axis comparison, other fingers: y-axis comparison
+    thumb = points[:, THUMB_TIP, 0] < points[:, THUMB_TIP - 1, 0]
+    others = points[:, FINGER_TIPS, 1] < points[:, FINGER_TIPS - 2, 1]
+    return thumb.astype(np.int32) + others.sum(axis=1, dtype=np.int32)
+
+
+def extract_hand_features_batch(points):
+    """
+    (N, 21, 3) landmark array -> (N, 42) feature matrix.
+    Each row is the x/y of every landmark relative to the wrist,
+    divided by the wrist-to-index-tip distance.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    rel = points[:, :, :2] - points[:, WRIST:WRIST + 1, :2]
+    hand_size = np.sqrt((rel[:, INDEX_TIP] ** 2).sum(axis=1)) + 1e-6
+    return (rel / hand_size[:, None, None]).reshape(len(points), -1)
 
-    # Other fingers (y-axis comparison)
-    for tip in finger_tips:
-        if landmarks[tip].y < landmarks[tip - 2].y:
-            fingers.append(1)
-        else:
-            fingers.append(0)
 
-    return fingers.count(1)
+def hand_centers_batch(points, width, height):
+    """(N, 2) int pixel positions of the middle-finger MCP joint."""
+    points = np.asarray(points, dtype=np.float32)
+    return (points[:, MIDDLE_MCP, :2] * (width, height)).astype(np.int32)
+
+
+def analyze_landmarks_batch(points, width=640, height=480):
+    """
+    Batch entry point for offline analysis of recorded landmarks.
+    Takes an (N, 21, 3) array and returns features, finger counts and centers.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    return {
+        "features": extract_hand_features_batch(points),
+        "fingers": count_fingers_batch(points),
+        "centers": hand_centers_batch(points, width, height),
+    }
+
+
+def count_fingers(landmarks):
+    """Count raised fingers using MediaPipe landmarks (or a (21, 3) array)."""
+    return int(count_fingers_batch(landmarks_to_array(landmarks)[None])[0])
 
 
 def extract_hand_feature(landmarks):
@@ -44,558 +149,5644 @@ def extract_hand_feature(landmarks):
     Generate a normalized feature vector from 21 hand landmarks.
     Normalized relative to the wrist and hand size.
     """
-    xs = [lm.x for lm in landmarks]
-    ys = [lm.y for lm in landmarks]
-
-    wrist_x, wrist_y = xs[0], ys[0]
+    return extract_hand_features_batch(landmarks_to_array(landmarks)[None])[0]
 
-    # Hand size: distance between wrist and index fingertip
-    dx = xs[8] - wrist_x
-    dy = ys[8] - wrist_y
-    hand_size = math.sqrt(dx * dx + dy * dy) + 1e-6
 
-    feat = []
-    for x, y in zip(xs, ys):
-        feat.append((x - wrist_x) / hand_size)
-        feat.append((y - wrist_y) / hand_size)
+def compute_hand_center(landmarks, width, height):
+    """Pixel position used as the hand center for overlays and swipes."""
+    cx, cy = hand_centers_batch(landmarks_to_array(landmarks)[None], width, height)[0]
+    return int(cx), int(cy)
 
-    return np.array(feat, dtype=np.float32)
 
+# ==================== ENROLLMENT STORE & MATCHING ====================
 
-# ==================== APPLICATION CLASS (GUI + LOGIC) ====================
+FEATURE_DIM = 42
 
-class HandGestureLockApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Hand Gesture Lock & Control")
-        self.root.configure(bg="#020617")  # very dark background
+# Nearest enrolled template for one feature vector
+MatchResult = collections.namedtuple("MatchResult", ["label", "distance", "index"])
 
-        # -------- STATE VARIABLES --------
-        self.command_cooldown = 0
-        self.COOLDOWN_TIME = 30  # ~1 second
-
-        self.prev_x = None
-        self.move_counter = 0
-        self.SWIPE_THRESHOLD = 50   # daha hassas swipe
-        self.SWIPE_FRAMES = 2       # 2 frame üst üste
-
-        self.TEMPLATE_PATH = "hand_template.npy"
-        self.FEATURE_THRESHOLD = 0.12
-        self.is_locked = True          # app starts locked
-        self.hand_template = None
-        self.last_feature = None
 
-        # Animation state
-        self.scan_phase = 0            # for scanning pulse when locked
-        self.save_anim_frames = 0      # after saving template
-        self.unlock_anim_frames = 0    # short animation when unlock happens
-        self.photo_anim_frames = 0     # visual feedback after photo/screenshot
+class TemplateStore:
+    """
+    Enrolled hand templates with user labels.
 
-        # Photo / screenshot system
-        self.photo_dir = "photos"
-        self.screenshot_dir = "screenshots"
-        os.makedirs(self.photo_dir, exist_ok=True)
-        os.makedirs(self.screenshot_dir, exist_ok=True)
+    Templates are kept in a flat binary file: a 16-byte header followed by
+    float32 rows. Enrolling appends one row, and loading memory-maps the rows
+    instead of parsing them. Labels live next to it in a text file, one per line.
+    """
 
-        self.photo_countdown_active = False
-        self.photo_countdown_end_time = 0.0
+    MAGIC = b"HGLT"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHH8x")
 
-        # -------- MEDIAPIPE --------
-        self.hands = mp_hands.Hands(
-            max_num_hands=1,
-            min_detection_confidence=0.7
-        )
+    def __init__(self, path="hand_templates.bin", dim=FEATURE_DIM):
+        self.path = path
+        self.labels_path = os.path.splitext(path)[0] + ".labels"
+        self.dim = dim
+        self.templates = np.empty((0, dim), dtype=np.float32)
+        self.labels = []
+        self.load()
 
-        # -------- CAMERA --------
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    def __len__(self):
+        return len(self.templates)
 
-        if not self.cap.isOpened():
-            raise RuntimeError("Camera could not be opened.")
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            header = f.read(self.HEADER.size)
+        if len(header) < self.HEADER.size:
+            raise ValueError(f"{self.path}: truncated template store header")
+        magic, version, dim = self.HEADER.unpack(header)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{self.path}: not a version {self.VERSION} template store")
+        if dim != self.dim:
+            raise ValueError(f"{self.path}: feature size {dim}, expected {self.dim}")
 
-        # Load saved hand template (if exists)
-        if os.path.exists(self.TEMPLATE_PATH):
-            try:
-                self.hand_template = np.load(self.TEMPLATE_PATH)
-                print("[+] Loaded saved hand template.")
-            except Exception as e:
-                print("[!] Failed to load hand template:", e)
+        # A partially written last row (e.g. after a crash) is ignored
+        rows = (os.path.getsize(self.path) - self.HEADER.size) // (dim * 4)
+        if rows:
+            self.templates = np.memmap(self.path, dtype=np.float32, mode="r",
+                                       offset=self.HEADER.size, shape=(rows, dim))
+        labels = []
+        if os.path.exists(self.labels_path):
+            with open(self.labels_path, encoding="utf-8") as f:
+                labels = f.read().splitlines()
+        self.labels = (labels + ["unknown"] * rows)[:rows]
 
-        # -------- STYLES --------
-        self.style = ttk.Style()
-        self.style.theme_use("clam")
+    def append(self, feature, label):
+        """Append one template to disk without rewriting the existing rows."""
+        feature = np.asarray(feature, dtype=np.float32).reshape(self.dim)
+        label = " ".join(str(label).split()) or "unknown"
 
-        self.style.configure(
-            "Accent.TButton",
-            background="#38bdf8",   # sky-400
-            foreground="#0f172a",   # slate-900
-            borderwidth=0,
-            focusthickness=0,
-            padding=(14, 6),
-        )
-        self.style.map(
-            "Accent.TButton",
-            background=[
-                ("active", "#0ea5e9"),   # sky-500
-                ("pressed", "#0284c7"),  # sky-600
-            ]
-        )
+        # Drop the old mapping before touching the file (needed on Windows)
+        self.templates = np.empty((0, self.dim), dtype=np.float32)
+        is_new = not os.path.exists(self.path)
+        with open(self.path, "ab") as f:
+            if is_new:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.dim))
+            f.write(feature.tobytes())
+        with open(self.labels_path, "a", encoding="utf-8") as f:
+            f.write(label + "\n")
+        self.load()
 
-        self.style.configure(
-            "Ghost.TButton",
-            background="#0f172a",
-            foreground="#e5e7eb",
-            borderwidth=1,
-            focusthickness=0,
-            padding=(14, 6),
-        )
-        self.style.map(
-            "Ghost.TButton",
-            background=[
-                ("active", "#111827"),
-                ("pressed", "#020617"),
-            ]
-        )
+    def import_legacy(self, npy_path, label="operator"):
+        """Move a single-template hand_template.npy into an empty store."""
+        if len(self) or not os.path.exists(npy_path):
+            return False
+        self.append(np.load(npy_path), label)
+        return True
 
-        # -------- LAYOUT --------
-        main_frame = tk.Frame(self.root, bg="#020617")
-        main_frame.grid(row=0, column=0, sticky="nsew")
 
-        self.root.rowconfigure(0, weight=1)
-        self.root.columnconfigure(0, weight=1)
+class CoarseIndex:
+    """
+    IVF-style index for large galleries: templates are grouped around k-means
+    centroids, and a query only scans the groups with the closest centroids.
+    """
 
-        # Left: video
-        video_card = tk.Frame(main_frame, bg="#020617")
-        video_card.grid(row=0, column=0, padx=16, pady=16)
+    def __init__(self, templates, n_lists=None, iterations=8, seed=0):
+        templates = np.asarray(templates, dtype=np.float32)
+        n = len(templates)
+        n_lists = n_lists or max(1, int(math.sqrt(n)))
 
-        video_container = tk.Frame(video_card, bg="#0b1120", bd=0,
-                                   highlightthickness=1, highlightbackground="#1e293b")
-        video_container.pack()
-        self.video_label = tk.Label(video_container, bg="#0b1120")
-        self.video_label.pack(padx=4, pady=4)
+        rng = np.random.default_rng(seed)
+        self.centroids = templates[rng.choice(n, size=min(n_lists, n), replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._nearest_centroids(templates, 1)[:, 0]
+            for k in range(len(self.centroids)):
+                members = templates[assignment == k]
+                if len(members):
+                    self.centroids[k] = members.mean(axis=0)
 
-        # Right: side panel
-        side_frame = tk.Frame(main_frame, bg="#020617")
-        side_frame.grid(row=0, column=1, sticky="n", padx=(0, 16), pady=16)
+        assignment = self._nearest_centroids(templates, 1)[:, 0]
+        self.lists = [np.flatnonzero(assignment == k) for k in range(len(self.centroids))]
 
-        title = tk.Label(
-            side_frame,
-            text="Hand Gesture Lock & Control",
-            font=("Segoe UI", 16, "bold"),
-            fg="#e5e7eb",
-            bg="#020617"
+    def _nearest_centroids(self, queries, count):
+        d2 = (
+            (queries * queries).sum(axis=1)[:, None]
+            - 2.0 * queries @ self.centroids.T
+            + (self.centroids * self.centroids).sum(axis=1)[None, :]
         )
-        title.pack(anchor="w", pady=(0, 10))
+        count = min(count, len(self.centroids))
+        nearest = np.argpartition(d2, count - 1, axis=1)[:, :count]
+        return nearest
 
-        subtitle = tk.Label(
-            side_frame,
-            text="Unlock and control your computer using your hand.",
-            font=("Segoe UI", 10),
-            fg="#9ca3af",
-            bg="#020617"
-        )
-        subtitle.pack(anchor="w", pady=(0, 12))
+    def add(self, feature, index):
+        k = self._nearest_centroids(np.asarray(feature, dtype=np.float32)[None], 1)[0, 0]
+        self.lists[k] = np.append(self.lists[k], index)
 
-        status_card = tk.Frame(side_frame, bg="#0b1120", bd=0,
-                               highlightthickness=1, highlightbackground="#1e293b")
-        status_card.pack(anchor="w", fill="x", pady=(0, 10))
+    def candidates(self, feature, n_probe):
+        probes = self._nearest_centroids(np.asarray(feature, dtype=np.float32)[None], n_probe)[0]
+        return np.concatenate([self.lists[k] for k in probes])
 
-        self.lock_label = tk.Label(
-            status_card,
-            text="Lock: LOCKED",
-            font=("Segoe UI", 12, "bold"),
-            fg="#f97373",
-            bg="#0b1120"
-        )
-        self.lock_label.pack(anchor="w", padx=10, pady=(8, 0))
 
-        self.status_label = tk.Label(
-            status_card,
-            text="Status: Ready",
-            font=("Segoe UI", 10),
-            fg="#e5e7eb",
-            bg="#0b1120",
-            wraplength=260,
-            justify="left"
-        )
-        self.status_label.pack(anchor="w", padx=10, pady=(4, 10))
+class TemplateMatcher:
+    """
+    Scores features against every enrolled template in one matrix operation.
 
-        # Buttons
-        btn_frame = tk.Frame(side_frame, bg="#020617")
-        btn_frame.pack(anchor="w", pady=(4, 8))
+    Squared template norms are cached, so a query costs a single
+    matrix-vector product. Galleries above INDEX_MIN_TEMPLATES also get a
+    CoarseIndex so the cost stays flat as more templates are enrolled.
+    """
 
-        self.save_btn = ttk.Button(
-            btn_frame,
-            text="Save Hand",
-            style="Accent.TButton",
-            command=self.save_hand_template
-        )
-        self.save_btn.grid(row=0, column=0, padx=(0, 8), pady=4)
+    INDEX_MIN_TEMPLATES = 4096
 
-        self.gallery_btn = ttk.Button(
-            btn_frame,
-            text="Photos",
-            style="Ghost.TButton",
-            command=self.open_gallery
-        )
-        self.gallery_btn.grid(row=0, column=1, padx=(0, 8), pady=4)
+    def __init__(self, templates, labels, n_probe=4):
+        self.templates = np.asarray(templates, dtype=np.float32).reshape(-1, FEATURE_DIM)
+        self.labels = list(labels)
+        self.n_probe = n_probe
+        self.sq_norms = np.einsum("ij,ij->i", self.templates, self.templates)
+        self.index = None
+        if len(self.templates) >= self.INDEX_MIN_TEMPLATES:
+            self.index = CoarseIndex(self.templates)
 
-        self.quit_btn = ttk.Button(
-            btn_frame,
-            text="Quit",
-            style="Ghost.TButton",
-            command=self.on_close
-        )
-        self.quit_btn.grid(row=0, column=2, padx=(0, 0), pady=4)
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        return cls(store.templates, store.labels, **kwargs)
 
-        # Hover effect for buttons
-        for btn in (self.save_btn, self.gallery_btn, self.quit_btn):
-            btn.bind("<Enter>", self._on_button_enter)
-            btn.bind("<Leave>", self._on_button_leave)
-            btn.bind("<ButtonPress-1>", self._on_button_press)
-            btn.bind("<ButtonRelease-1>", self._on_button_release)
+    def __len__(self):
+        return len(self.templates)
 
-        instructions = (
-            "Workflow:\n"
-            "• Show your hand and click 'Save Hand' to enroll.\n"
-            "• When your hand is recognized, the lock unlocks automatically.\n\n"
-            "Gestures (when unlocked):\n"
-            "• 1 finger  → Open YouTube\n"
-            "• 2 fingers → 3s countdown → Take a photo\n"
-            "• 3 fingers → Copy (Ctrl + C)\n"
-            "• 4 fingers → Paste (Ctrl + V)\n"
-            "• Swipe right → left → Screenshot (saved)\n\n"
-            "Shortcuts:\n"
-            "• Q → Quit\n"
-            "• E → Save hand"
-        )
-        instr_label = tk.Label(
-            side_frame,
-            text=instructions,
-            font=("Segoe UI", 9),
-            fg="#9ca3af",
-            bg="#020617",
-            justify="left",
-            wraplength=280
+    def add(self, feature, label):
+        feature = np.asarray(feature, dtype=np.float32).reshape(1, FEATURE_DIM)
+        self.templates = np.vstack([self.templates, feature])
+        self.sq_norms = np.append(self.sq_norms, np.dot(feature[0], feature[0]))
+        self.labels.append(label)
+        if self.index is not None:
+            self.index.add(feature[0], len(self.templates) - 1)
+        elif len(self.templates) >= self.INDEX_MIN_TEMPLATES:
+            self.index = CoarseIndex(self.templates)
+
+    def distances(self, features, rows=None):
+        """(M, 42) features -> (M, N) Euclidean distances to the templates."""
+        queries = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        templates = self.templates if rows is None else self.templates[rows]
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        d2 = (
+            sq_norms[None, :]
+            - 2.0 * queries @ templates.T
+            + (queries * queries).sum(axis=1)[:, None]
         )
-        instr_label.pack(anchor="w", pady=(10, 0))
+        return np.sqrt(np.maximum(d2, 0.0))
 
-        # Window close event
-        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    def match(self, feature):
+        """Nearest template as a MatchResult, or None if nothing is enrolled."""
+        return self.match_batch(np.asarray(feature, dtype=np.float32)[None])[0]
 
-        # Keyboard shortcuts
-        self.root.bind("<KeyPress-e>", lambda e: self.save_hand_template())
-        self.root.bind("<KeyPress-q>", lambda e: self.on_close())
-        # Optional dev shortcut: re-lock
-        self.root.bind("<KeyPress-l>", lambda e: self._dev_relock())
+    def match_batch(self, features):
+        """
+        Nearest template for each row of an (M, 42) feature matrix, from a
+        single distance computation. With a coarse index the candidate lists
+        of all queries are merged, so extra hands add little work.
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        if not len(self.templates):
+            return [None] * len(features)
+        rows = None
+        if self.index is not None:
+            rows = np.unique(np.concatenate(
+                [self.index.candidates(feature, self.n_probe) for feature in features]
+            ))
+        dists = self.distances(features, rows)
+        best = np.argmin(dists, axis=1)
+        matches = []
+        for i, b in enumerate(best):
+            index = int(b) if rows is None else int(rows[b])
+            matches.append(MatchResult(self.labels[index], float(dists[i, b]), index))
+        return matches
 
-        # Start update loop
-        self.update_frame()
 
-    # ------------------ BUTTON ANIMATIONS ------------------
+# ==================== FRAME SOURCES ====================
 
-    def _on_button_enter(self, event):
-        btn = event.widget
-        btn.configure(cursor="hand2")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
 
-    def _on_button_leave(self, event):
-        btn = event.widget
-        btn.configure(cursor="")
+CAMERA_BACKENDS = {
+    "any": cv2.CAP_ANY,
+    "dshow": cv2.CAP_DSHOW,
+    "msmf": cv2.CAP_MSMF,
+    "v4l2": cv2.CAP_V4L2,
+    "avfoundation": cv2.CAP_AVFOUNDATION,
+    "gstreamer": cv2.CAP_GSTREAMER,
+}
 
-    def _on_button_press(self, event):
-        btn = event.widget
-        style_name = btn.cget("style") or "TButton"
-        self.style.configure(style_name, padding=(12, 5))
 
-    def _on_button_release(self, event):
-        btn = event.widget
-        style_name = btn.cget("style") or "TButton"
-        self.style.configure(style_name, padding=(14, 6))
+def default_camera_backend():
+    """Pick the capture backend that works best on the current platform."""
+    if sys.platform.startswith("win"):
+        return cv2.CAP_DSHOW
+    if sys.platform == "darwin":
+        return cv2.CAP_AVFOUNDATION
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
 
-    # ------------------ LOGIC METHODS ------------------
 
-    def save_hand_template(self):
-        if self.last_feature is not None:
-            self.hand_template = self.last_feature
-            np.save(self.TEMPLATE_PATH, self.hand_template)
-            self.set_status("Hand template saved.", important=True)
-            self.save_anim_frames = 20  # yellow highlight animation
-            print("[+] Hand template saved.")
-        else:
-            self.set_status("No hand detected. Cannot save template.", important=True)
-            print("[!] No hand detected. Cannot save template.")
+class FramePacer:
+    """Sleeps between frames so playback follows the source frame rate."""
 
-    def _dev_relock(self):
-        """Optional dev shortcut: re-lock without a visible button."""
-        self.is_locked = True
-        self.update_lock_label()
-        self.set_status("Lock enabled (dev shortcut).", important=True)
+    def __init__(self, fps, realtime=True):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.realtime = realtime
+        self._next_time = None
 
-    def update_lock_label(self):
-        if self.is_locked:
-            self.lock_label.config(text="Lock: LOCKED", fg="#f97373")  # red-ish
+    def wait(self):
+        if not self.realtime or self.interval <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_time is None or self._next_time < now:
+            # First frame, or we fell behind: don't burst to catch up
+            self._next_time = now
         else:
-            self.lock_label.config(text="Lock: UNLOCKED", fg="#4ade80")  # green
+            time.sleep(self._next_time - now)
+        self._next_time += self.interval
 
-    def set_status(self, text, important=False):
-        self.status_label.config(text=f"Status: {text}")
-        if important:
-            self.status_label.config(fg="#facc15")  # amber-400
-        else:
-            self.status_label.config(fg="#e5e7eb")
 
-    # ------------------ GALLERY WINDOW ------------------
+class FrameSource:
+    """
+    Base class for everything the app can read frames from.
 
-    def open_gallery(self):
-        files = [
-            f for f in os.listdir(self.photo_dir)
-            if f.lower().endswith((".png", ".jpg", ".jpeg"))
-        ]
-        files = sorted(
-            files,
-            key=lambda f: os.path.getmtime(os.path.join(self.photo_dir, f)),
-            reverse=True
-        )
+    Mirrors the small part of cv2.VideoCapture the app uses
+    (read / isOpened / release), so a source can replace the camera directly.
+    Subclasses implement _read_frame(); pacing is handled here. `frame` is an
+    optional preallocated buffer that sources may decode into.
+    """
 
-        win = tk.Toplevel(self.root)
-        win.title("Captured Photos")
-        win.configure(bg="#020617")
-
-        if not files:
-            msg = tk.Label(
-                win,
-                text="No photos captured yet.",
-                font=("Segoe UI", 10),
-                fg="#e5e7eb",
-                bg="#020617"
-            )
-            msg.pack(padx=20, pady=20)
-            return
+    fps = 30.0
+    live = False    # live sources never end; recorded ones do
+    on_unreadable = None    # callback(path) for a recorded frame that can't be decoded
 
-        canvas = tk.Canvas(win, bg="#020617", highlightthickness=0)
-        canvas.pack(side="left", fill="both", expand=True)
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self._pacer = None
 
-        scrollbar = ttk.Scrollbar(win, orient="vertical", command=canvas.yview)
-        scrollbar.pack(side="right", fill="y")
+    def read(self, frame=None):
+        if self._pacer is None:
+            self._pacer = FramePacer(self.fps, self.realtime)
+        ret, frame = self._read_frame(frame)
+        if ret:
+            self._pacer.wait()
+        return ret, frame
 
-        canvas.configure(yscrollcommand=scrollbar.set)
+    def _read_frame(self, frame=None):
+        raise NotImplementedError
 
-        inner = tk.Frame(canvas, bg="#020617")
-        canvas.create_window((0, 0), window=inner, anchor="nw")
+    def set_resolution(self, width, height):
+        """Ask for a new frame size; recorded sources keep their own."""
 
-        thumbs = []
-        max_per_row = 3
-        thumb_size = (180, 120)
+    def isOpened(self):
+        return True
 
-        for idx, fname in enumerate(files):
-            path = os.path.join(self.photo_dir, fname)
-            try:
-                img = Image.open(path)
-                img.thumbnail(thumb_size)
-                imgtk = ImageTk.PhotoImage(img)
-                thumbs.append(imgtk)
-                row = idx // max_per_row
-                col = idx % max_per_row
-                lbl = tk.Label(inner, image=imgtk, bg="#020617")
-                lbl.grid(row=row, column=col, padx=8, pady=8)
-            except Exception as e:
-                print("Error loading image:", path, e)
+    def release(self):
+        pass
 
-        inner.update_idletasks()
-        canvas.config(scrollregion=canvas.bbox("all"))
-        win.geometry("600x400")
 
-        # Keep reference to prevent GC
-        win.thumbs = thumbs
+class CameraSource(FrameSource):
+    """Live camera. The device paces itself, so no extra sleeping is done."""
 
-    # ------------------ MAIN FRAME UPDATE ------------------
+    live = True
 
-    def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            self.set_status("Failed to read from camera.", important=True)
-            self.root.after(30, self.update_frame)
-            return
+    def __init__(self, index=0, width=640, height=480, backend=None, buffer_size=1):
+        super().__init__(realtime=False)
+        if backend is None:
+            backend = default_camera_backend()
+        self.cap = cv2.VideoCapture(index, backend)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if buffer_size:
+            # Small driver buffer = fresher frames (not every backend honours it)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
 
-        frame = cv2.flip(frame, 1)
-        h, w, _ = frame.shape
+    def _read_frame(self, frame=None):
+        return self.cap.read(frame)
 
-        rgb_for_mp = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_for_mp)
+    def set_resolution(self, width, height):
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
 
-        # Base ROI rectangle
-        cv2.rectangle(frame, (100, 100), (540, 380), (30, 64, 175), 1)
+    def isOpened(self):
+        return self.cap.isOpened()
 
-        status_text = "Ready"
-        hand_center = None
+    def release(self):
+        self.cap.release()
 
-        if results.multi_hand_landmarks:
-            hand_landmarks = results.multi_hand_landmarks[0]
-            mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            landmarks = hand_landmarks.landmark
 
-            cx = int(landmarks[9].x * w)
-            cy = int(landmarks[9].y * h)
-            hand_center = (cx, cy)
+class VideoFileSource(FrameSource):
+    """Replays a recorded video file, optionally looping at the end."""
 
-            # Hand feature
-            current_feature = extract_hand_feature(landmarks)
-            self.last_feature = current_feature
+    def __init__(self, path, realtime=True, loop=False):
+        super().__init__(realtime=realtime)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
 
-            # ---- LOCK MODE ----
-            if self.is_locked:
-                if self.hand_template is not None:
-                    dist = np.linalg.norm(current_feature - self.hand_template)
-                    status_text = f"Hand distance: {dist:.3f}"
-                    # scanning pulse animation
-                    self.scan_phase = (self.scan_phase + 1) % 40
-                    radius = 40 + int(10 * math.sin(self.scan_phase * math.pi / 20))
-                    cv2.circle(frame, hand_center, radius, (56, 189, 248), 2)  # sky-400
-                    if dist < self.FEATURE_THRESHOLD:
-                        status_text = "Hand recognized → Lock unlocked"
-                        self.is_locked = False
-                        self.update_lock_label()
-                        self.unlock_anim_frames = 20  # green animation
-                else:
+    def _read_frame(self, frame=None):
+        ret, out = self.cap.read(frame)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, out = self.cap.read(frame)
+        return ret, out
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSequenceSource(FrameSource):
+    """Replays a directory of images in file-name order."""
+
+    def __init__(self, directory, fps=30.0, realtime=True, loop=False):
+        super().__init__(realtime=realtime)
+        self.fps = fps
+        self.loop = loop
+        self.files = sorted(
+            os.path.join(directory, f) for f in os.listdir(directory)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._index = 0
+
+    def _read_frame(self, frame=None):
+        while self.files:
+            if self._index >= len(self.files):
+                if not self.loop:
+                    return False, None
+                self._index = 0
+            path = self.files[self._index]
+            self._index += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                return True, frame
+            if self.on_unreadable is not None:
+                self.on_unreadable(path)
+        return False, None
+
+    def isOpened(self):
+        return bool(self.files)
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generates frames in memory: a gradient background with a moving blob.
+    Useful for throughput tests on machines without a camera or recordings.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, frames=None, realtime=True):
+        super().__init__(realtime=realtime)
+        self.fps = fps
+        self.frames = frames
+        self._count = 0
+        self.set_resolution(width, height)
+
+    def set_resolution(self, width, height):
+        self.width = width
+        self.height = height
+        ramp = np.linspace(20, 90, width, dtype=np.uint8)
+        background = np.empty((height, width, 3), dtype=np.uint8)
+        background[:] = ramp[None, :, None]
+        self._background = background
+
+    def _read_frame(self, frame=None):
+        if self.frames is not None and self._count >= self.frames:
+            return False, None
+        t = self._count / self.fps
+        self._count += 1
+
+        if frame is not None and frame.shape == self._background.shape:
+            np.copyto(frame, self._background)
+        else:
+            frame = self._background.copy()
+        cx = int(self.width / 2 + self.width / 3 * math.sin(t * 1.5))
+        cy = int(self.height / 2 + self.height / 4 * math.cos(t))
+        cv2.circle(frame, (cx, cy), 60, (120, 160, 210), -1)
+        return True, frame
+
+
+def open_frame_source(spec="camera", realtime=True, loop=False,
+                      width=640, height=480, camera_backend=None):
+    """
+    Build a frame source from a short spec string:
+
+      camera[:INDEX]       live camera (default: 0)
+      video:PATH           video file
+      images:DIR           directory of images
+      synthetic[:FRAMES]   generated frames (endless if FRAMES is omitted)
+
+    A bare path is treated as a video file or image directory.
+    """
+    kind, _, arg = spec.partition(":")
+    if kind not in ("camera", "video", "images", "synthetic"):
+        kind, arg = ("images" if os.path.isdir(spec) else "video"), spec
+
+    if kind == "camera":
+        backend = CAMERA_BACKENDS[camera_backend] if camera_backend else None
+        return CameraSource(int(arg or 0), width, height, backend=backend)
+    if kind == "video":
+        return VideoFileSource(arg, realtime=realtime, loop=loop)
+    if kind == "images":
+        return ImageSequenceSource(arg, realtime=realtime, loop=loop)
+    frames = int(arg) if arg else None
+    return SyntheticSource(width, height, frames=frames, realtime=realtime)
+
+
+# ==================== RUNTIME METRICS ====================
+
+def distribution_summary(values):
+    """count/mean/p50/p95/p99/max of a sequence of numbers."""
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "count": int(arr.size),
+        "mean": round(float(arr.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(arr.max()), 4),
+    }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges, rates and histograms for the running app.
+
+    Histograms keep the most recent `window` samples, so percentiles describe
+    current behaviour rather than the whole session. Rates (e.g. FPS) are
+    computed from event timestamps in the last `rate_window` seconds.
+    """
+
+    def __init__(self, window=1024, rate_window=2.0):
+        self.window = window
+        self.rate_window = rate_window
+        self.started = time.time()
+        self._counters = collections.Counter()
+        self._gauges = {}
+        self._gauge_fns = {}
+        self._histograms = {}
+        self._histogram_totals = collections.Counter()
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def set(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def gauge(self, name, fn):
+        """Register a callable evaluated on every snapshot."""
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def observe(self, name, value):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = collections.deque(maxlen=self.window)
+            hist.append(value)
+            self._histogram_totals[name] += 1
+
+    def tick(self, name, now=None):
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            events = self._rates.get(name)
+            if events is None:
+                events = self._rates[name] = collections.deque()
+            events.append(now)
+            while events and now - events[0] > self.rate_window:
+                events.popleft()
+
+    def rate(self, name):
+        with self._lock:
+            events = self._rates.get(name)
+            if not events or len(events) < 2:
+                return 0.0
+            now = time.perf_counter()
+            if now - events[-1] > self.rate_window:
+                return 0.0
+            return (len(events) - 1) / max(events[-1] - events[0], 1e-9)
+
+    def histogram(self, name):
+        with self._lock:
+            return list(self._histograms.get(name, ()))
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            gauge_fns = dict(self._gauge_fns)
+            histograms = {name: list(values) for name, values in self._histograms.items()}
+            totals = dict(self._histogram_totals)
+            rate_names = list(self._rates)
+
+        for name, fn in gauge_fns.items():
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+
+        hist_summary = {}
+        for name, values in histograms.items():
+            summary = distribution_summary(values)
+            summary["total"] = totals.get(name, 0)
+            hist_summary[name] = summary
+
+        return {
+            "time": round(time.time(), 3),
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": counters,
+            "gauges": gauges,
+            "rates": {name: round(self.rate(name), 2) for name in rate_names},
+            "histograms": hist_summary,
+        }
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint serving JSON (GET /metrics by default).
+    `routes` maps extra paths to callables returning JSON-serialisable data.
+    """
+
+    def __init__(self, registry, port, host="127.0.0.1", routes=None):
+        self.routes = {"/metrics": registry.snapshot}
+        self.routes.update(routes or {})
+        routes_ref = self.routes
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                handler = routes_ref.get(self.path.split("?")[0].rstrip("/") or "/metrics")
+                if handler is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(handler()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="hgl-metrics-http", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsDumper:
+    """Appends a metrics snapshot as one JSON line to `path` every `interval` seconds."""
+
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hgl-metrics-dump", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.registry.snapshot()) + "\n")
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(self.interval)
+        self.dump()
+
+
+# ==================== EVENT JOURNAL ====================
+
+class EventJournal:
+    """
+    Structured audit trail: one JSON line per event (unlocks, captures,
+    saved templates, failures), written by a background thread.
+
+    record() only appends a dict to an in-memory buffer, so the frame loop
+    never touches the file or the console. The writer wakes every
+    `flush_interval` seconds (sooner once `batch_size` records wait), writes
+    the batch with a single write(), and rotates the file at `max_bytes`,
+    keeping `backups` old files (PATH.1 is the newest). Records with a
+    `msg` are also echoed to the console from the writer thread. If the
+    writer falls `max_pending` records behind, the oldest are dropped.
+    `path` may be None for console output only.
+    """
+
+    def __init__(self, path=None, max_bytes=10 << 20, backups=5, flush_interval=0.25,
+                 batch_size=256, max_pending=65536, echo=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.echo = echo
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._pending = collections.deque(maxlen=max_pending)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._lock = threading.Lock()          # record(): drop check + append
+        self._flush_lock = threading.Lock()    # one flush at a time (writer, close)
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="hgl-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, type, msg=None, level="i", **fields):
+        """
+        Queue one event. `fields` must be JSON-serialisable; `msg` (with a
+        "+", "!" or "i" `level`) is what gets echoed to the console.
+        """
+        pending = self._pending
+        with self._lock:
+            if len(pending) == pending.maxlen:
+                self.dropped += 1
+            pending.append((time.time(), type, msg, level, fields))
+            waiting = len(pending)
+        if waiting >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything recorded so far (called by the writer thread and close())."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        pending = self._pending
+        while pending:
+            with self._lock:
+                batch = [pending.popleft() for _ in range(min(len(pending), self.batch_size))]
+            lines = []
+            for t, type, msg, level, fields in batch:
+                if msg is not None and self.echo:
+                    print(f"[{level}] {msg}")
+                record = {"t": round(t, 3), "type": type}
+                record.update(fields)
+                lines.append(json.dumps(record, default=str))
+            if self._file is None:
+                continue
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.written += len(lines)
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups, 0, -1):
+            source = f"{self.path}.{index - 1}" if index > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.rotations += 1
+
+    def stats(self):
+        return {"written": self.written, "pending": len(self._pending),
+                "dropped": self.dropped, "rotations": self.rotations}
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(2.0)
+        # The writer may still be in a slow write if the join timed out
+        with self._flush_lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def journal_files(path):
+    """A journal and its rotated files, oldest first."""
+    rotated = []
+    directory, name = os.path.split(path)
+    for entry in os.listdir(directory or "."):
+        suffix = entry[len(name) + 1:]
+        if entry.startswith(name + ".") and suffix.isdigit():
+            rotated.append((int(suffix), os.path.join(directory, entry)))
+    return [p for _, p in sorted(rotated, reverse=True)] + ([path] if os.path.exists(path) else [])
+
+
+def _last_event_time(path):
+    """Timestamp of the last complete line in a journal file (None if empty)."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            return json.loads(line)["t"]
+        except (ValueError, KeyError):
+            continue
+    return None
+
+
+def read_journal(path, start=None, end=None, types=None):
+    """
+    Yield journal records with start <= t < end (unix seconds) and, if
+    given, a type in `types`, across rotated files in time order. Files that
+    end before `start` are skipped without being parsed.
+    """
+    types = set(types) if types else None
+    for file_path in journal_files(path):
+        if start is not None:
+            last = _last_event_time(file_path)
+            if last is None or last < start:
+                continue
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue    # torn last line after a crash
+                t = record.get("t", 0)
+                if start is not None and t < start:
+                    continue
+                if end is not None and t >= end:
+                    return
+                if types is None or record.get("type") in types:
+                    yield record
+
+
+# ==================== MEMORY & SOAK TESTING ====================
+
+def process_rss_bytes():
+    """Resident set size of this process, or None where it can't be read."""
+    try:
+        import psutil    # optional; needed on Windows and macOS
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def open_handle_count():
+    """Open file descriptors (handles on Windows), or None where they can't be counted."""
+    try:
+        import psutil
+        process = psutil.Process()
+        return process.num_handles() if sys.platform.startswith("win") else process.num_fds()
+    except ImportError:
+        pass
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
+
+
+def _allocation_site(stat, diff=False):
+    frame = stat.traceback[0]
+    site = {"where": f"{frame.filename}:{frame.lineno}",
+            "size_kib": round(stat.size / 1024.0, 1), "count": stat.count}
+    if diff:
+        site["size_diff_kib"] = round(stat.size_diff / 1024.0, 1)
+        site["count_diff"] = stat.count_diff
+    return site
+
+
+class MemoryProbe:
+    """
+    Process memory and handle figures, for soak runs and for on-demand
+    snapshots in production (GET /memory on the metrics port).
+
+    Allocation sites need tracemalloc to be running (--tracemalloc). Tk
+    image counts must be read on the Tk thread, so the app feeds them in
+    with count_tk_images().
+    """
+
+    IGNORED = (tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"))
+
+    def __init__(self, top=10):
+        self.top = top
+        self.tk_images = None
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    def count_tk_images(self, root):
+        self.tk_images = len(root.tk.call("image", "names"))
+
+    def sample(self):
+        """Figures that are cheap enough to take every few seconds."""
+        return {
+            "t": round(time.time(), 3),
+            "rss_bytes": process_rss_bytes(),
+            "open_handles": open_handle_count(),
+            "threads": threading.active_count(),
+            "tk_images": self.tk_images,
+            "gc_objects": len(gc.get_objects()),
+            "traced_bytes": (tracemalloc.get_traced_memory()[0]
+                             if tracemalloc.is_tracing() else None),
+        }
+
+    def snapshot(self):
+        """
+        sample() plus the top allocation sites and, from the second call on,
+        the sites that grew most since the first one.
+        """
+        data = self.sample()
+        if not tracemalloc.is_tracing():
+            return data
+        snap = tracemalloc.take_snapshot().filter_traces(self.IGNORED)
+        data["top_allocators"] = [_allocation_site(stat)
+                                  for stat in snap.statistics("lineno")[:self.top]]
+        with self._lock:
+            baseline = self._baseline
+            if baseline is None:
+                self._baseline = snap
+        if baseline is not None:
+            data["top_growth"] = [_allocation_site(stat, diff=True)
+                                  for stat in snap.compare_to(baseline, "lineno")[:self.top]
+                                  if stat.size_diff > 0]
+        return data
+
+    def reset_baseline(self):
+        """Measure growth from the next snapshot() on (e.g. once startup is over)."""
+        with self._lock:
+            self._baseline = None
+
+
+# Smallest rise (last minus first window median) reported as growth, per series
+GROWTH_THRESHOLDS = {
+    "rss_bytes": 8 << 20,
+    "traced_bytes": 4 << 20,
+    "gc_objects": 10000,
+    "open_handles": 4,
+    "threads": 2,
+    "tk_images": 4,
+}
+
+
+def detect_growth(samples, windows=4, thresholds=GROWTH_THRESHOLDS):
+    """
+    Find series that keep growing. Samples (taken after warm-up) are split
+    into `windows` equal parts, and a series is flagged when each part's
+    median is higher than the previous one and the overall rise exceeds its
+    threshold. Medians ignore GC sawtooth; the per-hour slope comes from a
+    linear fit.
+    """
+    report = {}
+    for name, min_rise in thresholds.items():
+        points = [(s["t"], s[name]) for s in samples if s.get(name) is not None]
+        if len(points) < 2 * windows:
+            continue
+        t, values = np.asarray(points, dtype=np.float64).T
+        medians = [float(np.median(part)) for part in np.array_split(values, windows)]
+        rise = medians[-1] - medians[0]
+        hours = (t - t[0]) / 3600.0
+        slope = float(np.polyfit(hours, values, 1)[0]) if hours[-1] > 0 else 0.0
+        report[name] = {
+            "start": medians[0],
+            "end": medians[-1],
+            "rise": rise,
+            "per_hour": round(slope, 1),
+            "growing": rise >= min_rise and all(b > a for a, b in zip(medians, medians[1:])),
+        }
+    return report
+
+
+class SoakMonitor:
+    """
+    Samples a MemoryProbe every `interval` seconds and appends each sample
+    as a JSON line to `path`. Every `snapshot_every`-th sample is a full
+    snapshot with allocation sites. Runs on its own thread with start(), or
+    is driven from the Tk loop with sample(). report() summarises the run;
+    samples from the first `warmup` seconds (model loading, buffers and
+    caches filling up) are written but not analysed, and allocation growth
+    is measured from the end of the warm-up.
+    """
+
+    def __init__(self, probe, interval=60.0, path=None, snapshot_every=10, warmup=300.0):
+        self.probe = probe
+        self.interval = interval
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.warmup = warmup
+        self.samples = []
+        self.started = time.time()
+        self._warm = warmup <= 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="hgl-soak", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        full = self.snapshot_every and len(self.samples) % self.snapshot_every == 0
+        if not self._warm and time.time() - self.started >= self.warmup:
+            self._warm = True
+            self.probe.reset_baseline()
+            full = True    # becomes the baseline for top_growth
+        data = self.probe.snapshot() if full else self.probe.sample()
+        self.samples.append({k: v for k, v in data.items()
+                             if k not in ("top_allocators", "top_growth")})
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(data) + "\n")
+        return data
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(self.interval)
+        self.sample()
+
+    def report(self):
+        growth = detect_growth([s for s in self.samples
+                                if s["t"] >= self.started + self.warmup])
+        return {
+            "duration_s": round(time.time() - self.started, 1),
+            "samples": len(self.samples),
+            "growing": sorted(name for name, stats in growth.items() if stats["growing"]),
+            "growth": growth,
+            "first": self.samples[0] if self.samples else None,
+            "last": self.probe.snapshot(),
+        }
+
+
+# ==================== LANDMARK TRACES ====================
+
+# Handedness codes stored in traces
+HANDEDNESS_CODES = {"Left": 0, "Right": 1}
+HANDEDNESS_NAMES = {code: name for name, code in HANDEDNESS_CODES.items()}
+UNKNOWN_HANDEDNESS = 255
+
+
+def trace_record_dtype(max_hands):
+    """One fixed-size record per inferred frame; unused hand slots are zero."""
+    return np.dtype([
+        ("time", "<f8"),
+        ("hands", "u1"),
+        ("handedness", "u1", (max_hands,)),
+        ("score", "<f4", (max_hands,)),
+        ("landmarks", "<f4", (max_hands, 21, 3)),
+    ])
+
+
+class LandmarkTraceWriter:
+    """
+    Records MediaPipe hand results frame by frame, for replay without inference.
+
+    Same layout idea as TemplateStore: a 16-byte header (magic, version, hands
+    per record, frame width and height) followed by fixed-size records, so a
+    trace can be memory-mapped and a crash only loses the last partial record.
+    """
+
+    MAGIC = b"HGLR"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHHH4x")
+
+    def __init__(self, path, max_hands=2):
+        self.path = path
+        self.max_hands = max_hands
+        self.frames = 0
+        self._record = np.zeros(1, dtype=trace_record_dtype(max_hands))
+        self._file = None
+
+    def write(self, results, timestamp, width, height):
+        """Append one frame; the header is written with the first frame's size."""
+        if self._file is None:
+            self._file = open(self.path, "wb")
+            self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION,
+                                              self.max_hands, width, height))
+        record = self._record[0]
+        record["time"] = timestamp
+        record["handedness"] = UNKNOWN_HANDEDNESS
+        record["score"] = 0.0
+        record["landmarks"] = 0.0
+        hands = (results.multi_hand_landmarks or [])[:self.max_hands]
+        record["hands"] = len(hands)
+        for i, hand in enumerate(hands):
+            record["landmarks"][i] = landmarks_to_array(hand.landmark)
+        for i, handedness in enumerate((results.multi_handedness or [])[:len(hands)]):
+            best = handedness.classification[0]
+            record["handedness"][i] = HANDEDNESS_CODES.get(best.label, UNKNOWN_HANDEDNESS)
+            record["score"][i] = best.score
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LandmarkTrace:
+    """
+    A recorded trace, memory-mapped. frames() yields (timestamp, results)
+    pairs shaped like MediaPipe output, so the engine can't tell the difference.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        header = LandmarkTraceWriter.HEADER
+        with open(path, "rb") as f:
+            raw = f.read(header.size)
+        if len(raw) < header.size:
+            raise ValueError(f"{path}: truncated trace header")
+        magic, version, max_hands, width, height = header.unpack(raw)
+        if magic != LandmarkTraceWriter.MAGIC or version != LandmarkTraceWriter.VERSION:
+            raise ValueError(f"{path}: not a version {LandmarkTraceWriter.VERSION} landmark trace")
+        self.max_hands = max_hands
+        self.width = width
+        self.height = height
+
+        dtype = trace_record_dtype(max_hands)
+        rows = (os.path.getsize(path) - header.size) // dtype.itemsize
+        self.records = np.empty(0, dtype=dtype)
+        if rows:
+            self.records = np.memmap(path, dtype=dtype, mode="r",
+                                     offset=header.size, shape=(rows,))
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def duration(self):
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records["time"][-1] - self.records["time"][0])
+
+    def frames(self):
+        for record in self.records:
+            count = int(record["hands"])
+            yield float(record["time"]), results_from_arrays(
+                record["landmarks"][:count],
+                handedness=record["handedness"][:count],
+                scores=record["score"][:count],
+            )
+
+
+def replay_trace(trace, engine):
+    """
+    Run every frame of `trace` through `engine` as fast as possible, using the
+    recorded timestamps as the clock. Returns (events, seconds) where events are
+    JSON-ready dicts with the time since the trace started.
+    """
+    events = []
+    start_time = float(trace.records["time"][0]) if len(trace) else 0.0
+    started = time.perf_counter()
+    for timestamp, results in trace.frames():
+        result = engine.process(results, trace.width, trace.height, now=timestamp)
+        for event in result.events:
+            data = {k: round(v, 4) if isinstance(v, float) else v
+                    for k, v in event.data.items()}
+            events.append({"time": round(timestamp - start_time, 3),
+                           "type": event.type, **data})
+    return events, time.perf_counter() - started
+
+
+def compare_trace_events(events, expected, time_tolerance=0.1):
+    """Lines describing differences between two replay event lists (empty = same)."""
+    lines = []
+    for i in range(max(len(events), len(expected))):
+        got = events[i] if i < len(events) else None
+        want = expected[i] if i < len(expected) else None
+        if got is None or want is None:
+            lines.append(f"[!] event {i}: expected {want}, got {got}")
+            continue
+        same_kind = (got["type"] == want["type"]
+                     and got.get("name") == want.get("name")
+                     and got.get("label") == want.get("label"))
+        if not same_kind or abs(got["time"] - want["time"]) > time_tolerance:
+            lines.append(f"[!] event {i}: expected {want}, got {got}")
+    return lines
+
+
+# ==================== PERFORMANCE PROFILES ====================
+
+# Settings that trade accuracy and responsiveness against CPU, switched as a
+# group. model_complexity: 0 = lite landmark model, 1 = full. width/height is
+# the capture resolution (larger frames are scaled down for inference),
+# target_fps caps inference (0 = every frame) and overlays is one of
+# OVERLAY_LEVELS.
+PerformanceProfile = collections.namedtuple(
+    "PerformanceProfile",
+    ["name", "model_complexity", "detection_confidence", "tracking_confidence",
+     "width", "height", "target_fps", "overlays"],
+)
+
+# "full": landmarks of every hand, ROI and animations; "minimal": operator
+# landmarks and text; "none": only the countdown and capture flash.
+OVERLAY_LEVELS = ("full", "minimal", "none")
+
+PROFILES = {
+    "low-power": PerformanceProfile("low-power", 0, 0.7, 0.6, 320, 240, 15, "minimal"),
+    "balanced": PerformanceProfile("balanced", 1, 0.7, 0.5, 640, 480, 30, "full"),
+    "low-latency": PerformanceProfile("low-latency", 0, 0.6, 0.5, 640, 480, 0, "minimal"),
+}
+DEFAULT_PROFILE = "balanced"
+
+
+def model_settings(profile):
+    """The part of a profile that needs a new Hands instance when it changes."""
+    return (profile.model_complexity, profile.detection_confidence, profile.tracking_confidence)
+
+
+def load_profile_config(path):
+    """
+    Read a JSON config file:
+
+      {"profile": "NAME",
+       "profiles": {"NAME": {"base": "low-power", "target_fps": 10, ...}}}
+
+    Entries override fields of `base` (default: balanced) and may redefine
+    the built-in profiles. Returns (profiles, selected name or None).
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    profiles = dict(PROFILES)
+    for name, fields in config.get("profiles", {}).items():
+        fields = dict(fields)
+        fields.pop("name", None)
+        base = fields.pop("base", None) or (name if name in profiles else DEFAULT_PROFILE)
+        if base not in profiles:
+            raise ValueError(f"profile '{name}': unknown base '{base}' "
+                             f"(valid: {', '.join(sorted(profiles))})")
+        base = profiles[base]
+        unknown = set(fields) - set(PerformanceProfile._fields)
+        if unknown:
+            raise ValueError(f"profile '{name}': unknown setting(s) {', '.join(sorted(unknown))}")
+        if fields.get("overlays", base.overlays) not in OVERLAY_LEVELS:
+            raise ValueError(f"profile '{name}': overlays must be one of {', '.join(OVERLAY_LEVELS)}")
+        profiles[name] = base._replace(name=name, **fields)
+    return profiles, config.get("profile")
+
+
+# ==================== CAPTURE / INFERENCE PIPELINE ====================
+
+# One finished frame handed from the inference worker to the UI.
+# `frame` is the mirrored RGB image (shared by MediaPipe and the preview),
+# `idle` is True when the frame went through the idle (reduced) path and
+# `slot` is the pool buffer the frame lives in.
+FramePacket = collections.namedtuple(
+    "FramePacket", ["frame", "results", "captured_at", "inferred_at", "idle", "slot"]
+)
+
+# Stand-in for MediaPipe results on frames that were not inferred
+NO_HANDS = types.SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+
+
+def results_from_arrays(points, handedness=None, scores=None):
+    """
+    MediaPipe-results look-alike from an (N, 21, 3) landmark array, for
+    landmarks that arrive without MediaPipe objects (other processes, files).
+    Each hand's `.landmark` is an array, which landmarks_to_array passes through.
+    `handedness` holds HANDEDNESS_CODES values and `scores` their confidences.
+    """
+    if points is None or len(points) == 0:
+        return NO_HANDS
+    hands = [types.SimpleNamespace(landmark=p) for p in points]
+    classified = None
+    if handedness is not None:
+        scores = scores if scores is not None else [1.0] * len(points)
+        classified = [
+            types.SimpleNamespace(classification=[types.SimpleNamespace(
+                label=HANDEDNESS_NAMES.get(int(code), "Unknown"), score=float(score))])
+            for code, score in zip(handedness, scores)
+        ]
+    return types.SimpleNamespace(multi_hand_landmarks=hands, multi_handedness=classified)
+
+
+class FrameSlot:
+    """Preallocated buffers for one frame in flight: camera output and mirrored RGB."""
+
+    __slots__ = ("raw", "rgb")
+
+    def __init__(self):
+        self.raw = None
+        self.rgb = None
+
+    def ensure_rgb(self):
+        if self.rgb is None or self.rgb.shape != self.raw.shape:
+            self.rgb = np.empty_like(self.raw)
+        return self.rgb
+
+
+class BufferPool:
+    """
+    Recycles FrameSlots so the steady-state frame loop allocates no image memory.
+    Runs dry only if more frames are in flight than expected; a new slot is
+    created then, and at most `max_free` slots are kept.
+    """
+
+    def __init__(self, max_free=6):
+        self.max_free = max_free
+        self.created = 0
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            self.created += 1
+        return FrameSlot()
+
+    def release(self, slot):
+        if slot is None:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(slot)
+
+
+class LatestQueue:
+    """
+    Bounded queue that drops the oldest item instead of blocking the producer.
+    Consumers therefore always work on the freshest frames. `on_drop` is
+    called with every discarded item (e.g. to recycle its buffers).
+    Producers that must not lose items can put(block=True) instead.
+    """
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self._items = collections.deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item, block=False, timeout=None):
+        """
+        Add an item. When full, the oldest item is dropped, or with `block` the
+        call waits up to `timeout` seconds for room. Returns False if it timed
+        out without adding the item.
+        """
+        with self._cond:
+            if block:
+                if not self._cond.wait_for(
+                        lambda: len(self._items) < self._items.maxlen, timeout):
+                    return False
+            elif len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(self._items[0])
+            self._items.append(item)
+            self._cond.notify_all()
+        return True
+
+    def get(self, timeout=None):
+        """Pop the oldest item, waiting up to `timeout` seconds. Returns None if empty."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            self._cond.notify_all()    # wake a blocked put()
+            return self._items.popleft()
+
+    def get_latest(self):
+        """Pop the newest item without blocking, discarding anything older."""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            if self.on_drop is not None:
+                for stale in self._items:
+                    self.on_drop(stale)
+            self._items.clear()
+            self._cond.notify_all()
+            return item
+
+
+class MotionGate:
+    """
+    Cheap motion check: mean absolute difference between consecutive frames,
+    both shrunk to a tiny grayscale thumbnail first.
+    """
+
+    def __init__(self, size=(64, 48), threshold=3.0):
+        self.size = size
+        self.threshold = threshold
+        self.last_score = 0.0
+        self._prev = None
+
+    def update(self, frame):
+        """Returns True if this frame differs enough from the previous one."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        prev, self._prev = self._prev, gray
+        if prev is None:
+            return True
+        self.last_score = float(cv2.absdiff(gray, prev).mean())
+        return self.last_score > self.threshold
+
+
+class IdleController:
+    """
+    Decides for each frame whether (and at what resolution) to run MediaPipe.
+
+    Active: every frame is inferred at full resolution. After `idle_after`
+    seconds without a hand (motion or not), the controller goes idle:
+    inference runs at most `idle_fps` times a second on a frame scaled by
+    `idle_scale`. Motion only wakes it up: a moving frame is checked at full
+    resolution straight away (at most every WAKE_CHECK_INTERVAL seconds), and
+    a detected hand switches back to active. CPU time is tracked per mode so
+    the savings can be reported.
+    """
+
+    WAKE_CHECK_INTERVAL = 0.2    # s; a scene that never stops moving can't keep it busy
+
+    def __init__(self, idle_after=5.0, idle_fps=2.0, idle_scale=0.5, motion_gate=None):
+        self.idle_after = idle_after
+        self.idle_interval = 1.0 / idle_fps if idle_fps > 0 else float("inf")
+        self.idle_scale = idle_scale
+        self.motion_gate = motion_gate or MotionGate()
+
+        self.idle = False
+        self.last_activity = time.time()
+        self._last_idle_inference = 0.0
+        self._last_wake_check = 0.0
+        self._wake_started = None
+        self._last_clock = None
+
+        self.frames = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.wake_latencies = []
+        # mode -> [wall seconds, cpu seconds]
+        self._usage = {"active": [0.0, 0.0], "idle": [0.0, 0.0]}
+
+    def plan(self, frame, captured_at):
+        """Returns (infer, scale) for this frame."""
+        self._account()
+        self.frames += 1
+        motion = self.motion_gate.update(frame)
+
+        if self.idle:
+            if motion and captured_at - self._last_wake_check >= self.WAKE_CHECK_INTERVAL:
+                # Look for a hand at full size now; only a hand ends idle mode
+                self._last_wake_check = captured_at
+                self._wake_started = captured_at
+                return True, 1.0
+            if captured_at - self._last_idle_inference >= self.idle_interval:
+                self._last_idle_inference = captured_at
+                return True, self.idle_scale
+            self.skipped += 1
+            return False, None
+
+        if captured_at - self.last_activity >= self.idle_after:
+            self.idle = True
+            self.skipped += 1
+            return False, None
+        return True, 1.0
+
+    def observe(self, hand_found, captured_at, scale):
+        """Feed back the inference result for a frame that `plan` let through."""
+        self.inferred += 1
+        if hand_found:
+            self.last_activity = captured_at
+            if self.idle:
+                self.idle = False
+                if self._wake_started is None:
+                    self._wake_started = captured_at
+        elif self.idle:
+            self._wake_started = None    # motion without a hand: stay idle
+        if self._wake_started is not None and scale == 1.0 and not self.idle:
+            self.wake_latencies.append(time.time() - self._wake_started)
+            self._wake_started = None
+
+    def _account(self):
+        clock = (time.perf_counter(), time.process_time())
+        if self._last_clock is not None:
+            usage = self._usage["idle" if self.idle else "active"]
+            usage[0] += clock[0] - self._last_clock[0]
+            usage[1] += clock[1] - self._last_clock[1]
+        self._last_clock = clock
+
+    def stats(self):
+        def cpu_percent(mode):
+            wall, cpu = self._usage[mode]
+            return round(100.0 * cpu / wall, 1) if wall > 0 else None
+
+        active_cpu = cpu_percent("active")
+        idle_cpu = cpu_percent("idle")
+        savings = None
+        if active_cpu and idle_cpu is not None:
+            savings = round(100.0 * (active_cpu - idle_cpu) / active_cpu, 1)
+        wake = latency_summary(self.wake_latencies) if self.wake_latencies else {}
+        return {
+            "mode": "idle" if self.idle else "active",
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "active_seconds": round(self._usage["active"][0], 1),
+            "idle_seconds": round(self._usage["idle"][0], 1),
+            "active_cpu_percent": active_cpu,
+            "idle_cpu_percent": idle_cpu,
+            "cpu_savings_percent": savings,
+            "wake_latency": wake,
+        }
+
+
+# The on-screen ROI rectangle, normalised (x0, y0, x1, y1); drawn at
+# (100, 100)-(540, 380) on a 640x480 frame.
+BASE_ROI = (100 / 640, 100 / 480, 540 / 640, 380 / 480)
+
+# ROI tracking settings: crop side after resizing (px), padding around the
+# landmark box (fraction of its size), frames between full re-detections, and
+# optional normalised bounds that limit all inference (e.g. BASE_ROI).
+RoiOptions = collections.namedtuple(
+    "RoiOptions", ["input_size", "padding", "redetect_every", "bounds"]
+)
+
+
+def create_crop_hands(max_hands=2, profile=None, input_size=256):
+    """
+    Crop models for a RoiTracker: one single-hand, tracking-mode Hands per
+    hand, warmed up on a blank crop.
+    """
+    models = [create_hands(1, profile=profile) for _ in range(max_hands)]
+    blank = np.zeros((input_size, input_size, 3), dtype=np.uint8)
+    for model in models:
+        model.process(blank)
+    return models
+
+
+class RoiTracker:
+    """
+    Runs Hands on crops around the hands instead of the whole frame.
+
+    After a detection, every hand found gets its own crop on the next frames:
+    a padded square around its previous landmarks, scaled to `input_size`.
+    Landmarks are mapped back to full-frame coordinates in place, so everything
+    downstream (engine, drawing, traces) is unchanged. The full frame (or
+    `bounds`) is searched again on the frame after a hand is lost and every
+    `redetect_every` frames, which is also when new hands can appear.
+
+    Each crop goes to its own model from `crop_hands` (see create_crop_hands).
+    The crop follows its hand, so the hand hardly moves inside it and the
+    model keeps tracking with the landmark model alone. A full-frame model
+    with room for more hands than it sees runs palm detection every frame.
+    When a crop jumps further than tracking can follow (or its slot gets
+    another hand), its model is re-seeded with a blank frame, so the next
+    inference starts from a palm detection instead of stale landmarks; so is
+    `hands` before a full-frame search that follows crops.
+    """
+
+    MIN_SIDE = 64       # px; smaller crops lose too much detail
+    MAX_SHIFT = 0.25    # crop edge movement tracking still follows, fraction of its side
+
+    def __init__(self, hands, crop_hands, options, metrics=None):
+        self.hands = hands
+        self.crop_hands = list(crop_hands)
+        self.options = options
+        self.metrics = metrics or MetricsRegistry()
+        self.boxes = []          # normalised regions inferred for the latest frame
+        self._hand_boxes = []    # normalised bounding box of each hand's last landmarks
+        self._tracked = [None] * len(self.crop_hands)    # crop each model last found a hand in
+        self._blank = np.zeros((options.input_size, options.input_size, 3), dtype=np.uint8)
+        self._since_full = 0
+        self._full_stale = False    # crops ran since `hands` last tracked a hand
+
+    def reset(self):
+        self._hand_boxes = []
+        self.boxes = []
+
+    def set_hands(self, hands, crop_hands):
+        """Switch to new models (e.g. another profile); closes the old crop models."""
+        old, self.hands, self.crop_hands = self.crop_hands, hands, list(crop_hands)
+        for model in old:
+            model.close()
+        self._tracked = [None] * len(self.crop_hands)
+        self.reset()
+
+    def close(self):
+        for model in self.crop_hands:
+            model.close()
+        self.crop_hands = []
+
+    def process(self, rgb, scale=1.0):
+        """Hands results for `rgb`; full-frame searches run at `scale`."""
+        if self._hand_boxes and self._since_full < self.options.redetect_every:
+            self._full_stale = True
+            return self._process_crops(rgb)
+
+        if self._full_stale:
+            # Its landmarks are frames old; without this it only looks where they were
+            self.hands.process(self._blank)
+            self.metrics.inc("roi.reseeds")
+            self._full_stale = False
+        self._since_full = 0
+        self.metrics.inc("roi.full_frames")
+        box = self.options.bounds or (0.0, 0.0, 1.0, 1.0)
+        results = self._infer(self.hands, rgb, box, scale=scale)
+        self.boxes = [box] if results.multi_hand_landmarks else []
+        self._update(results.multi_hand_landmarks)
+        return results
+
+    def _process_crops(self, rgb):
+        height, width = rgb.shape[:2]
+        landmarks, handedness, boxes = [], [], []
+        for slot, hand_box in enumerate(self._hand_boxes):
+            model = self.crop_hands[slot]
+            box = self._crop_box(hand_box, width, height)
+            if self._jumped(self._tracked[slot], box):
+                model.process(self._blank)
+                self.metrics.inc("roi.reseeds")
+            results = self._infer(model, rgb, box, size=self.options.input_size)
+            boxes.append(box)
+            if results.multi_hand_landmarks:
+                self._tracked[slot] = box
+                landmarks.append(results.multi_hand_landmarks[0])
+                handedness.extend((results.multi_handedness or [])[:1])
+            else:
+                self._tracked[slot] = None    # nothing tracked: it detects next time anyway
+
+        self.boxes = boxes
+        results = types.SimpleNamespace(multi_hand_landmarks=landmarks or None,
+                                        multi_handedness=handedness or None)
+        if len(landmarks) < len(self._hand_boxes):
+            # No second inference in this frame; the next one searches the full frame
+            self.metrics.inc("roi.track_lost")
+            self.reset()
+        else:
+            self._since_full += 1
+            self.metrics.inc("roi.crop_frames")
+            self._update(landmarks)
+        return results
+
+    def _jumped(self, tracked, box):
+        """True if a model that tracked a hand in crop `tracked` can't follow it to `box`."""
+        if tracked is None:
+            return False
+        x0, y0, x1, y1 = tracked
+        return (max(abs(box[0] - x0), abs(box[2] - x1)) > self.MAX_SHIFT * (x1 - x0)
+                or max(abs(box[1] - y0), abs(box[3] - y1)) > self.MAX_SHIFT * (y1 - y0))
+
+    def _crop_box(self, hand_box, width, height):
+        """Padded square (in pixels) around a hand box, kept inside the bounds."""
+        x0, y0, x1, y1 = hand_box
+        bx0, by0, bx1, by1 = self.options.bounds or (0.0, 0.0, 1.0, 1.0)
+        side = max((x1 - x0) * width, (y1 - y0) * height) * (1.0 + 2.0 * self.options.padding)
+        side = min(max(side, self.MIN_SIDE), (bx1 - bx0) * width, (by1 - by0) * height)
+        cx = (x0 + x1) / 2.0 * width
+        cy = (y0 + y1) / 2.0 * height
+        left = min(max(cx - side / 2.0, bx0 * width), bx1 * width - side)
+        top = min(max(cy - side / 2.0, by0 * height), by1 * height - side)
+        return (left / width, top / height, (left + side) / width, (top + side) / height)
+
+    def _infer(self, hands, rgb, box, size=None, scale=1.0):
+        """
+        Run `hands` on `box` of the frame, resized so its longer side is
+        `size` px (or by `scale`), with landmarks mapped back to the frame.
+        """
+        height, width = rgb.shape[:2]
+        x0, y0 = int(box[0] * width), int(box[1] * height)
+        x1, y1 = int(round(box[2] * width)), int(round(box[3] * height))
+        crop = rgb[y0:y1, x0:x1]
+        crop_w, crop_h = x1 - x0, y1 - y0
+        if size is not None:
+            scale = size / max(crop_w, crop_h)
+        if scale != 1.0:
+            crop = cv2.resize(crop, (max(1, round(crop_w * scale)), max(1, round(crop_h * scale))),
+                              interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        results = hands.process(np.ascontiguousarray(crop))
+        if (x0, y0, x1, y1) == (0, 0, width, height):
+            return results
+
+        # Crop-normalised -> frame-normalised, in place on the MediaPipe landmarks
+        sx, sy = crop_w / width, crop_h / height
+        ox, oy = x0 / width, y0 / height
+        for hand in results.multi_hand_landmarks or ():
+            for lm in hand.landmark:
+                lm.x = ox + lm.x * sx
+                lm.y = oy + lm.y * sy
+                lm.z = lm.z * sx
+        return results
+
+    def _update(self, landmarks):
+        """Remember each hand's landmark box for the next frame's crops."""
+        self._hand_boxes = []
+        for hand in (landmarks or ())[:len(self.crop_hands)]:
+            points = landmarks_to_array(hand.landmark)
+            self._hand_boxes.append((float(points[:, 0].min()), float(points[:, 1].min()),
+                                     float(points[:, 0].max()), float(points[:, 1].max())))
+
+
+class FramePipeline:
+    """
+    Capture thread -> inference thread -> UI.
+
+    The capture thread only reads frames, the inference thread mirrors them
+    and converts them to RGB once (shared by MediaPipe and the preview), and
+    the UI picks up the latest finished packet. Both queues hold a single
+    frame by default, so latency is bounded by one inference. Frames live in
+    pooled buffers; the UI hands them back with release() when it is done.
+    Recorded sources are not dropped from: their frames wait for room in the
+    queues, so every frame is inferred and done() tells when all are out.
+    With an IdleController, static scenes skip inference or use a reduced rate.
+    A PerformanceProfile caps the inference rate and input size, and can be
+    changed while running with set_profile(). The pipeline owns `hands` and
+    every model it builds: each is closed when replaced or on stop(). Problems
+    found off the UI thread (unreadable frames) are counted in the metrics and
+    recorded in `journal`.
+    """
+
+    def __init__(self, cap, hands, queue_size=1, idle=None, metrics=None, trace=None,
+                 precapture=None, roi=None, profile=None, max_hands=2, journal=None):
+        self.cap = cap
+        self.hands = hands    # owned from here on
+        self.profile = profile
+        self.max_hands = max_hands
+        self.trace = trace    # optional LandmarkTraceWriter, fed from the inference thread
+        self.precapture = precapture    # optional PreCaptureBuffer of clean frames
+        self.idle = idle
+        self.metrics = metrics or MetricsRegistry()
+        self.journal = journal
+        if isinstance(cap, FrameSource):
+            cap.on_unreadable = self._unreadable_frame
+        # Optional RoiOptions: infer on a crop around the hand once it is found
+        self.roi = None
+        if roi is not None:
+            self.roi = RoiTracker(hands, create_crop_hands(max_hands, profile, roi.input_size),
+                                  roi, self.metrics)
+        self.pool = BufferPool()
+        self.capture_queue = LatestQueue(
+            queue_size, on_drop=lambda item: self.pool.release(item[0])
+        )
+        self.result_queue = LatestQueue(queue_size, on_drop=self.release)
+        self.read_failed = False
+        self.finished = False    # a recorded source reached its end
+        self._drained = False    # ... and the inference thread has taken every frame
+
+        self.metrics.gauge("frames.dropped_before_inference", lambda: self.capture_queue.dropped)
+        self.metrics.gauge("frames.stale_not_displayed", lambda: self.result_queue.dropped)
+        self.metrics.gauge("buffers.allocated", lambda: self.pool.created)
+        if idle is not None:
+            self.metrics.gauge("idle", idle.stats)
+
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._hands_settings = model_settings(profile) if profile is not None else None
+        self._generation = 0
+        self._pending_hands = None    # (hands, crop hands, settings) built for a new profile
+        self._capture_size = (profile.width, profile.height) if profile is not None else None
+        self._last_inference = 0.0
+        self._load_error = None    # last failed background model load, until taken
+
+    def start(self):
+        for name, target in (("capture", self._capture_loop),
+                             ("inference", self._inference_loop)):
+            thread = threading.Thread(target=target, name=f"hgl-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.trace is not None:
+            self.trace.close()
+        with self._lock:
+            self._generation += 1    # drop models still being built
+            pending, self._pending_hands = self._pending_hands, None
+        if pending is not None:
+            self._close_models(pending)
+        hands, self.hands = self.hands, None
+        if hands is not None:
+            hands.close()
+        if self.roi is not None:
+            self.roi.close()
+
+    def _unreadable_frame(self, path):
+        """Capture thread: a recorded frame was skipped."""
+        self.metrics.inc("frames.unreadable")
+        if self.journal is not None:
+            self.journal.record("frame_unreadable", f"Skipping unreadable image: {path}", "!",
+                                path=path)
+
+    def set_profile(self, profile):
+        """
+        Switch to another PerformanceProfile while running. Pacing, input size
+        and the camera resolution change with the next frame; if the model
+        settings differ, a new Hands is built and warmed up in the background
+        and swapped in between frames, so inference never stalls on it.
+        """
+        with self._lock:
+            self.profile = profile
+            self._generation += 1
+            generation = self._generation
+            if model_settings(profile) == self._hands_settings:
+                self._pending_hands = None
+                return
+        threading.Thread(target=self._build_hands, args=(profile, generation),
+                         name="hgl-profile", daemon=True).start()
+
+    def _build_hands(self, profile, generation):
+        started = time.perf_counter()
+        hands = crop_hands = None
+        try:
+            hands = create_hands(self.max_hands, profile=profile)
+            hands.process(np.zeros((profile.height, profile.width, 3), dtype=np.uint8))
+            if self.roi is not None:
+                crop_hands = create_crop_hands(self.max_hands, profile,
+                                               self.roi.options.input_size)
+        except Exception as e:
+            if hands is not None:
+                hands.close()
+            message = f"Could not load the model for profile '{profile.name}': {e}"
+            self.metrics.inc("profile.load_failures")
+            if self.journal is not None:
+                self.journal.record("profile_failed", message, "!", profile=profile.name,
+                                    error=str(e))
+            with self._lock:
+                self._load_error = message
+            return
+        built = (hands, crop_hands, model_settings(profile))
+        with self._lock:
+            current = generation == self._generation
+            if current:
+                stale, self._pending_hands = self._pending_hands, built
+        if not current:
+            self._close_models(built)
+            return
+        if stale is not None:
+            self._close_models(stale)
+        self.metrics.set("profile.switch_ms", round((time.perf_counter() - started) * 1000.0, 1))
+
+    def take_load_error(self):
+        """Message of the last failed background model load (once), or None."""
+        with self._lock:
+            error, self._load_error = self._load_error, None
+        return error
+
+    def _swap_hands(self):
+        """Inference thread: start using a model finished by _build_hands()."""
+        with self._lock:
+            pending, self._pending_hands = self._pending_hands, None
+        if pending is None:
+            return
+        old, (self.hands, crop_hands, self._hands_settings) = self.hands, pending
+        if self.roi is not None:
+            self.roi.set_hands(self.hands, crop_hands)
+        old.close()
+
+    @staticmethod
+    def _close_models(built):
+        hands, crop_hands, _ = built
+        hands.close()
+        for model in crop_hands or ():
+            model.close()
+
+    def latest(self):
+        """Newest finished FramePacket, or None if nothing new arrived."""
+        return self.result_queue.get_latest()
+
+    def get(self, timeout=None):
+        """Wait up to `timeout` seconds for the next finished FramePacket (or None)."""
+        return self.result_queue.get(timeout)
+
+    def release(self, packet):
+        """Return a packet's buffers to the pool once the UI is done with it."""
+        self.pool.release(packet.slot)
+
+    def done(self):
+        """True once a recorded source has ended and every packet was picked up."""
+        return self._drained and not len(self.result_queue)
+
+    def _hand_over(self, queue, item, discard):
+        """Queue `item`; for recorded sources wait for room instead of dropping."""
+        if getattr(self.cap, "live", True):
+            queue.put(item)
+            return
+        while not queue.put(item, block=True, timeout=0.1):
+            if self._stop_event.is_set():
+                discard(item)
+                return
+
+    def _capture_loop(self):
+        while not self._stop_event.is_set():
+            profile = self.profile
+            if profile is not None and (profile.width, profile.height) != self._capture_size:
+                self._capture_size = (profile.width, profile.height)
+                self.cap.set_resolution(profile.width, profile.height)
+            slot = self.pool.acquire()
+            ret, frame = self.cap.read(slot.raw)
+            if not ret:
+                self.pool.release(slot)
+                self.read_failed = True
+                if not getattr(self.cap, "live", True):
+                    self.finished = True
+                    return
+                self.metrics.inc("frames.read_failures")
+                time.sleep(0.03)
+                continue
+            self.read_failed = False
+            slot.raw = frame    # sources that can't decode in place return a new array
+            self.metrics.tick("capture_fps")
+            self.metrics.inc("frames.captured")
+            self._hand_over(self.capture_queue, (slot, time.time()),
+                            lambda item: self.pool.release(item[0]))
+
+    def _inference_loop(self):
+        while not self._stop_event.is_set():
+            item = self.capture_queue.get(timeout=0.1)
+            if item is None:
+                if self.finished and not len(self.capture_queue):
+                    self._drained = True
+                continue
+            slot, captured_at = item
+            if self._pending_hands is not None:
+                self._swap_hands()
+            profile = self.profile
+            if profile is not None and profile.target_fps:
+                if not getattr(self.cap, "live", True):
+                    # Recorded sources never skip frames: slow playback down to the
+                    # profile's rate instead. --fast (unpaced) playback isn't capped.
+                    if getattr(self.cap, "realtime", True):
+                        self._stop_event.wait(self._last_inference + 1.0 / profile.target_fps
+                                              - time.time())
+                        self._last_inference = time.time()
+                # Drop frames above the profile's rate (10% slack for jitter)
+                elif captured_at - self._last_inference < 0.9 / profile.target_fps:
+                    self.pool.release(slot)
+                    self.metrics.inc("frames.paced_out")
+                    continue
+                else:
+                    self._last_inference = captured_at
+            started = time.perf_counter()
+            self.metrics.observe("stage.queue_wait_ms", (time.time() - captured_at) * 1000.0)
+
+            # Mirror + BGR->RGB into the slot's own buffer, no new allocations
+            rgb = slot.ensure_rgb()
+            cv2.flip(slot.raw, 1, dst=rgb)
+            cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB, dst=rgb)
+            converted = time.perf_counter()
+            self.metrics.observe("stage.convert_ms", (converted - started) * 1000.0)
+            if self.precapture is not None:
+                # Copied before the UI draws on the frame
+                self.precapture.push(rgb, captured_at)
+                converted = time.perf_counter()
+
+            infer, scale = True, 1.0
+            if self.idle is not None:
+                infer, scale = self.idle.plan(slot.raw, captured_at)
+
+            results = NO_HANDS
+            if infer:
+                fit = 1.0
+                if profile is not None:
+                    # Frames larger than the profile's input size (recordings,
+                    # cameras that ignore the request) are scaled down too
+                    height, width = rgb.shape[:2]
+                    fit = min(1.0, profile.width / width, profile.height / height)
+                if self.roi is not None and scale == 1.0:
+                    results = self.roi.process(rgb, fit)
+                else:
+                    if self.roi is not None:
+                        self.roi.reset()
+                    small = rgb
+                    if scale * fit != 1.0:
+                        # Landmarks are normalised, so they still map onto `rgb`
+                        small = cv2.resize(rgb, None, fx=scale * fit, fy=scale * fit,
+                                           interpolation=cv2.INTER_AREA)
+                    results = self.hands.process(small)
+                self.metrics.observe("stage.hands_process_ms",
+                                     (time.perf_counter() - converted) * 1000.0)
+                if self.trace is not None:
+                    self.trace.write(results, captured_at, rgb.shape[1], rgb.shape[0])
+                self.metrics.tick("inference_fps")
+                if self.idle is not None:
+                    self.idle.observe(bool(results.multi_hand_landmarks), captured_at, scale)
+
+            is_idle = self.idle is not None and self.idle.idle
+            self._hand_over(
+                self.result_queue,
+                FramePacket(rgb, results, captured_at, time.time(), is_idle, slot),
+                self.release,
+            )
+
+
+class PreviewRenderer:
+    """
+    Turns RGB frames into the Tk preview through one persistent PhotoImage.
+
+    Frames already at preview size are shown as-is; others are resized into a
+    preallocated buffer. The PhotoImage is updated in place with paste()
+    instead of being rebuilt every frame.
+    """
+
+    def __init__(self, size=(640, 480), master=None):
+        self.size = size
+        self.master = master
+        self.photo = None
+        self._buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+
+    def fit(self, frame_rgb, copy=False):
+        """
+        `frame_rgb` at preview size. A frame already at that size is returned
+        as-is, unless `copy` is set: then it is copied into the buffer, so the
+        result is always safe to draw on.
+        """
+        h, w = frame_rgb.shape[:2]
+        if (w, h) == self.size:
+            if not copy:
+                return frame_rgb
+            np.copyto(self._buffer, frame_rgb)
+            return self._buffer
+        return cv2.resize(frame_rgb, self.size, dst=self._buffer,
+                          interpolation=cv2.INTER_AREA)
+
+    def render(self, frame_rgb):
+        """Show a frame. Returns the PhotoImage (the same object every call)."""
+        img = Image.fromarray(self.fit(frame_rgb))
+        if self.photo is None:
+            from PIL import ImageTk    # needs Tk; imported here so headless use works
+            self.photo = ImageTk.PhotoImage(image=img, master=self.master)
+        else:
+            self.photo.paste(img)
+        return self.photo
+
+
+def startup_elapsed_ms():
+    """Milliseconds since the process started importing this module."""
+    return (time.perf_counter() - PROCESS_START) * 1000.0
+
+
+class StartupLoader:
+    """
+    Loads the hand model and opens the frame source on two background
+    threads, so a window can be shown while they start up.
+
+    The model gets one warm-up inference on a blank frame: MediaPipe sets up
+    its graph lazily, and paying for that here keeps it off the first real
+    frame. Timings are recorded as startup.* metrics.
+    """
+
+    def __init__(self, open_source, max_hands=2, metrics=None, warmup_size=(640, 480),
+                 profile=None):
+        self.open_source = open_source
+        self.max_hands = max_hands
+        self.profile = profile
+        self.metrics = metrics or MetricsRegistry()
+        self.warmup_size = warmup_size
+        self.source = None
+        self.hands = None
+        self.error = None
+        self._taken = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for name, target in (("model", self._load_model), ("source", self._open)):
+            thread = threading.Thread(target=self._run, args=(target,),
+                                      name=f"hgl-startup-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _run(self, target):
+        try:
+            target()
+        except Exception as e:
+            with self._lock:
+                if self.error is None:
+                    self.error = e
+        with self._lock:
+            abandoned = self._closed and not self._taken
+        if abandoned:
+            self._release()
+
+    def _load_model(self):
+        started = time.perf_counter()
+        hands = create_hands(self.max_hands, profile=self.profile)
+        loaded = time.perf_counter()
+        width, height = self.warmup_size
+        hands.process(np.zeros((height, width, 3), dtype=np.uint8))
+        self.metrics.set("startup.model_load_ms", round((loaded - started) * 1000.0, 1))
+        self.metrics.set("startup.warmup_inference_ms",
+                         round((time.perf_counter() - loaded) * 1000.0, 1))
+        self.hands = hands
+
+    def _open(self):
+        started = time.perf_counter()
+        source = self.open_source()
+        self.metrics.set("startup.source_open_ms",
+                         round((time.perf_counter() - started) * 1000.0, 1))
+        self.source = source
+        if not source.isOpened():
+            raise RuntimeError("Frame source could not be opened.")
+
+    def ready(self):
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.time(), 0.0))
+        return self.ready()
+
+    def take(self):
+        """(source, hands) once ready() and error is None; the caller owns them."""
+        with self._lock:
+            self._taken = True
+        return self.source, self.hands
+
+    def close(self):
+        """Release whatever was loaded but never taken, now or when it finishes."""
+        with self._lock:
+            self._closed = True
+            abandoned = not self._taken
+        if abandoned and self.ready():
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            source, hands = self.source, self.hands
+            self.source = self.hands = None
+        if hands is not None:
+            hands.close()
+        if source is not None:
+            source.release()
+
+
+# ==================== BACKGROUND ACTIONS ====================
+
+class ActionResult(collections.namedtuple(
+        "ActionResult",
+        ["name", "ok", "value", "error", "queued_at", "started_at", "finished_at"])):
+    """Outcome and timing of one background action."""
+
+    __slots__ = ()
+
+    @property
+    def wait_time(self):
+        return self.started_at - self.queued_at
+
+    @property
+    def run_time(self):
+        return self.finished_at - self.started_at
+
+
+class ActionExecutor:
+    """
+    Runs gesture actions (screenshots, photos, hotkeys, browser) on worker
+    threads so a slow disk or browser launch never stalls the frame loop.
+
+    The queue is bounded: when it is full, submit() refuses the action instead
+    of letting work pile up. Finished actions wait in a completion queue until
+    poll() hands them to their callbacks on the caller's (Tk) thread.
+    """
+
+    def __init__(self, workers=2, max_pending=4, metrics=None):
+        self._pending = queue.Queue(max_pending)
+        self._done = queue.Queue()
+        self.metrics = metrics
+        # name -> recent run times in seconds
+        self.timings = collections.defaultdict(lambda: collections.deque(maxlen=1024))
+        self.rejected = 0
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"hgl-action-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, name, func, *args, on_done=None):
+        """Queue func(*args). Returns False if the queue is full."""
+        try:
+            self._pending.put_nowait((name, func, args, on_done, time.time()))
+        except queue.Full:
+            self.rejected += 1
+            if self.metrics is not None:
+                self.metrics.inc("actions.rejected")
+            return False
+        return True
+
+    def _worker(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            name, func, args, on_done, queued_at = item
+            started_at = time.time()
+            try:
+                value, error = func(*args), None
+            except Exception as e:
+                value, error = None, e
+            result = ActionResult(name, error is None, value, error,
+                                  queued_at, started_at, time.time())
+            self._done.put((result, on_done))
+
+    def poll(self):
+        """Run callbacks of finished actions. Call this from the UI thread."""
+        count = 0
+        while True:
+            try:
+                result, on_done = self._done.get_nowait()
+            except queue.Empty:
+                return count
+            self.timings[result.name].append(result.run_time)
+            if self.metrics is not None:
+                # Gesture-to-action: from dispatch (gesture time) to completion
+                self.metrics.observe(f"action.{result.name}_ms",
+                                     (result.finished_at - result.queued_at) * 1000.0)
+                self.metrics.inc("actions.failed" if not result.ok else "actions.completed")
+            if on_done is not None:
+                on_done(result)
+            count += 1
+
+    def shutdown(self, timeout=2.0):
+        """Let queued actions finish (up to `timeout` seconds per worker)."""
+        for _ in self._threads:
+            try:
+                self._pending.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.poll()
+
+    def stats(self):
+        stats = {name: latency_summary(values) for name, values in self.timings.items()}
+        stats["rejected"] = self.rejected
+        return stats
+
+
+# ==================== CAPTURE OUTPUT ====================
+
+# Output format and its quality (JPEG/WebP, 0-100) or compression (PNG, 0-9)
+CaptureFormat = collections.namedtuple("CaptureFormat", ["name", "level"])
+
+CAPTURE_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp", "npy": ".npy"}
+CAPTURE_DEFAULT_LEVELS = {"png": 3, "jpeg": 90, "webp": 80, "npy": None}
+
+
+def parse_capture_format(spec):
+    """'png', 'png:1', 'jpeg:85', 'webp:70', 'npy' (or 'raw') -> CaptureFormat."""
+    name, _, level = spec.lower().partition(":")
+    name = {"jpg": "jpeg", "raw": "npy"}.get(name, name)
+    if name not in CAPTURE_EXTENSIONS:
+        raise ValueError(f"Unknown capture format: {spec!r}")
+    return CaptureFormat(name, int(level) if level else CAPTURE_DEFAULT_LEVELS[name])
+
+
+def encode_and_write(path, image, fmt):
+    """
+    Encode a BGR image and write it atomically (temp file + rename).
+    Runs in a worker process, so it only touches its arguments.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            if fmt.name == "npy":
+                np.save(f, image)
+            else:
+                params = {
+                    "png": [cv2.IMWRITE_PNG_COMPRESSION, fmt.level],
+                    "jpeg": [cv2.IMWRITE_JPEG_QUALITY, fmt.level],
+                    "webp": [cv2.IMWRITE_WEBP_QUALITY, fmt.level],
+                }[fmt.name]
+                ok, encoded = cv2.imencode(CAPTURE_EXTENSIONS[fmt.name], image, params)
+                if not ok:
+                    raise IOError(f"Could not encode {path}")
+                f.write(encoded)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def sharpness_score(frame):
+    """Cheap focus measure: Laplacian variance of a quarter-size grey copy."""
+    small = cv2.resize(frame, None, fx=0.25, fy=0.25, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+class PreCaptureBuffer:
+    """
+    The last few clean (unannotated) RGB frames with their capture times.
+
+    The inference thread copies each frame in before anything is drawn on it,
+    into preallocated slots. Photos then pick a frame by time instead of
+    taking whatever frame is current when the countdown ends. Readers always
+    get copies, so slots can be overwritten right away.
+    """
+
+    def __init__(self, capacity=15):
+        self.capacity = capacity
+        self.frames = [None] * capacity
+        self.times = np.full(capacity, -np.inf)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def push(self, frame, timestamp):
+        with self._lock:
+            slot = self.frames[self._next]
+            if slot is None or slot.shape != frame.shape:
+                slot = self.frames[self._next] = np.empty_like(frame)
+            np.copyto(slot, frame)
+            self.times[self._next] = timestamp
+            self._next = (self._next + 1) % self.capacity
+
+    def closest(self, target):
+        """(timestamp, frame) nearest to `target`, or None if empty."""
+        with self._lock:
+            if not np.isfinite(self.times).any():
+                return None
+            i = int(np.argmin(np.abs(self.times - target)))
+            return float(self.times[i]), self.frames[i].copy()
+
+    def between(self, start, end):
+        """(timestamp, frame) pairs captured in [start, end], oldest first."""
+        with self._lock:
+            picked = [i for i in np.argsort(self.times)
+                      if start <= self.times[i] <= end]
+            return [(float(self.times[i]), self.frames[i].copy()) for i in picked]
+
+    def sharpest(self, start, end):
+        """Least blurry frame in [start, end], falling back to the one closest to `end`."""
+        shots = self.between(start, end)
+        if not shots:
+            return self.closest(end)
+        return max(shots, key=lambda shot: sharpness_score(shot[1]))
+
+    def latest(self, count, end):
+        """Up to `count` most recent frames captured at or before `end`, oldest first."""
+        return self.between(-np.inf, end)[-count:]
+
+
+# How photos are picked from a PreCaptureBuffer: "closest" to the countdown end,
+# or "sharpest" within `window` seconds before it; `burst` > 1 saves that many
+# of the latest frames instead. `buffer_frames` = 0 turns pre-capture off.
+PhotoOptions = collections.namedtuple("PhotoOptions", ["mode", "window", "burst", "buffer_frames"])
+DEFAULT_PHOTO_OPTIONS = PhotoOptions("closest", 0.3, 1, 15)
+
+
+def save_precaptured(writer, precapture, paths, target, options):
+    """Executor job: choose frame(s) near `target` and save them. Returns the path(s)."""
+    if len(paths) > 1:
+        shots = precapture.latest(len(paths), target)
+    elif options.mode == "sharpest":
+        shots = [precapture.sharpest(target - options.window, target)]
+    else:
+        shots = [precapture.closest(target)]
+    shots = [shot for shot in shots if shot is not None]
+    if not shots:
+        raise RuntimeError("no pre-captured frames")
+    futures = [writer.write("photo", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR), path)
+               for (_, frame), path in zip(shots, paths)]
+    saved = [future.result() for future in futures]
+    return saved if len(paths) > 1 else saved[0]
+
+
+class CaptureWriter:
+    """
+    Saves photos and screenshots.
+
+    Each kind of capture has its own format, so a deployment can trade
+    encode speed against file size. Encoding runs in a process pool (started
+    on first use) and file names are unique per process, even within a second.
+    """
+
+    def __init__(self, formats=None, workers=None):
+        self.formats = {"photo": parse_capture_format("png"),
+                        "screenshot": parse_capture_format("png")}
+        self.formats.update(formats or {})
+        self.workers = workers or min(2, os.cpu_count() or 1)
+        self._pool = None
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_path(self, kind, directory):
+        now = datetime.datetime.now()
+        with self._lock:
+            n = next(self._counter)
+        name = (f"{kind}_{now.strftime('%Y%m%d_%H%M%S')}_{now.microsecond:06d}"
+                f"_{os.getpid()}_{n:04d}{CAPTURE_EXTENSIONS[self.formats[kind].name]}")
+        return os.path.join(directory, name)
+
+    def start(self):
+        """Start the pool now, so the first capture doesn't pay for process startup."""
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs camera and Tk threads is unsafe
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pool.submit(os.getpid)
+        return self._pool
+
+    def write(self, kind, image, path):
+        """Encode `image` (BGR) in the pool. Returns a Future resolving to `path`."""
+        return self.start().submit(encode_and_write, path, image, self.formats[kind])
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+class ScreenshotProvider:
+    """
+    Where screenshots come from. grab() returns a BGR array of the configured
+    `monitor` (index, backend-specific; None = everything) and optional
+    `region` (left, top, width, height) relative to it.
+    """
+
+    name = "base"
+
+    def __init__(self, monitor=None, region=None):
+        self.monitor = monitor
+        self.region = region
+
+    def grab(self):
+        raise NotImplementedError
+
+    def monitors(self):
+        """(left, top, width, height) of each monitor the backend knows."""
+        return []
+
+
+class PyAutoGuiScreenshots(ScreenshotProvider):
+    """
+    pyautogui/Pillow: portable, but grabs through a full-size PIL image.
+    It only knows the primary monitor (1); selecting it turns into a region.
+    """
+
+    name = "pyautogui"
+
+    def __init__(self, monitor=None, region=None):
+        if monitor not in (None, 0, 1):
+            raise ValueError(f"The pyautogui backend can only capture monitor 1, not {monitor}; "
+                             "use --screenshot-backend mss for other monitors")
+        super().__init__(monitor, region)
+
+    def grab(self):
+        import pyautogui
+        region = self.region
+        if self.monitor == 1:
+            left, top, width, height = self.monitors()[0]
+            if region is not None:
+                x, y, width, height = region
+                left, top = left + x, top + y
+            region = (left, top, width, height)
+        screenshot = pyautogui.screenshot(region=region)
+        return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR)
+
+    def monitors(self):
+        import pyautogui
+        width, height = pyautogui.size()
+        return [(0, 0, width, height)]
+
+
+class MssScreenshots(ScreenshotProvider):
+    """
+    The optional `mss` package: native X11 (XShm) / Win32 / Quartz capture,
+    with real per-monitor support. Monitor 0 is the whole virtual screen,
+    1.. are the physical monitors.
+    """
+
+    name = "mss"
+
+    def __init__(self, monitor=None, region=None):
+        super().__init__(monitor, region)
+        import mss    # optional dependency; fails here, not on first screenshot
+        self._mss = mss
+        # mss handles are bound to the thread that opened them (X11)
+        self._local = threading.local()
+
+    def _handle(self):
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            handle = self._local.handle = self._mss.mss()
+        return handle
+
+    def grab(self):
+        handle = self._handle()
+        monitor = dict(handle.monitors[self.monitor or 0])
+        if self.region is not None:
+            left, top, width, height = self.region
+            monitor = {"left": monitor["left"] + left, "top": monitor["top"] + top,
+                       "width": width, "height": height}
+        shot = handle.grab(monitor)
+        return cv2.cvtColor(np.asarray(shot), cv2.COLOR_BGRA2BGR)
+
+    def monitors(self):
+        return [(m["left"], m["top"], m["width"], m["height"])
+                for m in self._handle().monitors[1:]]
+
+
+class FakeScreenshots(ScreenshotProvider):
+    """In-memory screen for tests and headless benchmarks; no display needed."""
+
+    name = "fake"
+
+    def __init__(self, monitor=None, region=None, size=(1920, 1080), count=2):
+        super().__init__(monitor, region)
+        width, height = size
+        self._monitors = [(i * width, 0, width, height) for i in range(count)]
+        ramp = np.linspace(0, 255, width * count, dtype=np.uint8)
+        self._screen = np.empty((height, width * count, 3), dtype=np.uint8)
+        self._screen[:] = ramp[None, :, None]
+
+    def grab(self):
+        left, top = 0, 0
+        width, height = self._screen.shape[1], self._screen.shape[0]
+        if self.monitor:
+            left, top, width, height = self._monitors[self.monitor - 1]
+        if self.region is not None:
+            x, y, width, height = self.region
+            left, top = left + x, top + y
+        return self._screen[top:top + height, left:left + width].copy()
+
+    def monitors(self):
+        return list(self._monitors)
+
+
+SCREENSHOT_BACKENDS = {
+    "pyautogui": PyAutoGuiScreenshots,
+    "mss": MssScreenshots,
+    "fake": FakeScreenshots,
+}
+
+
+def parse_region(spec):
+    """'X,Y,W,H' -> (x, y, w, h) ints, or None for an empty spec."""
+    if not spec:
+        return None
+    parts = [int(p) for p in spec.split(",")]
+    if len(parts) != 4 or parts[2] <= 0 or parts[3] <= 0:
+        raise ValueError(f"Region must be X,Y,W,H with a positive size: {spec!r}")
+    return tuple(parts)
+
+
+def open_screenshot_provider(backend="auto", monitor=None, region=None):
+    """Build a ScreenshotProvider; "auto" prefers mss and falls back to pyautogui."""
+    if backend == "auto":
+        try:
+            return MssScreenshots(monitor, region)
+        except ImportError:
+            return PyAutoGuiScreenshots(monitor, region)
+    if backend not in SCREENSHOT_BACKENDS:
+        raise ValueError(f"Unknown screenshot backend: {backend!r}")
+    return SCREENSHOT_BACKENDS[backend](monitor, region)
+
+
+# The first action pays for these imports, in the executor, not at startup
+
+def open_youtube():
+    import webbrowser
+    return webbrowser.open("https://www.youtube.com")
+
+
+def press_copy():
+    import pyautogui
+    pyautogui.hotkey('ctrl', 'c')
+
+
+def press_paste():
+    import pyautogui
+    pyautogui.hotkey('ctrl', 'v')
+
+
+def take_screenshot(writer, path, provider=None):
+    image = (provider or PyAutoGuiScreenshots()).grab()
+    return writer.write("screenshot", image, path).result()
+
+
+def save_photo(writer, path, frame):
+    return writer.write("photo", frame, path).result()
+
+
+# ==================== GESTURE ENGINE (NO GUI) ====================
+
+# Something the engine decided; the host (GUI, daemon, scripts) reacts to it.
+#   unlock -> data: label, distance
+#   action -> data: name ("youtube", "copy", "paste", "screenshot", "photo");
+#             photos also carry "target", the wall-clock time the countdown ended
+GestureEvent = collections.namedtuple("GestureEvent", ["type", "data"])
+
+# Engine output for one frame. `landmarks` are the MediaPipe landmarks of the
+# primary hand (the operator, or the best match while locked), `countdown` the
+# photo countdown in whole seconds, `hands` every TrackedHand in view and
+# `operator` the track ID of the hand allowed to issue gestures.
+EngineResult = collections.namedtuple(
+    "EngineResult",
+    ["status", "locked", "hand_center", "landmarks", "fingers", "match",
+     "countdown", "events", "hands", "operator"]
+)
+
+
+# Finger count -> (action name, status text). Two fingers start the photo countdown.
+FINGER_ACTIONS = {
+    1: ("youtube", "1 finger → Opening YouTube"),
+    3: ("copy", "3 fingers → Copy (Ctrl+C)"),
+    4: ("paste", "4 fingers → Paste (Ctrl+V)"),
+}
+
+
+class GestureRecognizer:
+    """
+    Swipe and finger-hold detection from a ring buffer of timestamped hand
+    positions. Distances are in normalised image units (1.0 = frame width),
+    speeds in units per second and cooldowns in wall-clock seconds, so the
+    thresholds hold at any frame rate.
+    """
+
+    def __init__(self, history=64, swipe_window=0.25, swipe_distance=0.15,
+                 swipe_speed=0.8, cooldown=1.0, debounce=0.15):
+        self.swipe_window = swipe_window      # seconds a swipe may take
+        self.swipe_distance = swipe_distance  # leftward travel within that window
+        self.swipe_speed = swipe_speed        # minimum average speed over it
+        self.cooldown = cooldown              # seconds between two actions
+        self.debounce = debounce              # seconds a finger count must be held
+
+        self.times = np.zeros(history, dtype=np.float64)
+        self.positions = np.zeros((history, 2), dtype=np.float32)
+        self.count = 0
+        self.head = 0     # next write index
+        self.cooldown_until = 0.0
+        self._fingers = None
+        self._fingers_since = 0.0
+
+    def add(self, now, position, fingers=None):
+        self.times[self.head] = now
+        self.positions[self.head] = position
+        self.head = (self.head + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+        if fingers != self._fingers:
+            self._fingers = fingers
+            self._fingers_since = now
+
+    def reset(self):
+        """Forget the motion history (hand lost or changed); the cooldown stays."""
+        self.count = 0
+        self._fingers = None
+
+    def window(self, seconds, now):
+        """(times, positions) of the samples from the last `seconds`, oldest first."""
+        order = (self.head - self.count + np.arange(self.count)) % len(self.times)
+        times = self.times[order]
+        keep = times >= now - seconds
+        return times[keep], self.positions[order][keep]
+
+    def velocity(self, now, seconds=None):
+        """Average (vx, vy) in units per second over the last `seconds`."""
+        times, positions = self.window(seconds or self.swipe_window, now)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0, 0.0
+        vx, vy = (positions[-1] - positions[0]) / (times[-1] - times[0])
+        return float(vx), float(vy)
+
+    def swipe(self, now):
+        """'left' when the hand travelled far and fast enough to the left, else None."""
+        times, positions = self.window(self.swipe_window, now)
+        if len(times) < 2:
+            return None
+        # Furthest point to the right within the window -> latest position
+        start = int(np.argmax(positions[:, 0]))
+        travelled = positions[start, 0] - positions[-1, 0]
+        elapsed = times[-1] - times[start]
+        if travelled < self.swipe_distance or elapsed <= 0:
+            return None
+        if travelled / elapsed < self.swipe_speed:
+            return None
+        self.reset()    # one motion, one swipe
+        return "left"
+
+    def stable_fingers(self, now):
+        """The finger count once it has been held for `debounce` seconds, else None."""
+        if self._fingers is None or now - self._fingers_since < self.debounce:
+            return None
+        return self._fingers
+
+    def ready(self, now):
+        return now >= self.cooldown_until
+
+    def trigger(self, now):
+        """An action fired: start the cooldown."""
+        self.cooldown_until = now + self.cooldown
+
+
+class TrackedHand:
+    """One hand followed across frames by HandTracker; fields are from its latest frame."""
+
+    def __init__(self, track_id, position, now):
+        self.id = track_id
+        self.position = position    # normalised (x, y) of the middle-finger MCP
+        self.last_seen = now
+        self.landmarks = None       # MediaPipe landmarks, for drawing
+        self.feature = None
+        self.center = None          # pixel position
+        self.fingers = None
+        self.match = None           # set on frames where the hand was matched
+
+
+class HandTracker:
+    """
+    Keeps hand IDs stable across frames.
+
+    Detections are paired with existing tracks nearest-first, as long as the
+    hand moved less than `max_jump` (normalised image units) since it was last
+    seen; the rest start new tracks. Tracks unseen for `max_age` seconds are
+    forgotten.
+    """
+
+    def __init__(self, max_jump=0.2, max_age=0.5):
+        self.max_jump = max_jump
+        self.max_age = max_age
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, points, now):
+        """(N, 21, 3) landmarks -> the N TrackedHands, in detection order."""
+        positions = np.asarray(points, dtype=np.float32)[:, MIDDLE_MCP, :2]
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+        hands = [None] * len(positions)
+
+        if self.tracks and len(positions):
+            previous = np.array([t.position for t in self.tracks], dtype=np.float32)
+            dists = np.linalg.norm(previous[:, None, :] - positions[None, :, :], axis=2)
+            used = set()
+            for flat in np.argsort(dists, axis=None):
+                t, d = divmod(int(flat), len(positions))
+                if dists[t, d] > self.max_jump:
+                    break
+                if t not in used and hands[d] is None:
+                    used.add(t)
+                    hands[d] = self.tracks[t]
+
+        for d, position in enumerate(positions):
+            if hands[d] is None:
+                hands[d] = TrackedHand(next(self._ids), position, now)
+                self.tracks.append(hands[d])
+            hands[d].position = position
+            hands[d].last_seen = now
+        return hands
+
+    def reset(self):
+        self.tracks = []
+
+
+class GestureEngine:
+    """
+    Lock, matching, finger-count and swipe logic without any GUI.
+
+    Feed it MediaPipe results frame by frame with process(); it returns an
+    EngineResult with the status and any events. Executing actions and drawing
+    is left to the caller, so the same engine drives the Tk app, the headless
+    daemon and scripts.
+
+    Every detected hand is tracked; the hand that unlocked becomes the operator
+    and only its gestures count, so another hand in view can't take over.
+    """
+
+    def __init__(self, store, matcher=None, threshold=0.12, metrics=None, recognizer=None):
+        self.store = store
+        self.matcher = matcher or TemplateMatcher.from_store(store)
+        self.threshold = threshold
+        self.metrics = metrics or MetricsRegistry()
+        self.tracker = HandTracker()
+        # Swipes, finger holds and cooldowns, all timed on the wall clock
+        self.recognizer = recognizer or GestureRecognizer()
+
+        self.PHOTO_COUNTDOWN = 3.0  # seconds
+
+        self.is_locked = True          # starts locked
+        self.operator_id = None        # track ID of the hand that unlocked
+        self.last_feature = None
+        self.photo_countdown_active = False
+        self.photo_countdown_end_time = 0.0
+
+    def lock(self):
+        self.is_locked = True
+        self.operator_id = None
+
+    def enroll(self, label):
+        """Save the last seen hand as a template for `label`. Returns False if none."""
+        if self.last_feature is None:
+            return False
+        self.store.append(self.last_feature, label)
+        self.matcher.add(self.last_feature, label)
+        return True
+
+    def _best_match(self, hands):
+        """Match all hands in one batch; returns the closest one."""
+        matches = self.matcher.match_batch([hand.feature for hand in hands])
+        for hand, match in zip(hands, matches):
+            hand.match = match
+            self.metrics.observe("match_distance", match.distance)
+        return min(hands, key=lambda hand: hand.match.distance)
+
+    def process(self, results, width, height, now=None, idle=False):
+        now = time.time() if now is None else now
+        events = []
+        status_text = "Ready"
+        hand_center = None
+        hand_landmarks = None
+        total_fingers = None
+        match = None
+        countdown = None
+        hands = []
+
+        if results.multi_hand_landmarks:
+            detected = results.multi_hand_landmarks
+            # One (N, 21, 3) array; every helper below handles all hands at once
+            points = np.stack([landmarks_to_array(h.landmark) for h in detected])
+            features = extract_hand_features_batch(points)
+            centers = hand_centers_batch(points, width, height)
+            fingers = count_fingers_batch(points)
+
+            hands = self.tracker.update(points, now)
+            for i, hand in enumerate(hands):
+                hand.landmarks = detected[i]
+                hand.feature = features[i]
+                hand.center = (int(centers[i][0]), int(centers[i][1]))
+                hand.fingers = int(fingers[i])
+                hand.match = None
+
+            operator = next((h for h in hands if h.id == self.operator_id), None)
+            primary = operator or hands[0]
+
+            # ---- LOCK MODE ----
+            if self.is_locked or operator is None:
+                if len(self.matcher):
+                    primary = self._best_match(hands)
+                    match = primary.match
+                    if self.is_locked:
+                        status_text = f"Hand distance: {match.distance:.3f} ({match.label})"
+                    else:
+                        status_text = "Unlocked: waiting for the enrolled hand"
+                    if match.distance < self.threshold:
+                        operator = primary
+                        self.operator_id = primary.id
+                        if self.is_locked:
+                            status_text = f"Hand recognized ({match.label}) → Lock unlocked"
+                            self.is_locked = False
+                            events.append(GestureEvent(
+                                "unlock", {"label": match.label, "distance": match.distance}
+                            ))
+                        else:
+                            status_text = f"Operator hand back ({match.label})"
+                    self.recognizer.reset()
+                else:
                     status_text = "No enrolled hand. Click 'Save Hand'."
-                    # subtle pulsing to indicate "waiting"
-                    self.scan_phase = (self.scan_phase + 1) % 40
-                    base_radius = 30 + int(6 * math.sin(self.scan_phase * math.pi / 20))
-                    if hand_center:
-                        cv2.circle(frame, hand_center, base_radius, (148, 163, 184), 1)  # gray-ish
             else:
-                # ---- UNLOCKED: GESTURE COMMANDS ----
+                # ---- UNLOCKED: GESTURE COMMANDS (operator hand only) ----
+                recognizer = self.recognizer
+                total_fingers = operator.fingers
+                recognizer.add(now, operator.position, total_fingers)
+
+                if recognizer.ready(now) and not self.photo_countdown_active:
+                    # Swipe: right to left -> screenshot
+                    if recognizer.swipe(now) == "left":
+                        events.append(GestureEvent("action", {"name": "screenshot"}))
+                        status_text = "Swipe left → Taking screenshot..."
+                        recognizer.trigger(now)
+                    else:
+                        # Finger count commands, once the count is held steadily
+                        fingers = recognizer.stable_fingers(now)
+                        # Start countdown for photo when 2 fingers shown
+                        if fingers == 2:
+                            self.photo_countdown_active = True
+                            self.photo_countdown_end_time = now + self.PHOTO_COUNTDOWN
+                            status_text = "2 fingers → Photo in 3 seconds..."
+                        elif fingers in FINGER_ACTIONS:
+                            name, status_text = FINGER_ACTIONS[fingers]
+                            events.append(GestureEvent("action", {"name": name}))
+                            recognizer.trigger(now)
+
+            self.last_feature = primary.feature
+            hand_center = primary.center
+            hand_landmarks = primary.landmarks
+
+        else:
+            self.recognizer.reset()
+            status_text = "Idle: waiting for motion" if idle else "No hand detected"
+
+        # Handle photo countdown
+        if self.photo_countdown_active:
+            remaining = self.photo_countdown_end_time - now
+            if remaining > 0:
+                countdown = int(math.ceil(remaining))
+                status_text = f"Taking photo in {countdown}..."
+            else:
+                # Time is up: capture photo
+                events.append(GestureEvent(
+                    "action", {"name": "photo", "target": self.photo_countdown_end_time}
+                ))
+                self.recognizer.trigger(now)
+                self.photo_countdown_active = False
+                status_text = "Saving photo..."
+
+        return EngineResult(status_text, self.is_locked, hand_center, hand_landmarks,
+                            total_fingers, match, countdown, events, hands, self.operator_id)
+
+
+class GestureActions:
+    """
+    Turns engine action events into background jobs.
+    Shared by the Tk app and the daemon.
+    """
+
+    SIMPLE_ACTIONS = {
+        "youtube": open_youtube,
+        "copy": press_copy,
+        "paste": press_paste,
+    }
+
+    def __init__(self, executor, capture, photo_dir="photos", screenshot_dir="screenshots",
+                 precapture=None, photo=DEFAULT_PHOTO_OPTIONS, screenshots=None):
+        self.executor = executor
+        self.capture = capture
+        self.screenshots = screenshots or PyAutoGuiScreenshots()
+        self.precapture = precapture
+        self.photo = photo
+        self.photo_dir = photo_dir
+        self.screenshot_dir = screenshot_dir
+        os.makedirs(photo_dir, exist_ok=True)
+        os.makedirs(screenshot_dir, exist_ok=True)
+
+    def dispatch(self, name, frame_rgb=None, on_done=None, target=None):
+        """
+        Queue action `name`. False if dropped. Photos come from the pre-capture
+        buffer (picked around `target`) when there is one, else from the clean
+        RGB `frame_rgb`.
+        """
+        if name == "screenshot":
+            path = self.capture.next_path("screenshot", self.screenshot_dir)
+            return self.executor.submit(name, take_screenshot, self.capture, path,
+                                        self.screenshots, on_done=on_done)
+        if name == "photo" and self.precapture is not None:
+            paths = [self.capture.next_path("photo", self.photo_dir)
+                     for _ in range(max(1, self.photo.burst))]
+            return self.executor.submit(name, save_precaptured, self.capture, self.precapture,
+                                        paths, target or time.time(), self.photo,
+                                        on_done=on_done)
+        if name == "photo":
+            path = self.capture.next_path("photo", self.photo_dir)
+            # New BGR array: the frame buffer goes back to the pool afterwards
+            photo = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+            return self.executor.submit(name, save_photo, self.capture, path, photo,
+                                        on_done=on_done)
+        return self.executor.submit(name, self.SIMPLE_ACTIONS[name], on_done=on_done)
+
+
+def result_paths(result):
+    """Files saved by a photo/screenshot ActionResult, as a list (None for other actions)."""
+    if isinstance(result.value, list):
+        return result.value
+    return [result.value] if isinstance(result.value, str) else None
+
+
+def load_template_store(store_path="hand_templates.bin", legacy_path="hand_template.npy"):
+    """Open the enrollment store, importing a legacy single template if needed."""
+    store = TemplateStore(store_path)
+    try:
+        if store.import_legacy(legacy_path):
+            print("[+] Imported legacy hand template.")
+    except Exception as e:
+        print("[!] Failed to import legacy hand template:", e)
+    if len(store):
+        print(f"[+] Loaded {len(store)} enrolled hand template(s).")
+    return store
+
+
+# ==================== MEDIA INDEX & GALLERY ====================
+
+GALLERY_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+MediaEntry = collections.namedtuple("MediaEntry", ["path", "mtime", "size"])
+
+
+class MediaIndex:
+    """
+    Newest-first list of captured images across several folders.
+
+    The folders are scanned once (in the background), after which new
+    captures are added one at a time, so the gallery never lists directories.
+    `version` changes whenever the list does.
+    """
+
+    def __init__(self, directories):
+        self.directories = list(directories)
+        self.version = 0
+        self.ready = threading.Event()
+        self._entries = []
+        self._keys = []          # -mtime per entry, ascending (for bisect)
+        self._lock = threading.Lock()
+
+    def scan(self):
+        entries = []
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as it:
+                    for item in it:
+                        if item.is_file() and item.name.lower().endswith(GALLERY_EXTENSIONS):
+                            st = item.stat()
+                            entries.append(MediaEntry(item.path, st.st_mtime, st.st_size))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda e: -e.mtime)
+        with self._lock:
+            self._entries = entries
+            self._keys = [-e.mtime for e in entries]
+            self.version += 1
+        self.ready.set()
+
+    def scan_async(self):
+        threading.Thread(target=self.scan, name="hgl-media-scan", daemon=True).start()
+
+    def add(self, path):
+        if not path.lower().endswith(GALLERY_EXTENSIONS):
+            return
+        st = os.stat(path)
+        with self._lock:
+            pos = bisect.bisect_left(self._keys, -st.st_mtime)
+            self._keys.insert(pos, -st.st_mtime)
+            self._entries.insert(pos, MediaEntry(path, st.st_mtime, st.st_size))
+            self.version += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._entries), self.version
+
+
+class ThumbnailCache:
+    """
+    Thumbnails kept on disk (JPEG) and in a small in-memory LRU.
+
+    Entries are keyed by path, mtime and size, so an edited or replaced image
+    gets a fresh thumbnail. Disk entries are evicted oldest-used first once
+    there are more than `max_files`.
+    """
+
+    def __init__(self, directory=".thumbcache", size=(180, 120),
+                 max_files=5000, max_memory=300):
+        self.directory = directory
+        self.size = size
+        self.max_files = max_files
+        self.max_memory = max_memory
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, entry):
+        raw = f"{os.path.abspath(entry.path)}|{entry.mtime}|{entry.size}|{self.size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def load(self, entry):
+        """Thumbnail for `entry` as a PIL image. Safe to call from worker threads."""
+        key = self.key(entry)
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+                return img
+
+        cache_path = os.path.join(self.directory, key + ".jpg")
+        try:
+            img = Image.open(cache_path)
+            img.load()
+            os.utime(cache_path)    # mtime doubles as "last used" for eviction
+        except OSError:
+            img = Image.open(entry.path)
+            img.draft("RGB", self.size)  # JPEG: decode at reduced scale
+            img.thumbnail(self.size)
+            img = img.convert("RGB")
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, "JPEG", quality=85)
+            os.replace(tmp_path, cache_path)
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % 100 == 0
+            if evict:
+                self.evict()
+
+        with self._lock:
+            self._memory[key] = img
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+        return img
+
+    def evict(self):
+        with os.scandir(self.directory) as it:
+            files = [(item.stat().st_mtime, item.path) for item in it if item.is_file()]
+        if len(files) <= self.max_files:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class GalleryWindow:
+    """
+    Virtualised thumbnail grid.
+
+    Only rows inside (or next to) the viewport get canvas items; thumbnails
+    are decoded in a worker pool and turned into PhotoImages on the Tk thread.
+    Rows that scroll out of view release their images again.
+    """
+
+    COLUMNS = 3
+    CELL_WIDTH = 196
+    CELL_HEIGHT = 136
+    POLL_MS = 30
+
+    def __init__(self, root, index, cache, pool):
+        self.index = index
+        self.cache = cache
+        self.pool = pool
+        self.entries, self.version = index.snapshot()
+        self.items = {}           # entry position -> [canvas item, PhotoImage, future]
+        self.results = queue.Queue()
+        self.closed = False
+
+        import tkinter as tk
+        from tkinter import ttk
+        self.win = tk.Toplevel(root)
+        self.win.title("Captured Photos")
+        self.win.configure(bg="#020617")
+        self.win.geometry("600x400")
+        self.win.bind("<Destroy>", self._on_destroy)
+
+        self.canvas = tk.Canvas(self.win, bg="#020617", highlightthickness=0,
+                                yscrollincrement=self.CELL_HEIGHT // 4)
+        self.scrollbar = ttk.Scrollbar(self.win, orient="vertical", command=self.canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+
+        self.canvas.bind("<Configure>", lambda e: self._render())
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+        self._reset()
+        self.win.after(self.POLL_MS, self._poll)
+
+    def _on_destroy(self, event):
+        if event.widget is self.win:
+            self.closed = True
+            for _, _, future in self.items.values():
+                future.cancel()
+            self.items.clear()
+
+    def _on_wheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, "units")
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._render()
+
+    def _reset(self):
+        """Drop all items and lay out the grid for the current entries."""
+        for _, _, future in self.items.values():
+            future.cancel()
+        self.items.clear()
+        self.canvas.delete("all")
+
+        rows = math.ceil(len(self.entries) / self.COLUMNS)
+        self.canvas.configure(scrollregion=(0, 0, self.COLUMNS * self.CELL_WIDTH,
+                                            max(1, rows * self.CELL_HEIGHT)))
+        if not self.entries:
+            text = "No photos captured yet." if self.index.ready.is_set() else "Loading..."
+            self.canvas.create_text(20, 20, anchor="nw", text=text,
+                                    font=("Segoe UI", 10), fill="#e5e7eb")
+        self._render()
+
+    def _visible_range(self):
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.CELL_HEIGHT)
+        first_row = max(0, int(top // self.CELL_HEIGHT) - 1)
+        last_row = int((top + height) // self.CELL_HEIGHT) + 1
+        return first_row * self.COLUMNS, min(len(self.entries), (last_row + 1) * self.COLUMNS)
+
+    def _render(self):
+        if self.closed or not self.entries:
+            return
+        start, stop = self._visible_range()
+
+        for pos in [p for p in self.items if not start <= p < stop]:
+            item, _, future = self.items.pop(pos)
+            future.cancel()
+            self.canvas.delete(item)
+
+        for pos in range(start, stop):
+            if pos in self.items:
+                continue
+            row, col = divmod(pos, self.COLUMNS)
+            item = self.canvas.create_image(
+                col * self.CELL_WIDTH + self.CELL_WIDTH // 2,
+                row * self.CELL_HEIGHT + self.CELL_HEIGHT // 2,
+                anchor="center"
+            )
+            entry = self.entries[pos]
+            future = self.pool.submit(self.cache.load, entry)
+            future.add_done_callback(
+                lambda f, pos=pos, path=entry.path: self.results.put((pos, path, f))
+            )
+            self.items[pos] = [item, None, future]
+
+    def _poll(self):
+        if self.closed:
+            return
+        if self.index.version != self.version:
+            self.entries, self.version = self.index.snapshot()
+            self._reset()
+
+        while True:
+            try:
+                pos, path, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            slot = self.items.get(pos)
+            if slot is None or future.cancelled() or self.entries[pos].path != path:
+                continue
+            from PIL import ImageTk
+            try:
+                imgtk = ImageTk.PhotoImage(future.result(), master=self.win)
+            except Exception as e:
+                print("Error loading image:", path, e)
+                continue
+            slot[1] = imgtk    # keep a reference to prevent GC
+            self.canvas.itemconfigure(slot[0], image=imgtk)
+
+        self.win.after(self.POLL_MS, self._poll)
+
+
+# ==================== APPLICATION CLASS (GUI + LOGIC) ====================
+
+class HandGestureLockApp:
+    def __init__(self, root, source=None, idle=None, capture=None,
+                 overlays_at_preview=False, metrics=None, debug_overlay=False,
+                 max_hands=2, trace=None, threshold=0.12, photo=DEFAULT_PHOTO_OPTIONS,
+                 screenshots=None, roi=None, profile=None, profiles=None, journal=None,
+                 memory_probe=None):
+        import tkinter as tk    # the GUI's only; daemon and tools run without Tk
+        from tkinter import ttk
+        self.root = root
+        self.root.title("Hand Gesture Lock & Control")
+        self.root.configure(bg="#020617")  # very dark background
+
+        # -------- STATE VARIABLES --------
+        self.TEMPLATE_PATH = "hand_template.npy"      # legacy single template
+        self.TEMPLATE_STORE_PATH = "hand_templates.bin"
+        self.FEATURE_THRESHOLD = threshold    # see the tune command
+
+        # Animation state
+        self.scan_phase = 0            # for scanning pulse when locked
+        self.save_anim_frames = 0      # after saving template
+        self.unlock_anim_frames = 0    # short animation when unlock happens
+        self.photo_anim_frames = 0     # visual feedback after photo/screenshot
+
+        # Photo / screenshot system
+        self.photo_dir = "photos"
+        self.screenshot_dir = "screenshots"
+
+        # UI only polls for finished frames; pacing comes from the pipeline
+        self.UI_POLL_MS = 10
+        # Performance profile: switched at runtime from the side panel or with P
+        self.profiles = profiles or PROFILES
+        self.profile = profile or self.profiles[DEFAULT_PROFILE]
+        self.PREVIEW_SIZE = (640, 480)
+        self.OVERLAYS_AT_PREVIEW = overlays_at_preview
+        self._after_id = None
+        self._status_hold_until = 0.0
+
+        # Runtime metrics (exported by the caller; see MetricsServer/MetricsDumper)
+        self.metrics = metrics or MetricsRegistry()
+        self.debug_overlay = debug_overlay
+        # Events are logged (and echoed) off the UI thread
+        self.journal = journal or EventJournal()
+        self.metrics.gauge("journal", self.journal.stats)
+        # Tk image count for /memory snapshots, refreshed about once a second
+        self.memory_probe = memory_probe
+        self._tk_images_counted = 0.0
+
+        # Screenshots, photos, hotkeys and the browser run in the background
+        self.actions = ActionExecutor(metrics=self.metrics)
+        self.capture = capture or CaptureWriter()
+        self.capture.start()
+        # Recent clean frames, so photos can be picked by time (and in bursts)
+        self.precapture = PreCaptureBuffer(photo.buffer_frames) if photo.buffer_frames else None
+        self.gesture_actions = GestureActions(self.actions, self.capture,
+                                              self.photo_dir, self.screenshot_dir,
+                                              precapture=self.precapture, photo=photo,
+                                              screenshots=screenshots)
+
+        # Gallery: media list is built once, thumbnails come from a cache
+        self.media_index = MediaIndex([self.photo_dir, self.screenshot_dir])
+        self.media_index.scan_async()
+        self.thumbnails = ThumbnailCache()
+        self.thumb_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="hgl-thumb"
+        )
+
+        # -------- MEDIAPIPE + CAMERA / FRAME SOURCE --------
+        # Loaded in the background while the window comes up. `source` is a
+        # FrameSource or a callable that opens one (off the UI thread).
+        self.idle = idle
+        self.trace = trace
+        self.roi = roi
+        self.cap = None
+        self.pipeline = None    # owns the hand model once the loader is done
+        self._first_inference = False
+        if source is None:
+            source = CameraSource
+        self.loader = StartupLoader(source if callable(source) else (lambda: source),
+                                    max_hands, self.metrics, profile=self.profile).start()
+        self.max_hands = max_hands
+
+        # Lock / gesture logic; loads enrolled hand templates (if any)
+        self.engine = GestureEngine(
+            load_template_store(self.TEMPLATE_STORE_PATH, self.TEMPLATE_PATH),
+            threshold=self.FEATURE_THRESHOLD,
+            metrics=self.metrics,
+        )
+
+        # -------- STYLES --------
+        self.style = ttk.Style()
+        self.style.theme_use("clam")
+
+        self.style.configure(
+            "Accent.TButton",
+            background="#38bdf8",   # sky-400
+            foreground="#0f172a",   # slate-900
+            borderwidth=0,
+            focusthickness=0,
+            padding=(14, 6),
+        )
+        self.style.map(
+            "Accent.TButton",
+            background=[
+                ("active", "#0ea5e9"),   # sky-500
+                ("pressed", "#0284c7"),  # sky-600
+            ]
+        )
+
+        self.style.configure(
+            "Ghost.TButton",
+            background="#0f172a",
+            foreground="#e5e7eb",
+            borderwidth=1,
+            focusthickness=0,
+            padding=(14, 6),
+        )
+        self.style.map(
+            "Ghost.TButton",
+            background=[
+                ("active", "#111827"),
+                ("pressed", "#020617"),
+            ]
+        )
+
+        # -------- LAYOUT --------
+        main_frame = tk.Frame(self.root, bg="#020617")
+        main_frame.grid(row=0, column=0, sticky="nsew")
+
+        self.root.rowconfigure(0, weight=1)
+        self.root.columnconfigure(0, weight=1)
+
+        # Left: video
+        video_card = tk.Frame(main_frame, bg="#020617")
+        video_card.grid(row=0, column=0, padx=16, pady=16)
+
+        video_container = tk.Frame(video_card, bg="#0b1120", bd=0,
+                                   highlightthickness=1, highlightbackground="#1e293b")
+        video_container.pack()
+        self.video_label = tk.Label(video_container, bg="#0b1120")
+        self.video_label.pack(padx=4, pady=4)
+        self.preview = PreviewRenderer(self.PREVIEW_SIZE, master=self.root)
+
+        # Right: side panel
+        side_frame = tk.Frame(main_frame, bg="#020617")
+        side_frame.grid(row=0, column=1, sticky="n", padx=(0, 16), pady=16)
+
+        title = tk.Label(
+            side_frame,
+            text="Hand Gesture Lock & Control",
+            font=("Segoe UI", 16, "bold"),
+            fg="#e5e7eb",
+            bg="#020617"
+        )
+        title.pack(anchor="w", pady=(0, 10))
+
+        subtitle = tk.Label(
+            side_frame,
+            text="Unlock and control your computer using your hand.",
+            font=("Segoe UI", 10),
+            fg="#9ca3af",
+            bg="#020617"
+        )
+        subtitle.pack(anchor="w", pady=(0, 12))
+
+        status_card = tk.Frame(side_frame, bg="#0b1120", bd=0,
+                               highlightthickness=1, highlightbackground="#1e293b")
+        status_card.pack(anchor="w", fill="x", pady=(0, 10))
+
+        self.lock_label = tk.Label(
+            status_card,
+            text="Lock: LOCKED",
+            font=("Segoe UI", 12, "bold"),
+            fg="#f97373",
+            bg="#0b1120"
+        )
+        self.lock_label.pack(anchor="w", padx=10, pady=(8, 0))
+
+        self.status_label = tk.Label(
+            status_card,
+            text="Status: Ready",
+            font=("Segoe UI", 10),
+            fg="#e5e7eb",
+            bg="#0b1120",
+            wraplength=260,
+            justify="left"
+        )
+        self.status_label.pack(anchor="w", padx=10, pady=(4, 10))
+
+        # Operator label used when enrolling
+        user_frame = tk.Frame(side_frame, bg="#020617")
+        user_frame.pack(anchor="w", fill="x", pady=(0, 4))
+        tk.Label(
+            user_frame,
+            text="Operator:",
+            font=("Segoe UI", 10),
+            fg="#9ca3af",
+            bg="#020617"
+        ).pack(side="left")
+        self.user_var = tk.StringVar(value="operator")
+        self.user_entry = tk.Entry(
+            user_frame,
+            textvariable=self.user_var,
+            font=("Segoe UI", 10),
+            fg="#e5e7eb",
+            bg="#0b1120",
+            insertbackground="#e5e7eb",
+            relief="flat",
+            highlightthickness=1,
+            highlightbackground="#1e293b",
+            width=20
+        )
+        self.user_entry.pack(side="left", padx=(8, 0))
+
+        # Performance profile
+        profile_frame = tk.Frame(side_frame, bg="#020617")
+        profile_frame.pack(anchor="w", fill="x", pady=(4, 4))
+        tk.Label(
+            profile_frame,
+            text="Profile:",
+            font=("Segoe UI", 10),
+            fg="#9ca3af",
+            bg="#020617"
+        ).pack(side="left")
+        self.profile_var = tk.StringVar(value=self.profile.name)
+        self.profile_box = ttk.Combobox(
+            profile_frame,
+            textvariable=self.profile_var,
+            values=list(self.profiles),
+            state="readonly",
+            width=18
+        )
+        self.profile_box.pack(side="left", padx=(15, 0))
+        self.profile_box.bind("<<ComboboxSelected>>",
+                              lambda event: self.set_profile(self.profile_var.get()))
+
+        # Buttons
+        btn_frame = tk.Frame(side_frame, bg="#020617")
+        btn_frame.pack(anchor="w", pady=(4, 8))
+
+        self.save_btn = ttk.Button(
+            btn_frame,
+            text="Save Hand",
+            style="Accent.TButton",
+            command=self.save_hand_template
+        )
+        self.save_btn.grid(row=0, column=0, padx=(0, 8), pady=4)
+
+        self.gallery_btn = ttk.Button(
+            btn_frame,
+            text="Photos",
+            style="Ghost.TButton",
+            command=self.open_gallery
+        )
+        self.gallery_btn.grid(row=0, column=1, padx=(0, 8), pady=4)
+
+        self.quit_btn = ttk.Button(
+            btn_frame,
+            text="Quit",
+            style="Ghost.TButton",
+            command=self.on_close
+        )
+        self.quit_btn.grid(row=0, column=2, padx=(0, 0), pady=4)
+
+        # Hover effect for buttons
+        for btn in (self.save_btn, self.gallery_btn, self.quit_btn):
+            btn.bind("<Enter>", self._on_button_enter)
+            btn.bind("<Leave>", self._on_button_leave)
+            btn.bind("<ButtonPress-1>", self._on_button_press)
+            btn.bind("<ButtonRelease-1>", self._on_button_release)
+
+        instructions = (
+            "Workflow:\n"
+            "• Show your hand and click 'Save Hand' to enroll.\n"
+            "• When your hand is recognized, the lock unlocks automatically.\n\n"
+            "Gestures (when unlocked):\n"
+            "• 1 finger  → Open YouTube\n"
+            "• 2 fingers → 3s countdown → Take a photo\n"
+            "• 3 fingers → Copy (Ctrl + C)\n"
+            "• 4 fingers → Paste (Ctrl + V)\n"
+            "• Swipe right → left → Screenshot (saved)\n\n"
+            "Shortcuts:\n"
+            "• Q → Quit\n"
+            "• E → Save hand\n"
+            "• P → Next performance profile"
+        )
+        instr_label = tk.Label(
+            side_frame,
+            text=instructions,
+            font=("Segoe UI", 9),
+            fg="#9ca3af",
+            bg="#020617",
+            justify="left",
+            wraplength=280
+        )
+        instr_label.pack(anchor="w", pady=(10, 0))
+
+        # Window close event
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Keyboard shortcuts
+        self.root.bind("<KeyPress-e>", self._shortcut(self.save_hand_template))
+        self.root.bind("<KeyPress-q>", self._shortcut(self.on_close))
+        # Optional dev shortcut: re-lock
+        self.root.bind("<KeyPress-l>", self._shortcut(self._dev_relock))
+        # Toggle the metrics debug overlay
+        self.root.bind("<KeyPress-d>", self._shortcut(self._toggle_debug_overlay))
+        self.root.bind("<KeyPress-p>", self._shortcut(self._next_profile))
+
+        # UI polling loop; capture/inference threads start once the loader is done
+        self.set_status("Starting camera and hand model...")
+        self.root.after_idle(self._on_window_shown)
+        self.update_frame()
+
+    # ------------------ STARTUP ------------------
+
+    def _on_window_shown(self):
+        self.metrics.set("startup.time_to_window_ms", round(startup_elapsed_ms(), 1))
+
+    def _start_pipeline(self):
+        """Called from the UI loop until the background loader has finished."""
+        if not self.loader.ready() or self.loader.error is not None:
+            return
+        self.cap, hands = self.loader.take()
+        self.pipeline = FramePipeline(self.cap, hands, idle=self.idle,
+                                      metrics=self.metrics, trace=self.trace,
+                                      precapture=self.precapture, roi=self.roi,
+                                      profile=self.loader.profile, max_hands=self.max_hands,
+                                      journal=self.journal)
+        if self.profile != self.loader.profile:
+            # Switched while the model was still loading
+            self.pipeline.set_profile(self.profile)
+        self.pipeline.start()
+        self.set_status("Ready")
+
+    def _on_first_inference(self):
+        self._first_inference = True
+        self.metrics.set("startup.time_to_first_inference_ms", round(startup_elapsed_ms(), 1))
+        startup = {name: value for name, value in self.metrics.snapshot()["gauges"].items()
+                   if name.startswith("startup.")}
+        self.journal.record("startup", "Startup: " + json.dumps(startup), **startup)
+
+    # ------------------ BUTTON ANIMATIONS ------------------
+
+    def _on_button_enter(self, event):
+        btn = event.widget
+        btn.configure(cursor="hand2")
+
+    def _on_button_leave(self, event):
+        btn = event.widget
+        btn.configure(cursor="")
+
+    def _on_button_press(self, event):
+        btn = event.widget
+        style_name = btn.cget("style") or "TButton"
+        self.style.configure(style_name, padding=(12, 5))
+
+    def _on_button_release(self, event):
+        btn = event.widget
+        style_name = btn.cget("style") or "TButton"
+        self.style.configure(style_name, padding=(14, 6))
+
+    def _shortcut(self, callback):
+        """Key binding that stays quiet while the user types into an entry."""
+        import tkinter as tk
+
+        def handler(event):
+            if isinstance(event.widget, tk.Entry):
+                return
+            callback()
+        return handler
+
+    # ------------------ LOGIC METHODS ------------------
+
+    def save_hand_template(self):
+        label = self.user_var.get().strip() or "operator"
+        if self.engine.enroll(label):
+            self.set_status(
+                f"Hand template saved for '{label}' ({len(self.engine.matcher)} enrolled).",
+                important=True
+            )
+            self.save_anim_frames = 20  # yellow highlight animation
+            self.journal.record("template_saved", f"Hand template saved for '{label}'.", "+",
+                                label=label, templates=len(self.engine.matcher))
+        else:
+            self.set_status("No hand detected. Cannot save template.", important=True)
+            self.journal.record("template_rejected", "No hand detected. Cannot save template.", "!")
+
+    def _dev_relock(self):
+        """Optional dev shortcut: re-lock without a visible button."""
+        self.engine.lock()
+        self.update_lock_label()
+        self.set_status("Lock enabled (dev shortcut).", important=True)
+        self.journal.record("lock", "Lock enabled (dev shortcut).")
+
+    def _toggle_debug_overlay(self):
+        self.debug_overlay = not self.debug_overlay
+
+    def set_profile(self, name):
+        """Switch performance profile without restarting (the model reloads in the background)."""
+        profile = self.profiles[name]
+        if profile == self.profile:
+            return
+        self.profile = profile
+        self.profile_var.set(name)
+        if self.pipeline is not None:
+            self.pipeline.set_profile(profile)
+        self.metrics.inc("profile.switches")
+        self.journal.record("profile", f"Profile: {name}", profile=profile._asdict())
+        self.set_status(f"Profile: {name}", important=True, hold=1.5)
+
+    def _next_profile(self):
+        names = list(self.profiles)
+        self.set_profile(names[(names.index(self.profile.name) + 1) % len(names)])
+
+    def _poll_ms(self):
+        """UI poll interval: about twice per frame at the profile's target FPS."""
+        if not self.profile.target_fps:
+            return self.UI_POLL_MS
+        return max(self.UI_POLL_MS, int(500 / self.profile.target_fps))
+
+    def update_lock_label(self):
+        if self.engine.is_locked:
+            self.lock_label.config(text="Lock: LOCKED", fg="#f97373")  # red-ish
+        else:
+            self.lock_label.config(text="Lock: UNLOCKED", fg="#4ade80")  # green
+
+    def set_status(self, text, important=False, hold=0.0):
+        """`hold` keeps the message visible for that many seconds over per-frame updates."""
+        now = time.time()
+        if not hold and now < self._status_hold_until:
+            return
+        self._status_hold_until = now + hold
+        self.status_label.config(text=f"Status: {text}")
+        if important:
+            self.status_label.config(fg="#facc15")  # amber-400
+        else:
+            self.status_label.config(fg="#e5e7eb")
+
+    # ------------------ BACKGROUND ACTIONS ------------------
+
+    def run_action(self, name, frame=None, target=None):
+        """Dispatch a gesture action to the executor. Returns False if it was dropped."""
+        on_done = self._on_capture_done if name in ("photo", "screenshot") else self._on_action_done
+        if not self.gesture_actions.dispatch(name, frame, on_done=on_done, target=target):
+            self.set_status(f"Busy: '{name}' skipped.", important=True, hold=1.0)
+            self.journal.record("action_skipped", f"Busy: '{name}' skipped.", "!", name=name)
+            return False
+        return True
+
+    def _on_action_done(self, result):
+        if not result.ok:
+            self.journal.record("action_failed", f"Action '{result.name}' failed: {result.error}",
+                                "!", name=result.name, error=str(result.error),
+                                latency_ms=round(result.run_time * 1000.0, 1))
+            self.set_status(f"{result.name} failed: {result.error}", important=True, hold=2.0)
+
+    def _on_capture_done(self, result):
+        """Completion callback for photos and screenshots."""
+        if not result.ok:
+            self._on_action_done(result)
+            return
+        paths = result_paths(result)
+        self.journal.record(result.name, f"{result.name.capitalize()} saved: {', '.join(paths)} "
+                                         f"({result.run_time * 1000:.0f} ms)", "+",
+                            paths=paths, latency_ms=round(result.run_time * 1000.0, 1))
+        self.set_status(f"{result.name.capitalize()} saved.", important=True, hold=1.5)
+        self.photo_anim_frames = 12  # flash animation
+        for path in paths:
+            self.media_index.add(path)
+
+    # ------------------ GALLERY WINDOW ------------------
+
+    def open_gallery(self):
+        return GalleryWindow(self.root, self.media_index, self.thumbnails, self.thumb_pool)
+
+    # ------------------ MAIN FRAME UPDATE ------------------
+
+    def update_frame(self):
+        self.actions.poll()
+        if self.memory_probe is not None and time.time() - self._tk_images_counted >= 1.0:
+            self._tk_images_counted = time.time()
+            self.memory_probe.count_tk_images(self.root)
+        if self.pipeline is None:
+            self._start_pipeline()
+            if self.loader.error is not None:
+                self.set_status(f"Startup failed: {self.loader.error}", important=True)
+                return
+            self._after_id = self.root.after(self._poll_ms(), self.update_frame)
+            return
+
+        packet = self.pipeline.latest()
+        if packet is not None:
+            if not self._first_inference:
+                self._on_first_inference()
+            frame = packet.frame
+            if self.OVERLAYS_AT_PREVIEW:
+                # Draw on the (smaller) preview copy; packet.frame stays clean
+                frame = self.preview.fit(frame, copy=True)
+            ui_start = time.perf_counter()
+            self.process_frame(frame, packet.results, idle=packet.idle,
+                               full_frame=packet.frame, captured_at=packet.captured_at)
+            self.pipeline.release(packet)
+            self.metrics.observe("stage.ui_ms", (time.perf_counter() - ui_start) * 1000.0)
+            self.metrics.observe("frame_latency_ms", (time.time() - packet.captured_at) * 1000.0)
+            self.metrics.tick("display_fps")
+        elif self.pipeline.read_failed:
+            self.set_status("Failed to read from frame source.", important=True)
+        load_error = self.pipeline.take_load_error()
+        if load_error is not None:
+            self.set_status(load_error, important=True, hold=3.0)
+
+        # Poll again soon; the UI never waits on the camera or MediaPipe
+        self._after_id = self.root.after(self._poll_ms(), self.update_frame)
+
+    def process_frame(self, frame, results, idle=False, full_frame=None, captured_at=None):
+        """
+        Run the gesture engine on one inferred frame, then handle its events
+        and draw overlays. `frame` is RGB and gets drawn on; photos are taken
+        from `full_frame` (defaults to `frame`).
+        """
+        if full_frame is None:
+            full_frame = frame
+        h, w, _ = frame.shape
+
+        # Gestures are timed by when the frame was captured, not when it got here
+        result = self.engine.process(results, w, h, now=captured_at, idle=idle)
+        hand_center = result.hand_center
+
+        latency_ms = round((time.time() - captured_at) * 1000.0, 1) if captured_at else None
+        for event in result.events:
+            if event.type == "unlock":
+                self.update_lock_label()
+                self.unlock_anim_frames = 20  # green animation
+                self.journal.record("unlock", f"Unlocked by '{event.data['label']}' "
+                                              f"(distance {event.data['distance']:.3f})", "+",
+                                    label=event.data["label"],
+                                    distance=round(float(event.data["distance"]), 4),
+                                    latency_ms=latency_ms)
+            elif event.type == "action":
+                self.journal.record("action", name=event.data["name"], fingers=result.fingers,
+                                    latency_ms=latency_ms)
+                self.run_action(event.data["name"], full_frame, event.data.get("target"))
+
+        # Overlay level comes from the performance profile
+        overlays = self.profile.overlays
+        full = overlays == "full"
+
+        if full:
+            # Base ROI rectangle
+            x0, y0, x1, y1 = BASE_ROI
+            cv2.rectangle(frame, (int(x0 * w), int(y0 * h)), (int(x1 * w), int(y1 * h)),
+                          (30, 64, 175), 1)
+
+        for hand in result.hands if overlays != "none" else ():
+            operator = hand.landmarks is result.landmarks
+            if not (operator or full):
+                continue
+            draw_hand(frame, hand.landmarks, "operator" if operator else "other")
+            if full and len(result.hands) > 1:
+                cv2.putText(frame, f"#{hand.id}", (hand.center[0] + 12, hand.center[1] - 12),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (248, 250, 252), 1)
+
+        if full and hand_center and result.locked:
+            self.scan_phase = (self.scan_phase + 1) % 40
+            if result.match is not None:
+                # scanning pulse animation
+                radius = 40 + int(10 * math.sin(self.scan_phase * math.pi / 20))
+                cv2.circle(frame, hand_center, radius, (56, 189, 248), 2)  # sky-400
+            else:
+                # subtle pulsing to indicate "waiting"
+                base_radius = 30 + int(6 * math.sin(self.scan_phase * math.pi / 20))
+                cv2.circle(frame, hand_center, base_radius, (148, 163, 184), 1)  # gray-ish
+
+        if result.fingers is not None and overlays != "none":
+            cv2.putText(frame, f"Fingers: {result.fingers}", (20, 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (248, 250, 252), 2)
+
+        if result.countdown is not None:
+            # big countdown in center
+            cv2.putText(frame, str(result.countdown),
+                        (int(w / 2) - 30, int(h / 2)),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        3.0,
+                        (250, 204, 21),
+                        6)
+
+        # ---- SHORT ANIMATIONS (SAVE / UNLOCK / PHOTO / SCREENSHOT) ----
+        if hand_center:
+            # Save animation: yellow ring
+            if self.save_anim_frames > 0:
+                radius = 50 + (self.save_anim_frames * 2)
+                if full:
+                    cv2.circle(frame, hand_center, radius, (250, 204, 21), 2)  # amber-400
+                self.save_anim_frames -= 1
+
+            # Unlock animation: green glow
+            if self.unlock_anim_frames > 0:
+                radius = 60 + (20 - self.unlock_anim_frames)
+                if full:
+                    cv2.circle(frame, hand_center, radius, (74, 222, 128), 3)  # green-400
+                self.unlock_anim_frames -= 1
+
+        # Photo / screenshot flash animation (screen border)
+        if self.photo_anim_frames > 0:
+            thickness = 4 + self.photo_anim_frames
+            cv2.rectangle(frame, (0, 0), (w - 1, h - 1), (255, 255, 255), thickness)
+            self.photo_anim_frames -= 1
+
+        if self.debug_overlay:
+            self._draw_debug_overlay(frame)
+
+        # Update status text
+        self.set_status(result.status)
+
+        # Frame is already RGB; the preview PhotoImage is updated in place
+        imgtk = self.preview.render(frame)
+        if getattr(self.video_label, "imgtk", None) is not imgtk:
+            self.video_label.imgtk = imgtk
+            self.video_label.configure(image=imgtk)
+
+    def _draw_debug_overlay(self, frame):
+        m = self.metrics
+        latency = distribution_summary(m.histogram("frame_latency_ms"))
+        inference = distribution_summary(m.histogram("stage.hands_process_ms"))
+        lines = [
+            f"capture {m.rate('capture_fps'):5.1f} fps",
+            f"infer   {m.rate('inference_fps'):5.1f} fps  p50 {inference.get('p50', 0):.1f} ms",
+            f"display {m.rate('display_fps'):5.1f} fps",
+            f"latency p50 {latency.get('p50', 0):.0f} / p95 {latency.get('p95', 0):.0f} ms",
+            f"dropped {self.pipeline.capture_queue.dropped} / stale {self.pipeline.result_queue.dropped}",
+        ]
+        h, w = frame.shape[:2]
+        roi = self.pipeline.roi
+        for x0, y0, x1, y1 in (roi.boxes if roi is not None else ()):
+            cv2.rectangle(frame, (int(x0 * w), int(y0 * h)), (int(x1 * w), int(y1 * h)),
+                          (250, 204, 21), 1)  # amber-400: crops inferred this frame
+        for i, line in enumerate(lines):
+            y = h - 12 - (len(lines) - 1 - i) * 18
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.45, (250, 204, 21), 1, cv2.LINE_AA)  # amber-400
+
+    # ------------------ CLOSE APP ------------------
+
+    def on_close(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        self.loader.close()
+        self.actions.shutdown()
+        self.capture.shutdown()
+        self.journal.close()
+        self.thumb_pool.shutdown(wait=False, cancel_futures=True)
+        if self.idle is not None:
+            print("[i] Idle mode:", json.dumps(self.idle.stats()))
+        print("[i] Action timings:", json.dumps(self.actions.stats()))
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.release()
+        cv2.destroyAllWindows()
+        self.root.destroy()
+
+
+# ==================== DAEMON (NO GUI) ====================
+
+def run_daemon_loop(pipeline, engine, actions, executor, duration=None, verbose=False,
+                    journal=None):
+    """
+    Drive the engine from the pipeline without any rendering.
+    Returns when `duration` seconds have passed, a recorded source ends,
+    or on Ctrl+C. Events go to `journal` (an EventJournal).
+    """
+    metrics = engine.metrics
+    journal = journal or EventJournal()
+    deadline = time.time() + duration if duration else None
+    last_status = None
+    first_inference = True
+
+    def on_done(result):
+        latency_ms = round(result.run_time * 1000.0, 1)
+        if result.ok:
+            paths = result_paths(result)
+            journal.record(result.name, f"{result.name} done ({latency_ms:.0f} ms)"
+                           + (f": {', '.join(paths)}" if paths else ""), "+",
+                           paths=paths, latency_ms=latency_ms)
+        else:
+            journal.record("action_failed", f"Action '{result.name}' failed: {result.error}", "!",
+                           name=result.name, error=str(result.error), latency_ms=latency_ms)
+
+    try:
+        while deadline is None or time.time() < deadline:
+            executor.poll()
+            packet = pipeline.get(timeout=0.5)
+            if packet is None:
+                if pipeline.done():
+                    break
+                continue
+            if first_inference:
+                first_inference = False
+                elapsed = round(startup_elapsed_ms(), 1)
+                metrics.set("startup.time_to_first_inference_ms", elapsed)
+                journal.record("startup", f"First inference after {elapsed:.0f} ms.",
+                               time_to_first_inference_ms=elapsed)
+
+            h, w = packet.frame.shape[:2]
+            result = engine.process(packet.results, w, h, now=packet.captured_at,
+                                    idle=packet.idle)
+            latency_ms = round((time.time() - packet.captured_at) * 1000.0, 1)
+            for event in result.events:
+                name = event.data.get("name")
+                if event.type == "unlock":
+                    journal.record("unlock", f"Unlocked by '{event.data['label']}' "
+                                             f"(distance {event.data['distance']:.3f})", "+",
+                                   label=event.data["label"],
+                                   distance=round(float(event.data["distance"]), 4),
+                                   latency_ms=latency_ms)
+                elif event.type == "action":
+                    journal.record("action", name=name, fingers=result.fingers,
+                                   latency_ms=latency_ms)
+                    if not actions.dispatch(name, packet.frame, on_done=on_done,
+                                            target=event.data.get("target")):
+                        journal.record("action_skipped", f"Busy: '{name}' skipped.", "!",
+                                       name=name)
+            pipeline.release(packet)
+            metrics.observe("frame_latency_ms", (time.time() - packet.captured_at) * 1000.0)
+            metrics.tick("engine_fps")
+
+            if verbose and result.status != last_status:
+                journal.record("status", result.status, status=result.status)
+                last_status = result.status
+    except KeyboardInterrupt:
+        pass
+
+
+def run_daemon(args, probe=None):
+    metrics = MetricsRegistry()
+    _, profile = profiles_from_args(args)
+    # Model and source load in parallel while the rest is set up
+    loader = StartupLoader(lambda: source_from_args(args, profile=profile), args.max_hands,
+                           metrics, profile=profile).start()
+    engine = GestureEngine(load_template_store(args.templates), threshold=args.threshold,
+                           metrics=metrics)
+    loader.wait()
+    if loader.error is not None:
+        print(f"[!] Startup failed ({args.source}):", loader.error)
+        loader.close()
+        return 2
+    source, hands = loader.take()
+
+    probe = probe or MemoryProbe()
+    exporters = start_metrics_exporters(metrics, args, routes={"/memory": probe.snapshot})
+    journal = journal_from_args(args)
+    metrics.gauge("journal", journal.stats)
+    executor = ActionExecutor(metrics=metrics)
+    capture = capture_from_args(args)
+    capture.start()
+    photo = photo_options_from_args(args)
+    precapture = PreCaptureBuffer(photo.buffer_frames) if photo.buffer_frames else None
+    actions = GestureActions(executor, capture, precapture=precapture, photo=photo,
+                             screenshots=screenshots_from_args(args))
+    pipeline = FramePipeline(source, hands, idle=idle_from_args(args), metrics=metrics,
+                             trace=trace_from_args(args), precapture=precapture,
+                             roi=roi_from_args(args), profile=profile,
+                             max_hands=args.max_hands, journal=journal)
 
-                # Swipe: right to left -> screenshot (saved to file)
-                if self.prev_x is not None:
-                    move_distance = self.prev_x - cx
-                    if move_distance > self.SWIPE_THRESHOLD:
-                        self.move_counter += 1
-                    else:
-                        self.move_counter = 0
-
-                    if (self.move_counter >= self.SWIPE_FRAMES and
-                            self.command_cooldown == 0 and
-                            not self.photo_countdown_active):
-                        filename = os.path.join(
-                            self.screenshot_dir,
-                            f"screenshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                        )
-                        screenshot = pyautogui.screenshot()
-                        screenshot.save(filename)
-                        print(f"[+] Screenshot saved: {filename}")
-                        status_text = "Swipe left → Screenshot saved"
-                        self.photo_anim_frames = 12  # use same flash animation
-                        self.command_cooldown = self.COOLDOWN_TIME
-                        self.move_counter = 0
-                self.prev_x = cx
-
-                # Finger count commands
-                total_fingers = count_fingers(landmarks)
-                cv2.putText(frame, f"Fingers: {total_fingers}", (20, 40),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (248, 250, 252), 2)
-
-                # Start 3-second countdown for photo when 2 fingers shown
-                if self.command_cooldown == 0 and not self.photo_countdown_active:
-                    if total_fingers == 2:
-                        self.photo_countdown_active = True
-                        self.photo_countdown_end_time = time.time() + 3
-                        status_text = "2 fingers → Photo in 3 seconds..."
-                    elif total_fingers == 1:
-                        status_text = "1 finger → Opening YouTube"
-                        webbrowser.open("https://www.youtube.com")
-                        self.command_cooldown = self.COOLDOWN_TIME
-                    elif total_fingers == 3:
-                        status_text = "3 fingers → Copy (Ctrl+C)"
-                        pyautogui.hotkey('ctrl', 'c')
-                        self.command_cooldown = self.COOLDOWN_TIME
-                    elif total_fingers == 4:
-                        status_text = "4 fingers → Paste (Ctrl+V)"
-                        pyautogui.hotkey('ctrl', 'v')
-                        self.command_cooldown = self.COOLDOWN_TIME
+    print(f"[+] Daemon running with the '{profile.name}' profile (Ctrl+C to stop).")
+    pipeline.start()
+    try:
+        run_daemon_loop(pipeline, engine, actions, executor,
+                        duration=args.duration, verbose=args.verbose, journal=journal)
+    finally:
+        pipeline.stop()
+        executor.shutdown()
+        capture.shutdown()
+        journal.close()
+        source.release()
+        for exporter in exporters:
+            exporter.close()
+        if pipeline.idle is not None:
+            print("[i] Idle mode:", json.dumps(pipeline.idle.stats()))
+        if pipeline.trace is not None:
+            print(f"[+] Recorded {pipeline.trace.frames} frame(s) to {pipeline.trace.path}")
+        print("[i] Action timings:", json.dumps(executor.stats()))
+    return 0
+
+
+def run_replay(args):
+    trace = LandmarkTrace(args.trace)
+    engine = GestureEngine(load_template_store(args.templates), threshold=args.threshold)
+    events, seconds = replay_trace(trace, engine)
+    for event in events:
+        print(f"[i] {event['time']:8.3f}s {event['type']}:",
+              event.get("name") or event.get("label"))
+    print(f"[+] Replayed {len(trace)} frame(s) ({trace.duration:.1f}s recorded) "
+          f"in {seconds * 1000:.0f} ms: {len(trace) / max(seconds, 1e-9):.0f} frames/s")
+
+    if args.events_out:
+        with open(args.events_out, "w", encoding="utf-8") as f:
+            json.dump(events, f, indent=2)
+        print(f"[+] Events written: {args.events_out}")
+    if args.expect:
+        with open(args.expect, encoding="utf-8") as f:
+            expected = json.load(f)
+        lines = compare_trace_events(events, expected, args.time_tolerance)
+        for line in lines:
+            print(line)
+        if lines:
+            return 1
+        print(f"[+] All {len(expected)} expected event(s) matched.")
+    return 0
+
+
+# ==================== MULTI-CAMERA (PROCESS PER STREAM) ====================
+
+class SharedFrameRing:
+    """
+    A few frames of one fixed shape in shared memory, plus a sequence number
+    per slot, so frames reach another process without being pickled.
 
+    Slots are guarded like a seqlock: the writer sets the slot's number to -1,
+    fills the frame and then publishes the frame number; a reader copies the
+    slot and accepts it only if the number is the one it was told about both
+    before and after the copy. No locks are shared between processes.
+    """
+
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * (8 + frame_bytes))
+            self.owner = True
         else:
-            self.prev_x = None
-            self.move_counter = 0
-            status_text = "No hand detected"
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.seq = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=slots * 8)
+        if self.owner:
+            self.seq[:] = 0    # frame numbers start at 1
+        self._next = 0
 
-        # Handle photo countdown (3 seconds)
-        if self.photo_countdown_active:
-            remaining = self.photo_countdown_end_time - time.time()
-            if remaining > 0:
-                sec = int(math.ceil(remaining))
-                # big countdown in center
-                cv2.putText(frame, str(sec),
-                            (int(w / 2) - 30, int(h / 2)),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            3.0,
-                            (250, 204, 21),
-                            6)
-                status_text = f"Taking photo in {sec}..."
+    @property
+    def spec(self):
+        """Picklable description for attach() in another process."""
+        return (self.shm.name, self.shape, self.slots)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, slots = spec
+        return cls(shape, slots, name=name)
+
+    def begin_write(self):
+        """Claim the next slot; returns (slot index, writable frame view)."""
+        slot = self._next
+        self._next = (slot + 1) % self.slots
+        self.seq[slot] = -1
+        return slot, self.frames[slot]
+
+    def publish(self, slot, frame_no):
+        self.seq[slot] = frame_no
+
+    def read(self, slot, frame_no, out):
+        """Copy frame `frame_no` from `slot` into `out`. False if it was overwritten."""
+        if self.seq[slot] != frame_no:
+            return False
+        np.copyto(out, self.frames[slot])
+        return self.seq[slot] == frame_no
+
+    def close(self):
+        # numpy views keep the buffer exported; drop them before closing
+        self.seq = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class LatestFrameCell:
+    """
+    The newest (slot, frame_no, captured_at) of one stream, shared with its
+    worker process. Each publish() overwrites the previous one, so a worker
+    that falls behind always jumps to the freshest frame (latest wins). end()
+    marks the stream finished; the worker still gets the last frame.
+    Recorded sources use wait_taken() to wait for the worker instead.
+    """
+
+    def __init__(self, context):
+        # slot, frame_no, captured_at, ended, frame_no last taken by the worker
+        self._value = context.Array("d", 5)
+        self._event = context.Event()
+        self._taken = context.Event()
+
+    def publish(self, slot, frame_no, captured_at):
+        with self._value.get_lock():
+            self._value[:3] = (slot, frame_no, captured_at)
+        self._event.set()
+
+    def end(self):
+        with self._value.get_lock():
+            self._value[3] = 1.0
+        self._event.set()
+
+    def take(self, after):
+        """
+        Wait for a frame newer than frame number `after` (or the end).
+        Returns (slot, frame_no, captured_at, ended).
+        """
+        while True:
+            self._event.wait()
+            self._event.clear()
+            with self._value.get_lock():
+                slot, frame_no, captured_at, ended, _ = self._value[:]
+                self._value[4] = frame_no
+            self._taken.set()
+            if frame_no > after or ended:
+                return int(slot), int(frame_no), captured_at, bool(ended)
+
+    def wait_taken(self, frame_no, timeout=None):
+        """Wait until the worker has taken frame `frame_no`. False on timeout."""
+        self._taken.clear()
+        with self._value.get_lock():
+            if self._value[4] >= frame_no:
+                return True
+        return self._taken.wait(timeout) and self.wait_taken(frame_no, 0)
+
+
+# One inference result from a stream worker. `points` is (N, 21, 3) or None,
+# `skipped` counts queued frames the worker jumped over to stay current.
+StreamResult = collections.namedtuple(
+    "StreamResult",
+    ["stream", "slot", "frame_no", "captured_at", "points", "infer_ms", "skipped", "stale"]
+)
+
+
+def stream_inference_worker(stream, ring_spec, latest, results, ready, max_hands=2,
+                            roi=None, profile=None):
+    """
+    Inference process for one stream: its own interpreter and Hands instance.
+    Sets `ready` once the model is loaded and warmed up, then infers the
+    newest frame of its LatestFrameCell each time and sends back landmark
+    arrays, until the stream ends.
+    """
+    ring = SharedFrameRing.attach(ring_spec)
+    hands = create_hands(max_hands, profile=profile)
+    tracker = None
+    if roi is not None:
+        tracker = RoiTracker(hands, create_crop_hands(max_hands, profile, roi.input_size), roi)
+    bgr = np.empty(ring.shape, dtype=np.uint8)
+    rgb = np.empty(ring.shape, dtype=np.uint8)
+    try:
+        hands.process(rgb)    # MediaPipe sets up its graph on the first frame
+        ready.set()
+        last_no, ended = 0, False
+        while not ended:
+            slot, frame_no, captured_at, ended = latest.take(last_no)
+            if frame_no <= last_no:
+                break    # ended with nothing new
+            skipped, last_no = frame_no - last_no - 1, frame_no
+            if not ring.read(slot, frame_no, bgr):
+                results.put(StreamResult(stream, slot, frame_no, captured_at,
+                                         None, 0.0, skipped, True))
+                continue
+
+            started = time.perf_counter()
+            cv2.flip(bgr, 1, dst=rgb)
+            cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB, dst=rgb)
+            found = (tracker or hands).process(rgb).multi_hand_landmarks
+            points = None
+            if found:
+                points = np.stack([landmarks_to_array(h.landmark) for h in found])
+            results.put(StreamResult(stream, slot, frame_no, captured_at, points,
+                                     (time.perf_counter() - started) * 1000.0,
+                                     skipped, False))
+    finally:
+        hands.close()
+        if tracker is not None:
+            tracker.close()
+        ring.close()
+
+
+class MultiCameraRunner:
+    """
+    N frame sources, each with a capture thread here and an inference process.
+
+    Capture threads decode straight into a SharedFrameRing and send only the
+    slot number to their worker. Results come back on one queue to a single
+    dispatcher, which runs a GestureEngine per stream (swipes are tracked per
+    camera) but keeps one lock state and one action cooldown for all of them.
+    """
+
+    def __init__(self, sources, store, threshold=0.12, metrics=None,
+                 actions=None, executor=None, ring_slots=4, action_cooldown=1.0,
+                 max_hands=2, roi=None, profile=None, journal=None):
+        self.sources = sources
+        self.journal = journal or EventJournal()
+        self.max_hands = max_hands
+        self.roi = roi
+        self.profile = profile    # model settings used by the workers
+        self.metrics = metrics or MetricsRegistry()
+        self.actions = actions
+        self.executor = executor
+        self.ring_slots = ring_slots
+        self.action_cooldown = action_cooldown
+        matcher = TemplateMatcher.from_store(store)
+        self.engines = [GestureEngine(store, matcher=matcher, threshold=threshold,
+                                      metrics=self.metrics) for _ in sources]
+        self.rings = []
+        self.cells = []    # LatestFrameCell per stream
+        self.processes = []
+        self.finished = [False] * len(sources)
+        self.frames_inferred = [0] * len(sources)
+        self.frames_stale = [0] * len(sources)
+        self.frames_skipped = [0] * len(sources)
+        self._last_action = 0.0
+        self._started_at = None
+        self._stopped_at = None
+        for stream, source in enumerate(sources):
+            if isinstance(source, FrameSource):
+                source.on_unreadable = lambda path, s=stream: self._unreadable_frame(s, path)
+        self._stop_event = threading.Event()
+        self._threads = []
+        # spawn: the capture threads make fork() unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self.results = self._context.Queue()
+
+    def _unreadable_frame(self, stream, path):
+        self.metrics.inc("frames.unreadable")
+        self.journal.record("frame_unreadable", f"Stream {stream}: skipping unreadable image: {path}",
+                            "!", stream=stream, path=path)
+
+    def start(self):
+        """
+        Read one frame per source to size its ring, start the workers, and
+        start capturing once every worker has its model loaded.
+        """
+        self._started_at = time.time()
+        firsts, ready = [], []
+        for stream, source in enumerate(self.sources):
+            ret, first = source.read()
+            if not ret:
+                raise RuntimeError(f"stream {stream} returned no frames")
+            ring = SharedFrameRing(first.shape, self.ring_slots)
+            cell = LatestFrameCell(self._context)
+            ready.append(self._context.Event())
+            process = self._context.Process(
+                target=stream_inference_worker,
+                args=(stream, ring.spec, cell, self.results, ready[-1], self.max_hands,
+                      self.roi, self.profile),
+                name=f"hgl-stream-{stream}", daemon=True,
+            )
+            process.start()
+            self.rings.append(ring)
+            self.cells.append(cell)
+            self.processes.append(process)
+            firsts.append(first)
+
+        # Frames captured while the models load would only be skipped
+        for stream, (process, event) in enumerate(zip(self.processes, ready)):
+            while not event.wait(0.5):
+                if not process.is_alive():
+                    raise RuntimeError(f"stream {stream} worker exited during startup")
+        self.metrics.set("startup.workers_ready_ms",
+                         round((time.time() - self._started_at) * 1000.0, 1))
+
+        for stream, first in enumerate(firsts):
+            thread = threading.Thread(target=self._capture_loop, args=(stream, first),
+                                      name=f"hgl-capture-{stream}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        self._stopped_at = time.time()
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        for cell in self.cells:
+            cell.end()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close()
+        self._threads = []
+
+    def _capture_loop(self, stream, first):
+        source = self.sources[stream]
+        ring = self.rings[stream]
+        cell = self.cells[stream]
+        height, width = ring.shape[:2]
+        frame, frame_no = first, 0
+        while not self._stop_event.is_set():
+            frame_no += 1
+            slot, view = ring.begin_write()
+            if frame is None:
+                ret, frame = source.read(view)
+                if not ret:
+                    ring.publish(slot, 0)
+                    if not getattr(source, "live", True):
+                        self.finished[stream] = True
+                        cell.end()    # the worker handles the last frame, then exits
+                        return
+                    self.metrics.inc("frames.read_failures")
+                    time.sleep(0.03)
+                    continue
+            if frame is not view:
+                # Sources that can't decode in place (or change size) return a new array
+                if frame.shape == view.shape:
+                    np.copyto(view, frame)
+                else:
+                    cv2.resize(frame, (width, height), dst=view)
+            ring.publish(slot, frame_no)
+            frame = None
+            self.metrics.inc(f"stream{stream}.captured")
+            if not getattr(source, "live", True):
+                # Recorded sources don't skip frames: wait until the worker has the last one
+                while not cell.wait_taken(frame_no - 1, 0.1):
+                    if self._stop_event.is_set():
+                        return
+            cell.publish(slot, frame_no, time.time())
+
+    def done(self):
+        """True once every worker has exited and its results were dispatched."""
+        return (not any(process.is_alive() for process in self.processes)
+                and self.results.empty())
+
+    def dispatch(self, result, on_done=None):
+        """Apply one StreamResult: engine update, shared lock state and actions."""
+        stream = result.stream
+        if result.stale:
+            self.frames_stale[stream] += 1
+            return None
+        self.frames_inferred[stream] += 1
+        self.frames_skipped[stream] += result.skipped
+        self.metrics.tick(f"stream{stream}.inference_fps")
+        self.metrics.tick("inference_fps")
+        self.metrics.observe("stage.hands_process_ms", result.infer_ms)
+        self.metrics.observe("frame_latency_ms", (time.time() - result.captured_at) * 1000.0)
+
+        height, width = self.rings[stream].shape[:2]
+        engine = self.engines[stream]
+        outcome = engine.process(results_from_arrays(result.points), width, height,
+                                 now=result.captured_at)
+        for event in outcome.events:
+            if event.type == "unlock":
+                for other in self.engines:
+                    other.is_locked = False
+                self.journal.record("unlock", f"Unlocked on stream {stream} by "
+                                              f"'{event.data['label']}' "
+                                              f"(distance {event.data['distance']:.3f})", "+",
+                                    stream=stream, label=event.data["label"],
+                                    distance=round(float(event.data["distance"]), 4))
+            elif event.type == "action":
+                self.journal.record("action", stream=stream, name=event.data["name"],
+                                    fingers=outcome.fingers)
+                self._run_action(event.data["name"], result, on_done)
+        return outcome
+
+    def lock(self):
+        for engine in self.engines:
+            engine.lock()
+
+    def _run_action(self, name, result, on_done):
+        now = time.time()
+        if now - self._last_action < self.action_cooldown:
+            # Two cameras seeing the same gesture must not fire it twice
+            return
+        self._last_action = now
+        if self.actions is None:
+            self.journal.record("action_not_run", f"Stream {result.stream}: {name}",
+                                stream=result.stream, name=name)
+            return
+        frame_rgb = None
+        if name == "photo":
+            ring = self.rings[result.stream]
+            bgr = np.empty(ring.shape, dtype=np.uint8)
+            if not ring.read(result.slot, result.frame_no, bgr):
+                self.journal.record("action_skipped", "Photo frame was already overwritten; skipped.",
+                                    "!", stream=result.stream, name=name)
+                return
+            frame_rgb = cv2.cvtColor(cv2.flip(bgr, 1), cv2.COLOR_BGR2RGB)
+        if not self.actions.dispatch(name, frame_rgb, on_done=on_done):
+            self.journal.record("action_skipped", f"Busy: '{name}' skipped.", "!",
+                                stream=result.stream, name=name)
+
+    def run(self, duration=None, on_done=None):
+        """Dispatch results until `duration` passes, all sources end, or Ctrl+C."""
+        deadline = time.time() + duration if duration else None
+        try:
+            while deadline is None or time.time() < deadline:
+                if self.executor is not None:
+                    self.executor.poll()
+                try:
+                    result = self.results.get(timeout=0.5)
+                except queue.Empty:
+                    if self.done():
+                        break
+                    continue
+                self.dispatch(result, on_done)
+        except KeyboardInterrupt:
+            pass
+
+    def stats(self):
+        """Per-stream counters and average inference rates since start()."""
+        elapsed = 0.0
+        if self._started_at is not None:
+            elapsed = max((self._stopped_at or time.time()) - self._started_at, 1e-9)
+        streams = []
+        for stream, ring in enumerate(self.rings):
+            streams.append({
+                "stream": stream,
+                "shape": list(ring.shape),
+                "inferred": self.frames_inferred[stream],
+                "skipped_by_worker": self.frames_skipped[stream],
+                "stale": self.frames_stale[stream],
+                "inference_fps": round(self.frames_inferred[stream] / elapsed, 1) if elapsed else 0.0,
+            })
+        total = sum(self.frames_inferred)
+        return {
+            "streams": streams,
+            "seconds": round(elapsed, 1),
+            "total_inference_fps": round(total / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def run_multicam(args):
+    _, profile = profiles_from_args(args)
+    sources = []
+    for spec in args.sources:
+        source = open_frame_source(spec, realtime=not args.fast, loop=args.loop,
+                                   width=profile.width, height=profile.height,
+                                   camera_backend=args.camera_backend)
+        if not source.isOpened():
+            print("[!] Frame source could not be opened:", spec)
+            for opened in sources:
+                opened.release()
+            return 2
+        sources.append(source)
+
+    metrics = MetricsRegistry()
+    exporters = start_metrics_exporters(metrics, args,
+                                        routes={"/memory": MemoryProbe().snapshot})
+    journal = journal_from_args(args)
+    metrics.gauge("journal", journal.stats)
+    executor = ActionExecutor(metrics=metrics)
+    capture = capture_from_args(args)
+    capture.start()
+    actions = GestureActions(executor, capture, screenshots=screenshots_from_args(args))
+    runner = MultiCameraRunner(sources, load_template_store(args.templates),
+                               threshold=args.threshold, metrics=metrics,
+                               actions=actions, executor=executor,
+                               max_hands=args.max_hands, roi=roi_from_args(args),
+                               profile=profile, journal=journal)
+
+    def on_done(result):
+        latency_ms = round(result.run_time * 1000.0, 1)
+        if result.ok:
+            journal.record(result.name, paths=result_paths(result), latency_ms=latency_ms)
+        else:
+            journal.record("action_failed", f"Action '{result.name}' failed: {result.error}", "!",
+                           name=result.name, error=str(result.error), latency_ms=latency_ms)
+
+    print(f"[+] Multi-camera running on {len(sources)} stream(s) (Ctrl+C to stop).")
+    try:
+        runner.start()
+        runner.run(duration=args.duration, on_done=on_done)
+    finally:
+        runner.stop()
+        executor.shutdown()
+        capture.shutdown()
+        journal.close()
+        for source in sources:
+            source.release()
+        for exporter in exporters:
+            exporter.close()
+        print("[i] Streams:", json.dumps(runner.stats()))
+    return 0
+
+
+# ==================== THRESHOLD TUNING ====================
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+# Hands instance of a tuning worker process (see init_tuning_worker)
+_tuning_hands = None
+
+
+def collect_samples(directories):
+    """Image and video files under `directories` (recursively), in a stable order."""
+    paths = []
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(directory):
+            for name in filenames:
+                if name.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS):
+                    paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def init_tuning_worker():
+    global _tuning_hands
+    # Samples are unrelated stills, so no tracking between them
+    _tuning_hands = create_hands(1, static=True)
+
+
+def _sample_feature(image):
+    """Feature of the first hand in a BGR image (mirrored like the app), or None."""
+    rgb = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+    found = _tuning_hands.process(rgb).multi_hand_landmarks
+    if not found:
+        return None
+    return extract_hand_feature(found[0].landmark)
+
+
+def extract_sample_features(paths, video_stride=5):
+    """
+    Worker job: features for a batch of image/video files (every
+    `video_stride`-th video frame). Returns ((K, 42) features, samples without a hand).
+    """
+    features = []
+    misses = 0
+    for path in paths:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            cap = cv2.VideoCapture(path)
+            index = 0
+            while True:
+                ret = cap.grab()
+                if not ret:
+                    break
+                if index % video_stride == 0:
+                    ret, frame = cap.retrieve()
+                    feature = _sample_feature(frame) if ret else None
+                    if feature is None:
+                        misses += 1
+                    else:
+                        features.append(feature)
+                index += 1
+            cap.release()
+            continue
+        image = cv2.imread(path)
+        feature = _sample_feature(image) if image is not None else None
+        if feature is None:
+            misses += 1
+        else:
+            features.append(feature)
+    return np.asarray(features, dtype=np.float32).reshape(-1, FEATURE_DIM), misses
+
+
+def extract_features_parallel(pool, paths, chunk_size=32, video_stride=5, name=""):
+    """
+    Run extract_sample_features over `pool` (a ProcessPoolExecutor started
+    with init_tuning_worker). Returns (features, misses).
+    """
+    # Images are batched to keep IPC small; each video is its own job
+    videos = [[p] for p in paths if p.lower().endswith(VIDEO_EXTENSIONS)]
+    images = [p for p in paths if not p.lower().endswith(VIDEO_EXTENSIONS)]
+    jobs = videos + [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+
+    features, misses, done = [], 0, 0
+    futures = [pool.submit(extract_sample_features, job, video_stride) for job in jobs]
+    for future in concurrent.futures.as_completed(futures):
+        batch, missed = future.result()
+        features.append(batch)
+        misses += missed
+        done += 1
+        if done % 50 == 0 or done == len(jobs):
+            print(f"[i] {name}: {done}/{len(jobs)} jobs, "
+                  f"{sum(len(b) for b in features)} hands")
+    if not features:
+        return np.empty((0, FEATURE_DIM), dtype=np.float32), misses
+    return np.concatenate(features), misses
+
+
+def nearest_distances(matcher, features, batch_size=4096):
+    """Distance from each feature row to its nearest enrolled template (what the lock uses)."""
+    out = np.empty(len(features), dtype=np.float32)
+    for start in range(0, len(features), batch_size):
+        matches = matcher.match_batch(features[start:start + batch_size])
+        out[start:start + len(matches)] = [m.distance for m in matches]
+    return out
+
+
+def roc_curve(genuine, impostor):
+    """
+    Error rates at every candidate threshold (a hand unlocks when distance < threshold).
+    Returns (thresholds, far, frr) arrays.
+    """
+    genuine = np.sort(np.asarray(genuine, dtype=np.float64))
+    impostor = np.sort(np.asarray(impostor, dtype=np.float64))
+    thresholds = np.unique(np.concatenate([genuine, impostor, [0.0, np.inf]]))
+    far = np.searchsorted(impostor, thresholds, side="left") / max(len(impostor), 1)
+    frr = 1.0 - np.searchsorted(genuine, thresholds, side="left") / max(len(genuine), 1)
+    return thresholds, far, frr
+
+
+def tune_threshold(genuine, impostor, target_far=None, current=0.12, roc_points=200):
+    """
+    JSON-ready report: distance distributions, ROC points, the equal error
+    rate, error rates at `current`, and a recommended threshold (the EER
+    point, or the largest threshold with FAR <= `target_far`).
+    """
+    thresholds, far, frr = roc_curve(genuine, impostor)
+    finite = np.isfinite(thresholds)
+    thresholds, far, frr = thresholds[finite], far[finite], frr[finite]
+
+    eer_index = int(np.argmin(np.abs(far - frr)))
+    recommended = float(thresholds[eer_index])
+    if target_far is not None:
+        allowed = np.flatnonzero(far <= target_far)
+        if len(allowed):
+            recommended = float(thresholds[allowed[-1]])
+
+    def rates_at(threshold):
+        i = int(np.searchsorted(thresholds, threshold, side="left"))
+        i = min(i, len(thresholds) - 1)
+        return {"threshold": round(float(threshold), 4),
+                "far": round(float(far[i]), 5), "frr": round(float(frr[i]), 5)}
+
+    top = max(float(np.max(genuine, initial=0.0)), float(np.max(impostor, initial=0.0)), 1e-6)
+    bins = np.linspace(0.0, top, 41)
+    step = max(1, len(thresholds) // roc_points)
+    return {
+        "genuine": distribution_summary(genuine),
+        "impostor": distribution_summary(impostor),
+        "histogram": {
+            "bins": [round(float(b), 4) for b in bins],
+            "genuine": np.histogram(genuine, bins)[0].tolist(),
+            "impostor": np.histogram(impostor, bins)[0].tolist(),
+        },
+        "roc": [rates_at(t) for t in thresholds[::step]],
+        "eer": round(float((far[eer_index] + frr[eer_index]) / 2.0), 5),
+        "eer_threshold": round(float(thresholds[eer_index]), 4),
+        "current": rates_at(current),
+        "recommended": rates_at(recommended),
+        "target_far": target_far,
+    }
+
+
+def run_tune(args):
+    store = TemplateStore(args.templates)
+    if not len(store):
+        print("[!] No enrolled templates in", args.templates)
+        return 2
+    matcher = TemplateMatcher.from_store(store)
+
+    samples = {"genuine": collect_samples(args.genuine),
+               "impostor": collect_samples(args.impostor)}
+    for name, paths in samples.items():
+        if not paths:
+            print(f"[!] No {name} images or videos found.")
+            return 2
+
+    scores = {}
+    started = time.perf_counter()
+    # One pool for both sets: every worker loads the hand model only once.
+    # spawn: forking a process whose OpenCV threads are running is unsafe
+    with concurrent.futures.ProcessPoolExecutor(
+            args.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_tuning_worker) as pool:
+        for name, paths in samples.items():
+            features, misses = extract_features_parallel(
+                pool, paths, video_stride=args.video_stride, name=name)
+            scores[name] = nearest_distances(matcher, features)
+            print(f"[+] {name}: {len(paths)} file(s), {len(features)} hand(s), "
+                  f"{misses} sample(s) without a hand")
+    elapsed = time.perf_counter() - started
+
+    if not len(scores["genuine"]) or not len(scores["impostor"]):
+        print("[!] Need at least one detected hand in both sets.")
+        return 2
+
+    report = tune_threshold(scores["genuine"], scores["impostor"],
+                            target_far=args.target_far, current=args.threshold)
+    report["seconds"] = round(elapsed, 1)
+    report["templates"] = len(store)
+
+    print(f"[i] EER {report['eer'] * 100:.2f}% at threshold {report['eer_threshold']:.3f}")
+    current, best = report["current"], report["recommended"]
+    print(f"[i] Current  {current['threshold']:.3f}: "
+          f"FAR {current['far'] * 100:.2f}%  FRR {current['frr'] * 100:.2f}%")
+    print(f"[+] Recommended {best['threshold']:.3f}: "
+          f"FAR {best['far'] * 100:.2f}%  FRR {best['frr'] * 100:.2f}%")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Tuning report written: {args.output}")
+    return 0
+
+
+# ==================== BENCHMARK ====================
+
+class StageTimer:
+    """Collects wall-clock durations per named stage."""
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def summary(self):
+        return {name: latency_summary(values) for name, values in self.samples.items()}
+
+
+def latency_summary(seconds):
+    """p50/p95/p99 (in milliseconds) of a list of durations in seconds."""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    if ms.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+class AllocationTracker:
+    """
+    Per-stage allocation meter built on tracemalloc.
+    Records the peak number of bytes a stage allocated above its starting point.
+    """
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self.samples[name].append(max(0, peak - before))
+
+    def summary(self, frames):
+        stages = {
+            name: round(sum(values) / max(1, frames) / 1024.0, 2)
+            for name, values in self.samples.items()
+        }
+        return {
+            "kib_per_frame": round(sum(stages.values()), 2),
+            "stages_kib_per_frame": stages,
+        }
+
+
+def run_frame_stages(slot, hands, preview, meter, render_tk=False):
+    """
+    The frame-loop processing chain (inference worker + UI), split into
+    individually measured stages. `slot.raw` holds the camera frame and
+    `meter` is a StageTimer or AllocationTracker.
+    """
+    rgb = slot.ensure_rgb()
+    with meter.stage("flip"):
+        cv2.flip(slot.raw, 1, dst=rgb)
+    with meter.stage("cvtColor"):
+        cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB, dst=rgb)
+    with meter.stage("hands_process"):
+        results = hands.process(rgb)
+
+    if results.multi_hand_landmarks:
+        hand_landmarks = results.multi_hand_landmarks[0]
+        with meter.stage("draw_landmarks"):
+            draw_hand(rgb, hand_landmarks)
+        with meter.stage("landmarks_to_array"):
+            points = landmarks_to_array(hand_landmarks.landmark)
+        with meter.stage("extract_hand_feature"):
+            extract_hand_feature(points)
+        with meter.stage("count_fingers"):
+            count_fingers(points)
+
+    with meter.stage("preview_fit"):
+        fitted = preview.fit(rgb)
+    if render_tk:
+        with meter.stage("preview_render"):
+            preview.render(fitted)
+    else:
+        with meter.stage("fromarray"):
+            Image.fromarray(fitted)
+
+    return results
+
+
+def run_benchmark(source, frames=300, warmup=10, allocation_frames=100, use_tk=False):
+    """
+    Feed frames from `source` through the processing stages and return a
+    JSON-serialisable report with per-stage latency, FPS and allocations.
+    """
+    hands = create_hands()
+    tk_root = None
+    if use_tk:
+        import tkinter as tk
+        tk_root = tk.Tk()
+        tk_root.withdraw()
+
+    slot = FrameSlot()
+    preview = PreviewRenderer(master=tk_root)
+    timer = StageTimer()
+    allocations = AllocationTracker()
+    processed = 0
+    hand_frames = 0
+    started = None
+
+    try:
+        while processed < warmup + frames + allocation_frames:
+            read_start = time.perf_counter()
+            ret, frame = source.read(slot.raw)
+            if not ret:
+                break
+            slot.raw = frame
+            read_time = time.perf_counter() - read_start
+
+            if processed < warmup:
+                run_frame_stages(slot, hands, preview, StageTimer(), use_tk)
+            elif processed < warmup + frames:
+                if started is None:
+                    started = time.perf_counter()
+                frame_start = time.perf_counter()
+                results = run_frame_stages(slot, hands, preview, timer, use_tk)
+                timer.add("read", read_time)
+                timer.add("total", time.perf_counter() - frame_start)
+                if results.multi_hand_landmarks:
+                    hand_frames += 1
             else:
-                # Time is up: capture photo
-                filename = os.path.join(
-                    self.photo_dir,
-                    f"photo_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                )
-                cv2.imwrite(filename, frame)
-                print(f"[+] Photo saved: {filename}")
-                self.photo_anim_frames = 12  # trigger flash animation
-                self.command_cooldown = self.COOLDOWN_TIME
-                self.photo_countdown_active = False
-                status_text = "Photo captured."
+                # Separate pass: tracemalloc slows everything down, so it
+                # must not run while latencies are measured.
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                run_frame_stages(slot, hands, preview, allocations, use_tk)
+            processed += 1
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        hands.close()
+        source.release()
+        if tk_root is not None:
+            tk_root.destroy()
 
-        # Cooldown decrease
-        if self.command_cooldown > 0:
-            self.command_cooldown -= 1
+    measured = len(timer.samples.get("total", []))
+    elapsed = (time.perf_counter() - started) if started is not None else 0.0
+    allocation_count = max(0, processed - warmup - measured)
 
-        # ---- SHORT ANIMATIONS (SAVE / UNLOCK / PHOTO / SCREENSHOT) ----
-        if hand_center:
-            # Save animation: yellow ring
-            if self.save_anim_frames > 0:
-                radius = 50 + (self.save_anim_frames * 2)
-                cv2.circle(frame, hand_center, radius, (250, 204, 21), 2)  # amber-400
-                self.save_anim_frames -= 1
+    return {
+        "format": 1,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "mediapipe": getattr(sys.modules.get("mediapipe"), "__version__", "unknown"),
+            "numpy": np.__version__,
+        },
+        "frames": measured,
+        "hand_frames": hand_frames,
+        "end_to_end": {
+            "fps": round(measured / elapsed, 2) if elapsed > 0 else 0.0,
+            "processing_fps": round(
+                measured / max(1e-9, sum(timer.samples.get("total", []))), 2
+            ),
+        },
+        "stages": timer.summary(),
+        "allocations": allocations.summary(allocation_count) if allocation_count else {},
+    }
 
-            # Unlock animation: green glow
-            if self.unlock_anim_frames > 0:
-                radius = 60 + (20 - self.unlock_anim_frames)
-                cv2.circle(frame, hand_center, radius, (74, 222, 128), 3)  # green-400
-                self.unlock_anim_frames -= 1
 
-        # Photo / screenshot flash animation (screen border)
-        if self.photo_anim_frames > 0:
-            thickness = 4 + self.photo_anim_frames
-            cv2.rectangle(frame, (0, 0), (w - 1, h - 1), (255, 255, 255), thickness)
-            self.photo_anim_frames -= 1
+def compare_benchmarks(report, baseline, tolerance=0.15, min_delta_ms=0.2):
+    """
+    Compare p50/p95 per stage against a baseline report.
+    Returns (lines, regressed) where `regressed` lists stages that got slower
+    by more than `tolerance` (relative) and `min_delta_ms` (absolute).
+    """
+    lines = [f"{'stage':<22}{'p50 old':>10}{'p50 new':>10}{'p95 old':>10}{'p95 new':>10}{'change':>9}"]
+    regressed = []
+    for name, new in sorted(report["stages"].items()):
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("count") or not new.get("count"):
+            continue
+        change = (new["p95_ms"] - old["p95_ms"]) / max(old["p95_ms"], 1e-6)
+        lines.append(
+            f"{name:<22}{old['p50_ms']:>10.3f}{new['p50_ms']:>10.3f}"
+            f"{old['p95_ms']:>10.3f}{new['p95_ms']:>10.3f}{change:>+9.1%}"
+        )
+        if change > tolerance and new["p95_ms"] - old["p95_ms"] > min_delta_ms:
+            regressed.append(name)
+    return lines, regressed
 
-        # Update status text
-        self.set_status(status_text)
 
-        # Convert BGR frame to RGB for Tkinter
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame_rgb)
-        img = img.resize((640, 480))
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.video_label.imgtk = imgtk
-        self.video_label.configure(image=imgtk)
+def format_benchmark(report):
+    lines = [f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for name, stats in report["stages"].items():
+        lines.append(
+            f"{name:<22}{stats['count']:>7}{stats['p50_ms']:>10.3f}"
+            f"{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+        )
+    lines.append(
+        f"frames: {report['frames']} (hand in {report['hand_frames']}), "
+        f"end-to-end FPS: {report['end_to_end']['fps']}, "
+        f"processing FPS: {report['end_to_end']['processing_fps']}"
+    )
+    if report["allocations"]:
+        lines.append(f"allocated per frame: {report['allocations']['kib_per_frame']} KiB")
+    return lines
 
-        # Schedule next frame
-        self.root.after(30, self.update_frame)
 
-    # ------------------ CLOSE APP ------------------
+def run_profile_comparison(open_source, profiles, max_hands=2, duration=None, roi=None):
+    """
+    Run the capture/inference pipeline once per profile, each on a fresh
+    source from `open_source(profile)` (the same recording for all of them).
+    Reports capture-to-result latency, inference time, the delivered frame
+    rate and CPU use (all threads of this process, % of one core).
+    With RoiOptions `roi`, every profile runs a second time with ROI tracking
+    (reported as "NAME+roi"), so the savings show side by side.
+    """
+    report = {}
+    runs = [(profile, options) for profile in profiles
+            for options in ([None, roi] if roi is not None else [None])]
+    for profile, options in runs:
+        name = profile.name + ("+roi" if options is not None else "")
+        metrics = MetricsRegistry(window=1 << 16)
+        source = open_source(profile)
+        if not source.isOpened():
+            raise RuntimeError("Frame source could not be opened.")
+        hands = create_hands(max_hands, profile=profile)
+        hands.process(np.zeros((profile.height, profile.width, 3), dtype=np.uint8))
+        pipeline = FramePipeline(source, hands, metrics=metrics, profile=profile,
+                                 max_hands=max_hands, roi=options)
+        latencies = []
+        hand_frames = 0
+        deadline = time.time() + duration if duration else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        pipeline.start()
+        try:
+            while deadline is None or time.time() < deadline:
+                packet = pipeline.get(timeout=0.2)
+                if packet is None:
+                    if pipeline.done():
+                        break
+                    continue
+                latencies.append(time.time() - packet.captured_at)
+                hand_frames += bool(packet.results.multi_hand_landmarks)
+                pipeline.release(packet)
+        finally:
+            pipeline.stop()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            source.release()
 
-    def on_close(self):
-        if self.cap.isOpened():
-            self.cap.release()
-        cv2.destroyAllWindows()
-        self.root.destroy()
+        counters = metrics.snapshot()["counters"]
+        inference = np.asarray(metrics.histogram("stage.hands_process_ms")) / 1000.0
+        report[name] = {
+            "profile": profile._asdict(),
+            "frames": len(latencies),
+            "hand_frames": hand_frames,
+            "seconds": round(wall, 2),
+            "fps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+            "paced_out": counters.get("frames.paced_out", 0),
+            "dropped": pipeline.capture_queue.dropped,
+            "cpu_percent": round(100.0 * cpu / wall, 1) if wall > 0 else 0.0,
+            "latency": latency_summary(latencies),
+            "hands_process": latency_summary(inference),
+        }
+        if options is not None:
+            report[name]["roi"] = {key: counters.get(f"roi.{key}", 0)
+                                   for key in ("full_frames", "crop_frames", "track_lost",
+                                               "reseeds")}
+    return report
+
+
+def format_profile_comparison(report):
+    lines = [f"{'profile':<17}{'frames':>7}{'hands':>7}{'fps':>7}{'infer p50':>11}{'infer p95':>11}"
+             f"{'latency p50':>13}{'latency p95':>13}{'CPU %':>8}"]
+    for name, stats in report.items():
+        infer, latency = stats["hands_process"], stats["latency"]
+        lines.append(
+            f"{name:<17}{stats['frames']:>7}{stats['hand_frames']:>7}{stats['fps']:>7.1f}"
+            f"{infer.get('p50_ms', 0):>11.2f}{infer.get('p95_ms', 0):>11.2f}"
+            f"{latency.get('p50_ms', 0):>13.2f}{latency.get('p95_ms', 0):>13.2f}"
+            f"{stats['cpu_percent']:>8.1f}"
+        )
+    return lines
+
+
+def run_screenshot_benchmark(providers, count=30, warmup=2):
+    """Time grab() of each provider. Returns {backend: latency summary + image shape}."""
+    report = {}
+    for provider in providers:
+        for _ in range(warmup):
+            image = provider.grab()
+        times = []
+        for _ in range(count):
+            started = time.perf_counter()
+            image = provider.grab()
+            times.append(time.perf_counter() - started)
+        report[provider.name] = dict(latency_summary(times), shape=list(image.shape))
+    return report
 
 
 # ==================== MAIN ====================
 
-if __name__ == "__main__":
+def add_source_arguments(parser, default_source="camera"):
+    parser.add_argument(
+        "--source", default=default_source,
+        help="camera[:INDEX], video:PATH, images:DIR or synthetic[:FRAMES]"
+    )
+    parser.add_argument("--fast", action="store_true",
+                        help="play recorded/synthetic sources as fast as possible")
+    parser.add_argument("--loop", action="store_true",
+                        help="restart video/image sources when they end")
+    parser.add_argument("--camera-backend", choices=sorted(CAMERA_BACKENDS),
+                        help="override the platform default capture backend")
+    parser.add_argument("--width", type=int,
+                        help="capture width (default: from the profile, else 640)")
+    parser.add_argument("--height", type=int,
+                        help="capture height (default: from the profile, else 480)")
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile",
+                        help=f"performance profile: {', '.join(PROFILES)} or one defined "
+                             f"in --config (default: {DEFAULT_PROFILE})")
+    parser.add_argument("--config", help="JSON file with a default profile and custom profiles")
+
+
+def profiles_from_args(args):
+    """
+    (profiles, selected profile) from --config and --profile. An explicit
+    --width/--height overrides the resolution of every profile, so it also
+    holds after switching profiles at runtime.
+    """
+    profiles, selected = PROFILES, None
+    if args.config:
+        profiles, selected = load_profile_config(args.config)
+    name = args.profile or selected or DEFAULT_PROFILE
+    if name not in profiles:
+        raise ValueError(f"Unknown profile {name!r} (choose from {', '.join(profiles)})")
+    if args.width or args.height:
+        profiles = {key: profile._replace(width=args.width or profile.width,
+                                          height=args.height or profile.height)
+                    for key, profile in profiles.items()}
+    return profiles, profiles[name]
+
+
+def add_tracking_arguments(parser):
+    parser.add_argument("--max-hands", type=int, default=2,
+                        help="hands tracked per frame; only the enrolled one issues gestures")
+    parser.add_argument("--roi-tracking", action="store_true",
+                        help="after a detection, infer only on a crop around the hand")
+    parser.add_argument("--roi-size", type=int, default=256,
+                        help="crop side in pixels after resizing")
+    parser.add_argument("--roi-padding", type=float, default=0.8,
+                        help="padding around the landmark box, as a fraction of its size")
+    parser.add_argument("--redetect-every", type=int, default=30,
+                        help="frames between full-frame re-detections while tracking")
+    parser.add_argument("--roi-bounds", action="store_true",
+                        help="limit all inference to the on-screen ROI rectangle")
+
+
+def roi_from_args(args):
+    if not (args.roi_tracking or args.roi_bounds):
+        return None
+    # --roi-bounds alone: crops stay within the ROI but are always re-detected
+    redetect = args.redetect_every if args.roi_tracking else 0
+    return RoiOptions(args.roi_size, args.roi_padding, redetect,
+                      BASE_ROI if args.roi_bounds else None)
+
+
+def add_trace_arguments(parser):
+    parser.add_argument("--record-trace", metavar="PATH",
+                        help="record hand landmarks to a trace file for the replay command")
+
+
+def trace_from_args(args):
+    if not args.record_trace:
+        return None
+    return LandmarkTraceWriter(args.record_trace, args.max_hands)
+
+
+def add_journal_arguments(parser):
+    parser.add_argument("--journal", metavar="PATH",
+                        help="append events (unlocks, captures, failures) to this JSON-lines file")
+    parser.add_argument("--journal-max-mb", type=float, default=10.0,
+                        help="rotate the journal at this size")
+    parser.add_argument("--journal-backups", type=int, default=5,
+                        help="rotated journal files to keep")
+
+
+def journal_from_args(args):
+    return EventJournal(args.journal, max_bytes=int(args.journal_max_mb * (1 << 20)),
+                        backups=args.journal_backups)
+
+
+# Age units for parse_time, in seconds; a plural "s" is accepted too (15mins, 2hours)
+AGE_UNITS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60,
+             "h": 3600, "hr": 3600, "hour": 3600, "d": 86400, "day": 86400}
+TIME_FORMATS = ("unix seconds, an ISO date/time (2025-06-01 or 2025-06-01T12:30) "
+                "or an age such as 90s, 15min, 2h or 7d")
+
+
+def parse_time(spec):
+    """Unix seconds, an ISO date/time, or an age such as 90s, 15min, 2h or 7days ago."""
+    age = re.fullmatch(r"(\d+(?:\.\d*)?)\s*([a-z]+?)s?", spec.strip().lower())
+    if age and age.group(2) in AGE_UNITS:
+        return time.time() - float(age.group(1)) * AGE_UNITS[age.group(2)]
+    try:
+        return float(spec)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(spec.strip()).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {spec!r}: use {TIME_FORMATS}") from None
+
+
+def add_idle_arguments(parser):
+    parser.add_argument("--no-idle", action="store_true",
+                        help="always run hand inference at full rate")
+    parser.add_argument("--idle-after", type=float, default=5.0,
+                        help="seconds without a hand before going idle")
+    parser.add_argument("--idle-fps", type=float, default=2.0,
+                        help="inference rate while idle")
+    parser.add_argument("--idle-scale", type=float, default=0.5,
+                        help="inference resolution scale while idle")
+
+
+def add_capture_arguments(parser):
+    parser.add_argument("--photo-format", default="png",
+                        help="png[:0-9], jpeg[:0-100], webp[:0-100] or npy")
+    parser.add_argument("--screenshot-format", default="png",
+                        help="png[:0-9], jpeg[:0-100], webp[:0-100] or npy")
+    parser.add_argument("--encode-workers", type=int,
+                        help="processes used to encode captures (default: up to 2)")
+    parser.add_argument("--screenshot-backend", default="auto",
+                        choices=["auto"] + sorted(SCREENSHOT_BACKENDS),
+                        help="auto = mss if installed, else pyautogui")
+    parser.add_argument("--screenshot-monitor", type=int,
+                        help="capture one monitor (mss: 1..N; default: all)")
+    parser.add_argument("--screenshot-region", metavar="X,Y,W,H",
+                        help="capture only this region (relative to the monitor)")
+    parser.add_argument("--photo-pick", choices=("closest", "sharpest"), default="closest",
+                        help="photo frame: closest to the countdown end, or sharpest just before it")
+    parser.add_argument("--photo-window", type=float, default=0.3,
+                        help="seconds before the countdown end searched by --photo-pick sharpest")
+    parser.add_argument("--burst", type=int, default=1,
+                        help="save this many of the latest frames per photo")
+    parser.add_argument("--precapture-frames", type=int, default=15,
+                        help="clean frames kept for photos (0: use the current frame)")
+
+
+def capture_from_args(args):
+    return CaptureWriter(
+        formats={
+            "photo": parse_capture_format(args.photo_format),
+            "screenshot": parse_capture_format(args.screenshot_format),
+        },
+        workers=args.encode_workers,
+    )
+
+
+def screenshots_from_args(args):
+    return open_screenshot_provider(args.screenshot_backend, args.screenshot_monitor,
+                                    parse_region(args.screenshot_region))
+
+
+def photo_options_from_args(args):
+    # A burst needs at least that many buffered frames
+    buffer_frames = args.precapture_frames and max(args.precapture_frames, args.burst)
+    return PhotoOptions(args.photo_pick, args.photo_window, args.burst, buffer_frames)
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve metrics as JSON on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file",
+                        help="append a metrics snapshot as a JSON line to this file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                        help="seconds between --metrics-file snapshots")
+    parser.add_argument("--debug-overlay", action="store_true",
+                        help="show FPS/latency on the preview (toggle with D)")
+    parser.add_argument("--tracemalloc", type=int, default=0, metavar="FRAMES",
+                        help="trace Python allocations (stack depth FRAMES) so /memory "
+                             "reports allocation sites; slows the app down")
+
+
+def start_metrics_exporters(registry, args, routes=None):
+    """Start the exporters requested on the command line. Returns objects with close()."""
+    if args.tracemalloc and not tracemalloc.is_tracing():
+        tracemalloc.start(args.tracemalloc)
+    exporters = []
+    if args.metrics_port is not None:
+        server = MetricsServer(registry, args.metrics_port, routes=routes)
+        print(f"[+] Metrics on http://127.0.0.1:{server.port}/metrics"
+              + "".join(f", {path}" for path in sorted(routes or ())))
+        exporters.append(server)
+    if args.metrics_file:
+        exporters.append(MetricsDumper(registry, args.metrics_file, args.metrics_interval))
+    return exporters
+
+
+def idle_from_args(args):
+    if args.no_idle:
+        return None
+    return IdleController(args.idle_after, args.idle_fps, args.idle_scale)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Hand Gesture Lock & Control")
+    commands = parser.add_subparsers(dest="command")
+
+    gui = commands.add_parser("gui", help="run the Tk application (default)")
+    add_source_arguments(gui)
+    add_profile_arguments(gui)
+    add_tracking_arguments(gui)
+    add_trace_arguments(gui)
+    add_idle_arguments(gui)
+    add_capture_arguments(gui)
+    add_journal_arguments(gui)
+    gui.add_argument("--overlays-at-preview", action="store_true",
+                     help="draw overlays on the 640x480 preview instead of the full frame")
+    gui.add_argument("--threshold", type=float, default=0.12,
+                     help="maximum template distance that unlocks (see the tune command)")
+    add_metrics_arguments(gui)
+
+    daemon = commands.add_parser("daemon", help="run lock and gestures headless, without Tk")
+    add_source_arguments(daemon)
+    add_profile_arguments(daemon)
+    add_tracking_arguments(daemon)
+    add_trace_arguments(daemon)
+    add_idle_arguments(daemon)
+    add_capture_arguments(daemon)
+    add_journal_arguments(daemon)
+    add_metrics_arguments(daemon)
+    daemon.add_argument("--templates", default="hand_templates.bin",
+                        help="enrolled hand template store")
+    daemon.add_argument("--threshold", type=float, default=0.12,
+                        help="maximum template distance that unlocks")
+    daemon.add_argument("--duration", type=float,
+                        help="stop after this many seconds")
+    daemon.add_argument("--verbose", action="store_true",
+                        help="print every status change")
+
+    multicam = commands.add_parser(
+        "multicam", help="headless, several sources with one inference process each")
+    multicam.add_argument("--sources", nargs="+", required=True, metavar="SOURCE",
+                          help="two or more of camera[:INDEX], video:PATH, images:DIR, synthetic[:FRAMES]")
+    multicam.add_argument("--fast", action="store_true",
+                          help="play recorded/synthetic sources as fast as possible")
+    multicam.add_argument("--loop", action="store_true",
+                          help="restart video/image sources when they end")
+    multicam.add_argument("--camera-backend", choices=sorted(CAMERA_BACKENDS),
+                          help="override the platform default capture backend")
+    multicam.add_argument("--width", type=int, help="capture width (default: from the profile)")
+    multicam.add_argument("--height", type=int, help="capture height (default: from the profile)")
+    add_profile_arguments(multicam)
+    add_tracking_arguments(multicam)
+    add_capture_arguments(multicam)
+    add_journal_arguments(multicam)
+    add_metrics_arguments(multicam)
+    multicam.add_argument("--templates", default="hand_templates.bin",
+                          help="enrolled hand template store")
+    multicam.add_argument("--threshold", type=float, default=0.12,
+                          help="maximum template distance that unlocks")
+    multicam.add_argument("--duration", type=float,
+                          help="stop after this many seconds")
+
+    replay = commands.add_parser(
+        "replay", help="run a recorded landmark trace through the engine, without MediaPipe")
+    replay.add_argument("trace", help="file written with --record-trace")
+    replay.add_argument("--templates", default="hand_templates.bin",
+                        help="enrolled hand template store")
+    replay.add_argument("--threshold", type=float, default=0.12,
+                        help="maximum template distance that unlocks")
+    replay.add_argument("--events-out", help="write the resulting events as JSON")
+    replay.add_argument("--expect", help="JSON events to compare against (exit 1 on mismatch)")
+    replay.add_argument("--time-tolerance", type=float, default=0.1,
+                        help="seconds an event may move before it counts as a mismatch")
+
+    tune = commands.add_parser(
+        "tune", help="measure false accept/reject rates and recommend an unlock threshold")
+    tune.add_argument("--genuine", nargs="+", required=True, metavar="DIR",
+                      help="images/videos of enrolled operators' hands")
+    tune.add_argument("--impostor", nargs="+", required=True, metavar="DIR",
+                      help="images/videos of other hands")
+    tune.add_argument("--templates", default="hand_templates.bin",
+                      help="enrolled hand template store")
+    tune.add_argument("--threshold", type=float, default=0.12,
+                      help="current threshold, reported for comparison")
+    tune.add_argument("--target-far", type=float,
+                      help="recommend the largest threshold with at most this false accept rate "
+                           "(default: the equal error rate point)")
+    tune.add_argument("--workers", type=int, help="processes (default: all cores)")
+    tune.add_argument("--video-stride", type=int, default=5,
+                      help="use every Nth video frame")
+    tune.add_argument("--output", help="write the JSON report (ROC, histograms) here")
+
+    soak = commands.add_parser(
+        "soak", help="run for hours on a looping source, tracking memory and handle growth")
+    add_source_arguments(soak, default_source="synthetic")
+    add_profile_arguments(soak)
+    add_tracking_arguments(soak)
+    add_idle_arguments(soak)
+    add_capture_arguments(soak)
+    add_journal_arguments(soak)
+    add_metrics_arguments(soak)
+    soak.add_argument("--templates", default="hand_templates.bin",
+                      help="enrolled hand template store")
+    soak.add_argument("--threshold", type=float, default=0.12,
+                      help="maximum template distance that unlocks")
+    soak.add_argument("--duration", type=float, default=4 * 3600.0,
+                      help="seconds to run (default: 4 hours)")
+    soak.add_argument("--interval", type=float, default=60.0,
+                      help="seconds between memory samples")
+    soak.add_argument("--warmup", type=float, default=300.0,
+                      help="seconds at the start that are sampled but not checked for growth")
+    soak.add_argument("--samples-out", default="soak_samples.jsonl",
+                      help="append every sample here as a JSON line")
+    soak.add_argument("--output", help="write the JSON report here")
+    soak.add_argument("--gui", action="store_true",
+                      help="drive the Tk app, preview included (needs a display, e.g. xvfb-run)")
+    soak.add_argument("--gallery-every", type=float, default=0.0,
+                      help="with --gui: open and close the gallery every N seconds")
+    # Recordings loop for the whole run; allocation sites are traced by default
+    soak.set_defaults(loop=True, tracemalloc=1, verbose=False, record_trace=None,
+                      overlays_at_preview=False)
+
+    journal = commands.add_parser("journal", help="query an event journal")
+    journal.add_argument("path", help="file written with --journal (rotated files included)")
+    journal.add_argument("--since", type=parse_time,
+                         help="unix time, ISO date/time, or an age such as 30min, 2h, 7d")
+    journal.add_argument("--until", type=parse_time, help="same formats as --since")
+    journal.add_argument("--type", nargs="+", dest="types", metavar="TYPE",
+                         help="only these event types (e.g. unlock photo screenshot)")
+    journal.add_argument("--summary", action="store_true",
+                         help="print counts per event type instead of the events")
+
+    shots = commands.add_parser("screenshot-bench", help="time the screenshot backends")
+    shots.add_argument("--backends", nargs="+", default=sorted(SCREENSHOT_BACKENDS),
+                       choices=sorted(SCREENSHOT_BACKENDS))
+    shots.add_argument("--monitor", type=int, help="monitor to capture (default: all)")
+    shots.add_argument("--region", metavar="X,Y,W,H", help="region to capture")
+    shots.add_argument("--count", type=int, default=30, help="timed grabs per backend")
+    shots.add_argument("--output", help="write the JSON report here")
+
+    compare = commands.add_parser(
+        "profile-compare", help="latency and CPU of each performance profile on the same input")
+    add_source_arguments(compare, default_source="synthetic:300")
+    compare.add_argument("--profiles", nargs="+", metavar="NAME",
+                         help="profiles to compare (default: all)")
+    compare.add_argument("--config", help="JSON file with custom profiles")
+    add_tracking_arguments(compare)
+    compare.add_argument("--duration", type=float, default=30.0,
+                         help="maximum seconds per profile (recordings stop at their end)")
+    compare.add_argument("--output", help="write the JSON report here")
+
+    bench = commands.add_parser("bench", help="headless per-stage latency benchmark")
+    add_source_arguments(bench, default_source="synthetic")
+    bench.add_argument("--frames", type=int, default=300, help="frames to time")
+    bench.add_argument("--warmup", type=int, default=10)
+    bench.add_argument("--allocation-frames", type=int, default=100,
+                       help="extra frames measured with tracemalloc (0 to skip)")
+    bench.add_argument("--tk", action="store_true",
+                       help="also time the PhotoImage preview update (needs a display)")
+    bench.add_argument("--output", help="write the JSON report here")
+    bench.add_argument("--baseline", help="JSON report to compare against")
+    bench.add_argument("--tolerance", type=float, default=0.15,
+                       help="allowed relative p95 slowdown before failing")
+    return parser
+
+
+def source_from_args(args, realtime=None, profile=None):
+    """Open --source at the profile's resolution (or --width/--height)."""
+    if profile is not None:
+        width, height = profile.width, profile.height
+    else:
+        width, height = args.width or 640, args.height or 480
+    return open_frame_source(
+        args.source,
+        realtime=(not args.fast) if realtime is None else realtime,
+        loop=args.loop,
+        width=width,
+        height=height,
+        camera_backend=args.camera_backend,
+    )
+
+
+def run_gui(args, on_app=None, probe=None):
+    """`on_app(root, app)` is called once the app exists (used by the soak command)."""
+    profiles, profile = profiles_from_args(args)
+    metrics = MetricsRegistry()
+    probe = probe or MemoryProbe()
+    exporters = start_metrics_exporters(metrics, args, routes={"/memory": probe.snapshot})
+    import tkinter as tk
     root = tk.Tk()
-    app = HandGestureLockApp(root)
-    root.mainloop()
+    try:
+        # The source is opened in the background, after the window is up
+        app = HandGestureLockApp(root, source=lambda: source_from_args(args, profile=profile),
+                                 idle=idle_from_args(args),
+                                 capture=capture_from_args(args),
+                                 overlays_at_preview=args.overlays_at_preview,
+                                 metrics=metrics,
+                                 debug_overlay=args.debug_overlay,
+                                 max_hands=args.max_hands,
+                                 trace=trace_from_args(args),
+                                 threshold=args.threshold,
+                                 photo=photo_options_from_args(args),
+                                 screenshots=screenshots_from_args(args),
+                                 roi=roi_from_args(args),
+                                 profile=profile,
+                                 profiles=profiles,
+                                 journal=journal_from_args(args),
+                                 memory_probe=probe)
+        if on_app is not None:
+            on_app(root, app)
+        root.mainloop()
+    finally:
+        for exporter in exporters:
+            exporter.close()
+    return 0
+
+
+def format_soak_report(report):
+    lines = [f"{'series':<14}{'start':>12}{'end':>12}{'per hour':>12}"]
+    for name, stats in report["growth"].items():
+        scale, unit = (1 << 20, " MiB") if name.endswith("_bytes") else (1, "")
+        lines.append(
+            f"{name:<14}{stats['start'] / scale:>12.1f}{stats['end'] / scale:>12.1f}"
+            f"{stats['per_hour'] / scale:>12.1f}{unit}"
+            + ("  GROWING" if stats["growing"] else "")
+        )
+    lines.append(f"{report['samples']} sample(s) over {report['duration_s'] / 3600:.2f} h")
+    for site in report["last"].get("top_growth", [])[:5]:
+        lines.append(f"  +{site['size_diff_kib']:.1f} KiB ({site['count_diff']:+d} blocks) "
+                     f"{site['where']}")
+    return lines
+
+
+def run_soak(args):
+    probe = MemoryProbe()
+    if args.tracemalloc and not tracemalloc.is_tracing():
+        tracemalloc.start(args.tracemalloc)
+    monitor = SoakMonitor(probe, args.interval, args.samples_out, warmup=args.warmup)
+    print(f"[+] Soak test for {args.duration / 3600:.2f} h on {args.source}, "
+          f"sampling every {args.interval:.0f} s to {args.samples_out}")
+
+    if args.gui:
+        def on_app(root, app):
+            interval_ms = int(args.interval * 1000)
+
+            def sample():
+                # On the Tk thread, so Tk images can be counted
+                probe.count_tk_images(root)
+                monitor.sample()
+                root.after(interval_ms, sample)
+
+            def cycle_gallery():
+                gallery = app.open_gallery()
+                root.after(2000, lambda: gallery.closed or gallery.win.destroy())
+                root.after(int(args.gallery_every * 1000), cycle_gallery)
+
+            root.after_idle(sample)
+            if args.gallery_every:
+                root.after(int(args.gallery_every * 1000), cycle_gallery)
+            root.after(int(args.duration * 1000), app.on_close)
+
+        status = run_gui(args, on_app=on_app, probe=probe)
+    else:
+        monitor.start()
+        try:
+            status = run_daemon(args, probe=probe)
+        finally:
+            monitor.close()
+
+    report = monitor.report()
+    for line in format_soak_report(report):
+        print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Soak report written: {args.output}")
+    if report["growing"]:
+        print("[!] Growing:", ", ".join(report["growing"]))
+        return 1
+    return status
+
+
+def run_journal(args):
+    events = read_journal(args.path, args.since, args.until, args.types)
+    if not args.summary:
+        for event in events:
+            print(json.dumps(event))
+        return 0
+    counts = collections.Counter()
+    first = last = None
+    for event in events:
+        counts[event["type"]] += 1
+        first = event["t"] if first is None else first
+        last = event["t"]
+    if not counts:
+        print("[i] No matching events.")
+        return 0
+    span = (datetime.datetime.fromtimestamp(first).isoformat(timespec="seconds"),
+            datetime.datetime.fromtimestamp(last).isoformat(timespec="seconds"))
+    print(f"[i] {sum(counts.values())} event(s) from {span[0]} to {span[1]}")
+    for name, count in counts.most_common():
+        print(f"{name:<20}{count:>8}")
+    return 0
+
+
+def run_screenshot_bench(args):
+    providers = []
+    for backend in args.backends:
+        try:
+            providers.append(open_screenshot_provider(backend, args.monitor,
+                                                      parse_region(args.region)))
+        except Exception as e:
+            # e.g. mss not installed, or no display for pyautogui
+            print(f"[!] {backend}: unavailable ({type(e).__name__}: {e})")
+    report = {}
+    for provider in providers:
+        try:
+            report.update(run_screenshot_benchmark([provider], count=args.count))
+        except Exception as e:
+            print(f"[!] {provider.name}: capture failed ({type(e).__name__}: {e})")
+
+    print(f"{'backend':<12}{'size':>14}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, stats in report.items():
+        size = "x".join(str(v) for v in stats["shape"][1::-1])
+        print(f"{name:<12}{size:>14}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Screenshot report written: {args.output}")
+    return 0 if report else 1
+
+
+def run_bench(args):
+    # Benchmarks always run unpaced: we measure processing, not playback speed
+    source = source_from_args(args, realtime=False)
+    if not source.isOpened():
+        print("[!] Frame source could not be opened:", args.source)
+        return 2
+
+    report = run_benchmark(
+        source,
+        frames=args.frames,
+        warmup=args.warmup,
+        allocation_frames=args.allocation_frames,
+        use_tk=args.tk,
+    )
+    report["source"] = args.source
+    for line in format_benchmark(report):
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Benchmark report written: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressed = compare_benchmarks(report, baseline, args.tolerance)
+        for line in lines:
+            print(line)
+        if regressed:
+            print("[!] Regressed stages:", ", ".join(regressed))
+            return 1
+    return 0
+
+
+def run_profile_compare(args):
+    profiles = load_profile_config(args.config)[0] if args.config else PROFILES
+    names = args.profiles or list(profiles)
+    unknown = [name for name in names if name not in profiles]
+    if unknown:
+        print("[!] Unknown profile(s):", ", ".join(unknown))
+        return 2
+
+    selected = [profiles[name] for name in names]
+    if args.width or args.height:
+        selected = [p._replace(width=args.width or p.width, height=args.height or p.height)
+                    for p in selected]
+    try:
+        # Recordings play in real time, so the profiles' frame rate caps apply
+        report = run_profile_comparison(lambda profile: source_from_args(args, profile=profile),
+                                        selected, max_hands=args.max_hands,
+                                        duration=args.duration, roi=roi_from_args(args))
+    except RuntimeError as e:
+        print(f"[!] {args.source}:", e)
+        return 2
+    for line in format_profile_comparison(report):
+        print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"source": args.source, "profiles": report}, f, indent=2)
+        print(f"[+] Profile comparison written: {args.output}")
+    return 0
+
+
+COMMANDS = {
+    "gui": run_gui,
+    "daemon": run_daemon,
+    "multicam": run_multicam,
+    "replay": run_replay,
+    "tune": run_tune,
+    "soak": run_soak,
+    "journal": run_journal,
+    "screenshot-bench": run_screenshot_bench,
+    "profile-compare": run_profile_compare,
+    "bench": run_bench,
+}
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Plain "python finger_tracer_computer_control.py [--source ...]" starts the GUI
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "gui")
+    args = build_arg_parser().parse_args(argv)
+    return COMMANDS[args.command or "gui"](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import argparse
+import json
+import time
+
+import pytest
+
+from finger_tracer_computer_control import EventJournal, journal_files, parse_time, read_journal
+
+
+def write_events(path, count, **kwargs):
+    journal = EventJournal(str(path), echo=False, **kwargs)
+    for i in range(count):
+        journal.record("even" if i % 2 == 0 else "odd", n=i)
+    journal.close()
+    return journal
+
+
+def test_rotation_keeps_backups_and_every_line(tmp_path):
+    path = tmp_path / "events.jsonl"
+    journal = write_events(path, 2000, max_bytes=4000, backups=100, batch_size=16)
+    files = journal_files(str(path))
+    assert journal.rotations > 0
+    assert len(files) == journal.rotations + 1
+    lines = [json.loads(line) for f in files for line in open(f, encoding="utf-8")]
+    assert [record["n"] for record in lines] == list(range(2000))
+    assert journal.stats()["written"] == 2000
+
+
+def test_rotation_drops_files_beyond_backups(tmp_path):
+    path = tmp_path / "events.jsonl"
+    journal = write_events(path, 2000, max_bytes=2000, backups=2, batch_size=16)
+    assert journal.rotations > 2
+    assert len(journal_files(str(path))) == 3
+    newest = [json.loads(line)["n"] for line in open(path, encoding="utf-8")]
+    assert newest[-1] == 1999
+
+
+def test_read_journal_filters_by_type_and_time(tmp_path):
+    path = tmp_path / "events.jsonl"
+    write_events(path, 500, max_bytes=3000, backups=100, batch_size=16)
+    records = list(read_journal(str(path)))
+    assert len(records) == 500
+
+    odd = list(read_journal(str(path), types=["odd"]))
+    assert [r["n"] for r in odd] == list(range(1, 500, 2))
+
+    start, end = records[100]["t"], records[400]["t"]
+    window = list(read_journal(str(path), start=start, end=end))
+    assert window == [r for r in records if start <= r["t"] < end]
+
+
+@pytest.mark.parametrize("spec, seconds", [
+    ("90s", 90), ("10sec", 10), ("15m", 900), ("15min", 900), ("15 mins", 900),
+    ("2h", 7200), ("2hr", 7200), ("3hours", 10800), ("1.5h", 5400), ("7d", 604800),
+    ("7days", 604800),
+])
+def test_parse_time_ages(spec, seconds):
+    assert time.time() - parse_time(spec) == pytest.approx(seconds, abs=5)
+
+
+def test_parse_time_absolute():
+    assert parse_time("1700000000") == 1700000000.0
+    assert parse_time("2025-06-01T12:30") == parse_time("2025-06-01") + 12.5 * 3600
+
+
+@pytest.mark.parametrize("spec", ["yesterday", "5x", "15minutes!", "2025-13-01"])
+def test_parse_time_lists_the_formats(spec):
+    with pytest.raises(argparse.ArgumentTypeError, match="ISO date/time"):
+        parse_time(spec)
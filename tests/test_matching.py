@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from finger_tracer_computer_control import FEATURE_DIM, CoarseIndex, TemplateMatcher
+
+
+def brute_force(templates, queries):
+    dists = np.linalg.norm(queries[:, None, :] - templates[None, :, :], axis=2)
+    return dists.argmin(axis=1), dists.min(axis=1)
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(1)
+    templates = rng.normal(size=(600, FEATURE_DIM)).astype(np.float32)
+    queries = templates[rng.choice(len(templates), 40, replace=False)]
+    queries = queries + rng.normal(scale=0.01, size=queries.shape).astype(np.float32)
+    return templates, queries
+
+
+def test_matcher_agrees_with_brute_force(gallery):
+    templates, queries = gallery
+    matcher = TemplateMatcher(templates, [f"t{i}" for i in range(len(templates))])
+    assert matcher.index is None
+    best, dist = brute_force(templates, queries)
+    matches = matcher.match_batch(queries)
+    assert [m.index for m in matches] == best.tolist()
+    assert [m.label for m in matches] == [f"t{i}" for i in best]
+    np.testing.assert_allclose([m.distance for m in matches], dist, rtol=1e-3, atol=1e-3)
+
+
+def test_coarse_index_agrees_with_brute_force(gallery, monkeypatch):
+    templates, queries = gallery
+    monkeypatch.setattr(TemplateMatcher, "INDEX_MIN_TEMPLATES", 100)
+    matcher = TemplateMatcher(templates, ["x"] * len(templates))
+    assert matcher.index is not None
+    best, _ = brute_force(templates, queries)
+    assert [m.index for m in matcher.match_batch(queries)] == best.tolist()
+
+
+def test_coarse_index_covers_added_templates():
+    rng = np.random.default_rng(2)
+    templates = rng.normal(size=(200, FEATURE_DIM)).astype(np.float32)
+    index = CoarseIndex(templates)
+    assert sorted(np.concatenate(index.lists).tolist()) == list(range(200))
+
+    extra = rng.normal(size=FEATURE_DIM).astype(np.float32)
+    index.add(extra, 200)
+    assert 200 in index.candidates(extra, n_probe=1)
+
+
+def test_matcher_add_matches_new_template(gallery):
+    templates, _ = gallery
+    matcher = TemplateMatcher(templates[:10], ["a"] * 10)
+    matcher.add(templates[10], "new")
+    match = matcher.match(templates[10])
+    assert (match.label, match.index) == ("new", 10)
+    assert match.distance == pytest.approx(0.0, abs=1e-2)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from finger_tracer_computer_control import detect_growth
+
+
+def samples(values, name="rss_bytes", step=60.0):
+    return [{"t": i * step, name: float(v)} for i, v in enumerate(values)]
+
+
+def test_steady_leak_is_reported():
+    leak = 200e6 + np.arange(120) * 1e6
+    report = detect_growth(samples(leak))
+    assert report["rss_bytes"]["growing"]
+    assert report["rss_bytes"]["per_hour"] > 50e6
+
+
+def test_gc_sawtooth_is_not_growth():
+    sawtooth = 200e6 + (np.arange(120) % 10) * 5e6
+    assert not detect_growth(samples(sawtooth))["rss_bytes"]["growing"]
+
+
+def test_rise_below_threshold_is_not_growth():
+    slow = 200e6 + np.arange(120) * 1e4    # ~1 MB overall, threshold is 8 MB
+    assert not detect_growth(samples(slow))["rss_bytes"]["growing"]
+
+
+def test_too_few_samples_are_skipped():
+    assert detect_growth(samples([1, 2, 3])) == {}
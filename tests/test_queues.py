@@ -0,0 +1,42 @@
+import threading
+import time
+
+from finger_tracer_computer_control import LatestQueue
+
+
+def test_put_drops_the_oldest_item():
+    dropped = []
+    q = LatestQueue(maxsize=2, on_drop=dropped.append)
+    for item in (1, 2, 3, 4):
+        q.put(item)
+    assert dropped == [1, 2]
+    assert q.dropped == 2
+    assert len(q) == 2
+    assert q.get(timeout=0) == 3
+    assert q.get(timeout=0) == 4
+    assert q.get(timeout=0) is None
+
+
+def test_get_latest_discards_older_items():
+    dropped = []
+    q = LatestQueue(maxsize=3, on_drop=dropped.append)
+    for item in (1, 2, 3):
+        q.put(item)
+    assert q.get_latest() == 3
+    assert dropped == [1, 2]
+    assert len(q) == 0
+    assert q.get_latest() is None
+
+
+def test_blocking_put_waits_for_room_instead_of_dropping():
+    q = LatestQueue(maxsize=1)
+    q.put("a")
+    assert q.put("b", block=True, timeout=0.05) is False
+    assert q.dropped == 0
+
+    threading.Timer(0.05, q.get).start()
+    started = time.perf_counter()
+    assert q.put("b", block=True, timeout=2.0) is True
+    assert time.perf_counter() - started < 1.0
+    assert q.get(timeout=0) == "b"
+    assert q.dropped == 0
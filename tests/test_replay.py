@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from finger_tracer_computer_control import (
+    GestureEngine, LandmarkTrace, LandmarkTraceWriter, TemplateStore,
+    extract_hand_features_batch, replay_trace, results_from_arrays,
+)
+
+
+def hand(fingers=0, x=0.5):
+    """(21, 3) landmarks of an upright hand with the first `fingers` fingers raised (no thumb)."""
+    points = np.zeros((21, 3), dtype=np.float32)
+    points[0] = (x, 0.8, 0)
+    for joint in range(1, 5):                      # thumb, folded across the palm
+        points[joint] = (x - 0.04 * joint, 0.75, 0)
+    points[4, 0] = points[3, 0] + 0.02
+    for finger in range(4):
+        base = 5 + 4 * finger
+        fx = x - 0.06 + 0.04 * finger
+        ys = (0.65, 0.55, 0.48, 0.42) if finger < fingers else (0.65, 0.55, 0.6, 0.62)
+        for joint, y in enumerate(ys):
+            points[base + joint] = (fx, y, 0)
+    return points
+
+
+def write_trace(path, fps, seconds, pose, start=1000.0):
+    """Record `seconds` of pose(t) -> (21, 3) landmarks at `fps`."""
+    writer = LandmarkTraceWriter(str(path))
+    for i in range(int(round(seconds * fps))):
+        t = i / fps
+        writer.write(results_from_arrays(pose(t)[None]), start + t, 640, 480)
+    writer.close()
+    return LandmarkTrace(str(path))
+
+
+def engine_for(tmp_path, pose):
+    store = TemplateStore(str(tmp_path / "templates.bin"))
+    store.append(extract_hand_features_batch(pose[None])[0], "owner")
+    return GestureEngine(store)
+
+
+@pytest.mark.parametrize("fps", [15, 30, 90])
+def test_finger_hold_timing_is_independent_of_frame_rate(tmp_path, fps):
+    trace = write_trace(tmp_path / "hold.trace", fps, 2.0,
+                        lambda t: hand(0) if t < 0.5 else hand(3))
+    events, _ = replay_trace(trace, engine_for(tmp_path, hand(0)))
+
+    assert [(e["type"], e.get("name", e.get("label"))) for e in events] == [
+        ("unlock", "owner"), ("action", "copy"), ("action", "copy"),
+    ]
+    times = trace.records["time"] - trace.records["time"][0]
+    shown = times[times >= 0.5][0]     # first frame with three fingers
+    frame = 1.0 / fps + 1e-3
+    assert events[0]["time"] == 0.0
+    # Held for the 0.15 s debounce, then repeated after the 1 s cooldown
+    assert shown + 0.15 <= events[1]["time"] + 1e-3 <= shown + 0.15 + frame
+    assert events[1]["time"] + 1.0 <= events[2]["time"] + 1e-3 <= events[1]["time"] + 1.0 + frame
+
+
+def test_swipe_left_takes_a_screenshot(tmp_path):
+    def swipe(t):
+        # 0.3 to the left in 0.2 s, starting at 0.5 s
+        return hand(0, x=0.7 - 1.5 * min(max(t - 0.5, 0.0), 0.2))
+
+    trace = write_trace(tmp_path / "swipe.trace", 30, 1.0, swipe)
+    events, _ = replay_trace(trace, engine_for(tmp_path, hand(0)))
+    actions = [e for e in events if e["type"] == "action"]
+    assert [e["name"] for e in actions] == ["screenshot"]
+    assert 0.5 < actions[0]["time"] <= 0.75
+
+
+def test_trace_round_trips_landmarks(tmp_path):
+    pose = hand(2)
+    trace = write_trace(tmp_path / "pose.trace", 10, 0.5, lambda t: pose)
+    assert len(trace) == 5
+    assert (trace.width, trace.height) == (640, 480)
+    assert trace.duration == pytest.approx(0.4)
+    _, results = next(trace.frames())
+    np.testing.assert_array_equal(results.multi_hand_landmarks[0].landmark, pose)
@@ -0,0 +1,85 @@
+import sys
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+from finger_tracer_computer_control import (
+    CaptureWriter, FakeScreenshots, PyAutoGuiScreenshots, open_screenshot_provider,
+    parse_region, take_screenshot,
+)
+
+
+def test_fake_screen_spans_every_monitor():
+    provider = FakeScreenshots(size=(320, 200), count=2)
+    assert provider.monitors() == [(0, 0, 320, 200), (320, 0, 320, 200)]
+    assert provider.grab().shape == (200, 640, 3)
+
+
+def test_fake_monitor_and_region_select_pixels():
+    whole = FakeScreenshots(size=(320, 200)).grab()
+    second = FakeScreenshots(monitor=2, size=(320, 200)).grab()
+    np.testing.assert_array_equal(second, whole[:, 320:])
+
+    region = FakeScreenshots(monitor=2, region=(10, 20, 30, 40), size=(320, 200)).grab()
+    np.testing.assert_array_equal(region, whole[20:60, 330:360])
+
+
+def test_parse_region():
+    assert parse_region("") is None
+    assert parse_region("1,2,3,4") == (1, 2, 3, 4)
+    for spec in ("1,2,3", "0,0,0,10", "a,b,c,d"):
+        with pytest.raises(ValueError):
+            parse_region(spec)
+
+
+def test_open_provider_by_name():
+    provider = open_screenshot_provider("fake", monitor=1, region=(0, 0, 8, 8))
+    assert isinstance(provider, FakeScreenshots)
+    assert provider.grab().shape == (8, 8, 3)
+    with pytest.raises(ValueError):
+        open_screenshot_provider("nope")
+
+
+def test_auto_falls_back_to_pyautogui_without_mss(monkeypatch):
+    monkeypatch.setitem(sys.modules, "mss", None)
+    assert isinstance(open_screenshot_provider("auto"), PyAutoGuiScreenshots)
+
+
+@pytest.fixture
+def pyautogui(monkeypatch):
+    """Stand-in for pyautogui on a 100x50 screen, recording each grab's region."""
+    module = types.SimpleNamespace(regions=[], size=lambda: (100, 50))
+
+    def screenshot(region=None):
+        module.regions.append(region)
+        width, height = region[2:] if region else module.size()
+        return np.zeros((height, width, 3), dtype=np.uint8)
+
+    module.screenshot = screenshot
+    monkeypatch.setitem(sys.modules, "pyautogui", module)
+    return module
+
+
+def test_pyautogui_monitor_one_becomes_a_region(pyautogui):
+    PyAutoGuiScreenshots().grab()
+    PyAutoGuiScreenshots(monitor=1).grab()
+    PyAutoGuiScreenshots(monitor=1, region=(5, 6, 7, 8)).grab()
+    assert pyautogui.regions == [None, (0, 0, 100, 50), (5, 6, 7, 8)]
+
+
+def test_pyautogui_rejects_other_monitors():
+    with pytest.raises(ValueError, match="mss"):
+        PyAutoGuiScreenshots(monitor=2)
+
+
+def test_take_screenshot_writes_the_grab(tmp_path):
+    writer = CaptureWriter()
+    try:
+        provider = FakeScreenshots(monitor=2, region=(0, 0, 64, 32), size=(320, 200))
+        path = str(tmp_path / "shot.png")
+        assert take_screenshot(writer, path, provider) == path
+    finally:
+        writer.shutdown()
+    np.testing.assert_array_equal(cv2.imread(path), provider.grab())